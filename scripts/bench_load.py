@@ -0,0 +1,431 @@
+#!/usr/bin/env python3
+"""Load-test the bookmarks API and report latency percentiles and throughput.
+
+Every (transport, store) combination runs in a fresh interpreter, so the
+settings read at import time and the module caches start clean. Transports:
+
+- ``inprocess``: requests go straight to the ASGI app through httpx, which
+  measures the application without any network or server overhead
+- ``uvicorn``: a local uvicorn server is started and driven over HTTP
+
+Stores:
+
+- ``memory``: no Cosmos DB endpoint, the in-memory development store
+- ``cosmos``: the account at ``--cosmos-endpoint``, the local Cosmos DB
+  emulator by default (set ``COSMOS_KEY`` to its key)
+
+Each user's library is seeded through ``POST /import``. Then ``--concurrency``
+workers send ``--requests`` requests drawn from the weighted ``--mix`` against
+random users. The bookmarks created by the run are tagged and bulk-deleted at
+the end.
+
+Usage:
+    python scripts/bench_load.py
+    python scripts/bench_load.py --users 20 --library-size 2000 --concurrency 32
+    python scripts/bench_load.py --transports inprocess,uvicorn --output load.json
+    python scripts/bench_load.py --stores cosmos --cosmos-endpoint https://localhost:8081/
+    python scripts/bench_load.py --baseline load.json --tolerance 1.25
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import uuid
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+API = "/api/v1/bookmarks"
+
+EMULATOR_ENDPOINT = "https://localhost:8081/"
+
+DEFAULT_MIX = "list=30,get=30,create=10,update=10,delete=5,tag=15"
+
+OPERATIONS = ("list", "get", "create", "update", "delete", "tag")
+
+CATEGORIES = ("work", "personal", "education", "technology", "news", "other")
+
+# Tag carried by every bookmark the benchmark creates, for the cleanup
+BENCH_TAG = "bench-load"
+
+
+def parse_mix(mix: str) -> dict:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise SystemExit(f"unknown operation in --mix: {name}")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(fraction * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def latency_summary(latencies: list) -> dict:
+    values = sorted(latencies)
+    return {
+        "count": len(values),
+        "p50_ms": round(percentile(values, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(values, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(values, 0.99) * 1000, 3),
+        "mean_ms": round(sum(values) / len(values) * 1000, 3) if values else 0.0,
+    }
+
+
+def bookmark_body(rng: random.Random, user_id: str, n: int) -> dict:
+    return {
+        "title": f"Benchmark bookmark {n}",
+        "url": f"https://example.com/{user_id}/{n}",
+        "description": "Created by the load benchmark",
+        "category": rng.choice(CATEGORIES),
+        "tags": [BENCH_TAG, f"tag{rng.randrange(20)}"],
+        "user_id": user_id,
+    }
+
+
+class LoadRun:
+    """One scripted load run against a base URL through an httpx client"""
+
+    def __init__(self, client, args, rng: random.Random):
+        self.client = client
+        self.args = args
+        self.rng = rng
+        self.mix = parse_mix(args.mix)
+        self.users = [f"bench-{uuid.uuid4().hex[:8]}-{i}" for i in range(args.users)]
+        # user_id -> ids of the user's bookmarks the run knows about
+        self.ids = {user_id: [] for user_id in self.users}
+        self.latencies = {name: [] for name in OPERATIONS}
+        self.errors = {name: 0 for name in OPERATIONS}
+        self.created = 0
+
+    async def seed(self) -> None:
+        for user_id in self.users:
+            rows = [
+                bookmark_body(self.rng, user_id, n)
+                for n in range(self.args.library_size)
+            ]
+            response = await self.client.post(
+                f"{API}/import",
+                params={"user_id": user_id, "format": "json"},
+                content=json.dumps(rows),
+            )
+            response.raise_for_status()
+            cursor = None
+            while True:
+                params = {"user_id": user_id, "page_size": 100, "include_total": False}
+                if cursor:
+                    params["cursor"] = cursor
+                page = (await self.client.get(f"{API}/", params=params)).json()
+                self.ids[user_id].extend(b["id"] for b in page["bookmarks"])
+                cursor = page.get("next_cursor")
+                if not cursor or not page["bookmarks"]:
+                    break
+        self.created = len(self.users) * self.args.library_size
+
+    async def request(self, operation: str, user_id: str):
+        ids = self.ids[user_id]
+        if operation in ("get", "update", "delete") and not ids:
+            operation = "create"
+        params = {"user_id": user_id}
+        if operation == "list":
+            params["page_size"] = self.args.page_size
+            return operation, self.client.get(f"{API}/", params=params)
+        if operation == "tag":
+            params["tags"] = f"tag{self.rng.randrange(20)}"
+            params["page_size"] = self.args.page_size
+            return operation, self.client.get(f"{API}/", params=params)
+        if operation == "create":
+            self.created += 1
+            body = bookmark_body(self.rng, user_id, self.created)
+            return operation, self.client.post(f"{API}/", json=body)
+        if operation == "get":
+            bookmark_id = self.rng.choice(ids)
+            return operation, self.client.get(f"{API}/{bookmark_id}", params=params)
+        if operation == "update":
+            bookmark_id = self.rng.choice(ids)
+            body = {"title": f"Updated {self.rng.randrange(1_000_000)}"}
+            return operation, self.client.put(
+                f"{API}/{bookmark_id}", params=params, json=body
+            )
+        bookmark_id = ids.pop(self.rng.randrange(len(ids)))
+        return operation, self.client.delete(f"{API}/{bookmark_id}", params=params)
+
+    async def worker(self, remaining: list, record: bool) -> None:
+        names = list(self.mix)
+        weights = [self.mix[name] for name in names]
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            user_id = self.rng.choice(self.users)
+            operation, pending = await self.request(
+                self.rng.choices(names, weights)[0], user_id
+            )
+            started = time.perf_counter()
+            try:
+                response = await pending
+                ok = response.status_code < 400
+            except Exception:
+                response, ok = None, False
+            elapsed = time.perf_counter() - started
+            if not record:
+                continue
+            self.latencies[operation].append(elapsed)
+            if not ok:
+                self.errors[operation] += 1
+            elif operation == "create":
+                self.ids[user_id].append(response.json()["id"])
+
+    async def drive(self, requests: int, record: bool) -> float:
+        remaining = [requests]
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(self.worker(remaining, record) for _ in range(self.args.concurrency))
+        )
+        return time.perf_counter() - started
+
+    async def cleanup(self) -> None:
+        for user_id in self.users:
+            await self.client.post(
+                f"{API}/bulk/delete",
+                params={"user_id": user_id},
+                json={"tags": [BENCH_TAG]},
+            )
+
+    async def run(self) -> dict:
+        await self.seed()
+        await self.drive(self.args.warmup, record=False)
+        duration = await self.drive(self.args.requests, record=True)
+        if not self.args.keep_data:
+            await self.cleanup()
+
+        all_latencies = [
+            value for values in self.latencies.values() for value in values
+        ]
+        return {
+            "requests": len(all_latencies),
+            "errors": sum(self.errors.values()),
+            "duration_s": round(duration, 3),
+            "rps": round(len(all_latencies) / duration, 1) if duration else 0.0,
+            "latency": latency_summary(all_latencies),
+            "by_operation": {
+                name: {**latency_summary(values), "errors": self.errors[name]}
+                for name, values in self.latencies.items()
+                if values
+            },
+        }
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def run_inprocess(args) -> dict:
+    import httpx
+
+    from backend.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as c:
+            return await LoadRun(c, args, random.Random(args.seed)).run()
+
+
+async def run_uvicorn(args) -> dict:
+    import httpx
+
+    port = free_port()
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "backend.main:app",
+            "--port",
+            str(port),
+            "--workers",
+            str(args.server_workers),
+            "--log-level",
+            "warning",
+            "--no-access-log",
+        ],
+        env=os.environ,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    limits = httpx.Limits(max_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=base_url, limits=limits) as client:
+            deadline = time.monotonic() + 60
+            while True:
+                try:
+                    if (await client.get("/health/ready")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if time.monotonic() > deadline or server.poll() is not None:
+                    raise RuntimeError("uvicorn did not become ready")
+                await asyncio.sleep(0.1)
+            return await LoadRun(client, args, random.Random(args.seed)).run()
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def store_environment(store: str, args) -> dict:
+    env = {**os.environ, "PYTHONPATH": SRC}
+    if store == "memory":
+        env["COSMOS_ENDPOINT"] = ""
+        env["DEBUG"] = "true"
+    else:
+        env["COSMOS_ENDPOINT"] = args.cosmos_endpoint
+        env["DEBUG"] = "false"
+    return env
+
+
+def run_child(transport: str, store: str, args) -> dict:
+    """Run one combination in a fresh interpreter and return its results"""
+    child_args = [a for a in sys.argv[1:] if a not in ("--output", args.output)]
+    result = subprocess.run(
+        [
+            sys.executable,
+            os.path.abspath(__file__),
+            *child_args,
+            "--child",
+            f"{transport}/{store}",
+        ],
+        env=store_environment(store, args),
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode:
+        raise RuntimeError(f"{transport}/{store} failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def check_regressions(results: dict, baseline: dict, tolerance: float) -> list:
+    failures = []
+    for name, summary in results.items():
+        if name not in baseline:
+            continue
+        reference = baseline[name]
+        for key in ("p95_ms", "p99_ms"):
+            limit = reference["latency"][key] * tolerance
+            if summary["latency"][key] > limit:
+                failures.append(
+                    f"{name} {key}: {summary['latency'][key]} > {limit:.3f}"
+                )
+        floor = reference["rps"] / tolerance
+        if summary["rps"] < floor:
+            failures.append(f"{name} rps: {summary['rps']} < {floor:.1f}")
+    return failures
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--transports", default="inprocess", help="comma-separated: inprocess, uvicorn"
+    )
+    parser.add_argument(
+        "--stores", default="memory", help="comma-separated: memory, cosmos"
+    )
+    parser.add_argument("--users", type=int, default=10, help="users in the run")
+    parser.add_argument(
+        "--library-size", type=int, default=500, help="bookmarks seeded per user"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=16, help="concurrent client workers"
+    )
+    parser.add_argument(
+        "--requests", type=int, default=5000, help="measured requests per run"
+    )
+    parser.add_argument(
+        "--warmup", type=int, default=200, help="unmeasured requests first"
+    )
+    parser.add_argument(
+        "--mix",
+        default=DEFAULT_MIX,
+        help=f"weighted operations, default {DEFAULT_MIX}",
+    )
+    parser.add_argument(
+        "--page-size", type=int, default=50, help="page size of list requests"
+    )
+    parser.add_argument("--seed", type=int, default=1, help="random seed")
+    parser.add_argument(
+        "--server-workers", type=int, default=1, help="uvicorn worker processes"
+    )
+    parser.add_argument(
+        "--cosmos-endpoint",
+        default=os.getenv("BENCH_COSMOS_ENDPOINT", EMULATOR_ENDPOINT),
+        help="Cosmos DB endpoint of the cosmos store",
+    )
+    parser.add_argument(
+        "--keep-data", action="store_true", help="skip deleting the created bookmarks"
+    )
+    parser.add_argument("--output", help="write the results as JSON")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=1.25,
+        help="fail when p95/p99 or throughput is worse than the baseline by this factor",
+    )
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        transport = args.child.split("/")[0]
+        runner = run_inprocess if transport == "inprocess" else run_uvicorn
+        print(json.dumps(asyncio.run(runner(args))))
+        return 0
+
+    results = {}
+    for store in args.stores.split(","):
+        for transport in args.transports.split(","):
+            name = f"{transport}/{store}"
+            results[name] = summary = run_child(transport, store, args)
+            latency = summary["latency"]
+            print(
+                f"{name:<18} {summary['rps']:8.1f} req/s   "
+                f"p50 {latency['p50_ms']:7.2f} ms   p95 {latency['p95_ms']:7.2f} ms   "
+                f"p99 {latency['p99_ms']:7.2f} ms   errors {summary['errors']}"
+            )
+
+    report = {
+        "config": {
+            "users": args.users,
+            "library_size": args.library_size,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "mix": parse_mix(args.mix),
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        failures = check_regressions(results, baseline, args.tolerance)
+        for failure in failures:
+            print(f"REGRESSION {failure}")
+        return 1 if failures else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
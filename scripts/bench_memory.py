@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""Measure the memory the in-memory store spends per bookmark.
+
+Compares the bookmark documents as plain dicts (what the store used to
+keep) with the compact ``BookmarkRecord`` form, and reports the whole
+store including its category and tag indexes. Documents are decoded from
+JSON, as imports and API requests produce them, so every row starts with
+its own copies of the category and tag strings.
+
+Usage:
+    python scripts/bench_memory.py
+    python scripts/bench_memory.py --bookmarks 1000000 --users 1000 --output memory.json
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import random
+import sys
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+)
+
+from backend.storage import BookmarkRecord, InMemoryBookmarkStore  # noqa: E402
+
+CATEGORIES = ("work", "personal", "education", "technology", "news", "other")
+
+
+def documents_payload(bookmarks: int, users: int, tags: int, seed: int) -> str:
+    """JSON array of stored bookmark documents"""
+    rng = random.Random(seed)
+    started = datetime(2024, 1, 1)
+    docs = []
+    for n in range(bookmarks):
+        created = (
+            started + timedelta(seconds=n, microseconds=rng.randrange(10**6))
+        ).isoformat()
+        docs.append(
+            {
+                "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+                "title": f"Bookmark number {n} about something interesting",
+                "url": f"https://example.com/articles/{n}/some-readable-slug",
+                "description": "A short note" if n % 3 == 0 else None,
+                "category": rng.choice(CATEGORIES),
+                "tags": [f"tag{rng.randrange(tags)}" for _ in range(rng.randrange(4))],
+                "user_id": f"user-{rng.randrange(users)}",
+                "created_at": created,
+                "updated_at": created,
+                "_etag": f'"{uuid.UUID(int=rng.getrandbits(128), version=4)}"',
+            }
+        )
+    return json.dumps(docs)
+
+
+def as_dicts(payload: str):
+    return {(doc["user_id"], doc["id"]): doc for doc in json.loads(payload)}
+
+
+def as_records(payload: str):
+    records = {}
+    for doc in json.loads(payload):
+        records.setdefault(doc["user_id"], {})[doc["id"]] = BookmarkRecord(doc)
+    return records
+
+
+def as_store(payload: str):
+    store = InMemoryBookmarkStore()
+
+    async def load():
+        for doc in json.loads(payload):
+            await store.insert(doc)
+
+    asyncio.run(load())
+    return store
+
+
+def retained_bytes(build, payload: str) -> int:
+    """Bytes still allocated by what ``build`` returns, temporaries excluded"""
+    gc.collect()
+    tracemalloc.start()
+    structure = build(payload)
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del structure
+    return current
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bookmarks", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--tags", type=int, default=50, help="distinct tags")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the results as JSON")
+    args = parser.parse_args()
+
+    payload = documents_payload(args.bookmarks, args.users, args.tags, args.seed)
+    results = {}
+    for name, build in (
+        ("dict_documents", as_dicts),
+        ("records", as_records),
+        ("store_with_indexes", as_store),
+    ):
+        total = retained_bytes(build, payload)
+        results[name] = {
+            "total_bytes": total,
+            "bytes_per_bookmark": round(total / args.bookmarks, 1),
+        }
+        print(f"{name:<20} {total / args.bookmarks:8.1f} bytes/bookmark")
+
+    saved = (
+        1 - results["records"]["total_bytes"] / results["dict_documents"]["total_bytes"]
+    )
+    print(f"records use {saved:.0%} less than dict documents")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(
+                {"bookmarks": args.bookmarks, "users": args.users, "results": results},
+                f,
+                indent=2,
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""Benchmark backend import time and time-to-first-request.
+
+Every sample runs in a fresh interpreter so module caches do not hide the
+cost of a cold worker. Modes:
+
+- ``mock``: no Cosmos DB endpoint, the in-memory development store
+- ``fast-start``: ``COSMOS_FAST_START=true`` against ``--endpoint`` (an
+  unreachable placeholder by default, which is enough to time startup)
+- ``full``: the default startup that creates the database and container;
+  only run when ``--endpoint`` points at a real account
+
+Usage:
+    python scripts/bench_startup.py
+    python scripts/bench_startup.py --runs 20 --output startup.json
+    python scripts/bench_startup.py --baseline startup.json --tolerance 1.25
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+PLACEHOLDER_ENDPOINT = "https://localhost:1/"
+
+# Runs inside the child interpreter and prints one JSON sample
+_SAMPLE = """
+import json, sys, time
+started = time.perf_counter()
+import backend.main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(backend.main.app) as client:
+    status = client.get(sys.argv[1]).status_code
+    first_request = time.perf_counter()
+print(json.dumps({
+    "import_s": imported - started,
+    "first_request_s": first_request - started,
+    "status": status,
+    "azure_loaded": any(m.startswith("azure") for m in sys.modules),
+}))
+"""
+
+
+def mode_environment(mode: str, endpoint: str) -> dict:
+    env = {**os.environ, "PYTHONPATH": SRC, "DEBUG": "true"}
+    env["COSMOS_ENDPOINT"] = "" if mode == "mock" else endpoint
+    env["COSMOS_FAST_START"] = "true" if mode == "fast-start" else "false"
+    return env
+
+
+def sample(mode: str, endpoint: str, path: str) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", _SAMPLE, path],
+        env=mode_environment(mode, endpoint),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def summarize(samples: list) -> dict:
+    summary = {}
+    for key in ("import_s", "first_request_s"):
+        values = [s[key] for s in samples]
+        summary[key] = {
+            "median": round(statistics.median(values), 4),
+            "min": round(min(values), 4),
+            "max": round(max(values), 4),
+        }
+    summary["status"] = samples[-1]["status"]
+    summary["azure_loaded"] = samples[-1]["azure_loaded"]
+    return summary
+
+
+def check_regressions(results: dict, baseline: dict, tolerance: float) -> list:
+    failures = []
+    for mode, summary in results.items():
+        if mode not in baseline:
+            continue
+        for key in ("import_s", "first_request_s"):
+            limit = baseline[mode][key]["median"] * tolerance
+            if summary[key]["median"] > limit:
+                failures.append(
+                    f"{mode} {key}: {summary[key]['median']:.4f}s > {limit:.4f}s"
+                )
+    return failures
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10, help="samples per mode")
+    parser.add_argument(
+        "--modes",
+        default="mock,fast-start",
+        help="comma-separated modes: mock, fast-start, full",
+    )
+    parser.add_argument(
+        "--endpoint",
+        default=os.getenv("COSMOS_ENDPOINT") or PLACEHOLDER_ENDPOINT,
+        help="Cosmos DB endpoint for the fast-start and full modes",
+    )
+    parser.add_argument("--path", default="/health", help="first request path")
+    parser.add_argument("--output", help="write the results as JSON")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=1.25,
+        help="fail when a median exceeds the baseline by this factor",
+    )
+    args = parser.parse_args()
+
+    results = {}
+    for mode in args.modes.split(","):
+        if mode == "full" and args.endpoint == PLACEHOLDER_ENDPOINT:
+            print("full: skipped, needs --endpoint of a real Cosmos DB account")
+            continue
+        samples = [sample(mode, args.endpoint, args.path) for _ in range(args.runs)]
+        results[mode] = summarize(samples)
+        summary = results[mode]
+        print(
+            f"{mode:<11} import {summary['import_s']['median'] * 1000:7.1f} ms   "
+            f"first request {summary['first_request_s']['median'] * 1000:7.1f} ms   "
+            f"azure loaded: {summary['azure_loaded']}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            failures = check_regressions(results, json.load(f), args.tolerance)
+        for failure in failures:
+            print(f"REGRESSION {failure}")
+        return 1 if failures else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
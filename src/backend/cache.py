@@ -0,0 +1,304 @@
+import hashlib
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from backend.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class InMemoryCacheBackend:
+    """Bounded in-process LRU cache with a per-entry TTL"""
+
+    name = "memory"
+    # Only this process sees the entries
+    shared = False
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 60):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+        # key -> (expires_at, generation)
+        self._generations: Dict[str, tuple[float, str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Any) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_generation(self, key: str) -> Optional[str]:
+        entry = self._generations.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            # Writes made through other processes are not seen here, so a
+            # generation is only trusted for as long as a cached entry
+            del self._generations[key]
+            return None
+        return value
+
+    async def set_generation(self, key: str, value: str, only_if_missing: bool) -> None:
+        if only_if_missing and await self.get_generation(key) is not None:
+            return
+        self._generations[key] = (time.monotonic() + self.ttl_seconds, value)
+
+    async def clear(self) -> None:
+        self._entries.clear()
+        self._generations.clear()
+
+    async def close(self) -> None:
+        self._entries.clear()
+
+
+class RedisCacheBackend:
+    """Cache backend for Redis or any server speaking the Redis protocol.
+
+    Requires the optional ``redis`` package. Values are stored as JSON with
+    the configured TTL; eviction is left to the server's maxmemory policy.
+    """
+
+    name = "redis"
+    shared = True
+
+    def __init__(self, url: str, ttl_seconds: float = 60):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError(
+                "CACHE_BACKEND=redis requires the 'redis' package (pip install redis)"
+            ) from e
+
+        self.ttl_seconds = ttl_seconds
+        self._client = redis.from_url(url)
+
+    async def get(self, key: str) -> Optional[Any]:
+        value = await self._client.get(key)
+        return json.loads(value) if value is not None else None
+
+    async def set(self, key: str, value: Any) -> None:
+        await self._client.set(
+            key,
+            # default=dict encodes the in-memory store's mapping records
+            json.dumps(value, separators=(",", ":"), default=dict),
+            px=int(self.ttl_seconds * 1000),
+        )
+
+    async def get_generation(self, key: str) -> Optional[str]:
+        value = await self._client.get(key)
+        return value.decode("utf-8") if value is not None else None
+
+    async def set_generation(self, key: str, value: str, only_if_missing: bool) -> None:
+        await self._client.set(key, value, nx=only_if_missing)
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+class BookmarkCache:
+    """Read-through cache for bookmark reads.
+
+    Entries are cached under the user's current generation: single bookmarks
+    by ID and list results by the shape of the query. Any write by the user
+    moves the generation on, so stale entries are never read again and
+    simply age out. Callers read the generation once, before they fetch from
+    storage, and store the result under that generation; a write that lands
+    while the fetch is in flight leaves the result under a generation that
+    is already gone. Generations are random tokens rather than counters, so
+    a generation lost to eviction can never be reissued and resurrect old
+    entries.
+
+    Each user also has a version, the validator for conditional GETs of list
+    responses, which changes on every write by the user and at no other
+    time. On a backend shared by every process the generation serves as the
+    version, since it never expires there. Otherwise versions are random
+    tokens kept in this process, up to ``max_versions`` users, whether or
+    not caching is enabled. Writes made through other processes do not move
+    those, so each is replaced after ``version_ttl_seconds``.
+    """
+
+    def __init__(
+        self,
+        backend=None,
+        max_versions: int = 10000,
+        version_ttl_seconds: float = 60,
+    ):
+        self.backend = backend
+        self.max_versions = max_versions
+        self.version_ttl_seconds = version_ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        # user_id -> (expires_at, version), least recently used first
+        self._versions: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    @staticmethod
+    def _generation_key(user_id: str) -> str:
+        return f"generation:{user_id}"
+
+    async def generation(self, user_id: str) -> Optional[str]:
+        """Return the user's current generation, creating one if needed.
+
+        None when caching is disabled.
+        """
+        if not self.enabled:
+            return None
+        key = self._generation_key(user_id)
+        generation = await self.backend.get_generation(key)
+        if generation is None:
+            await self.backend.set_generation(key, uuid.uuid4().hex, True)
+            generation = await self.backend.get_generation(key)
+        return generation
+
+    async def version(self, user_id: str) -> str:
+        """Token that changes on every write by the user"""
+        if self.enabled and self.backend.shared:
+            return await self.generation(user_id)
+        now = time.monotonic()
+        entry = self._versions.get(user_id)
+        if entry is None or entry[0] < now:
+            # A version forgotten or expired here comes back as a new token,
+            # so a client's stale validator can never match again
+            entry = (now + self.version_ttl_seconds, uuid.uuid4().hex)
+            self._versions[user_id] = entry
+            while len(self._versions) > self.max_versions:
+                self._versions.popitem(last=False)
+        self._versions.move_to_end(user_id)
+        return entry[1]
+
+    @staticmethod
+    def _item_key(user_id: str, generation: str, bookmark_id: str) -> str:
+        return f"bookmark:{user_id}:{generation}:{bookmark_id}"
+
+    @staticmethod
+    def _list_key(user_id: str, generation: str, shape: Dict[str, Any]) -> str:
+        digest = hashlib.sha1(  # nosec - cache key, not a security boundary
+            json.dumps(shape, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+        return f"list:{user_id}:{generation}:{digest}"
+
+    def _record(self, value: Optional[Any]) -> Optional[Any]:
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def get_bookmark(
+        self, user_id: str, bookmark_id: str, generation: Optional[str]
+    ) -> Optional[dict]:
+        """Return a cached bookmark document, or None on a miss"""
+        if generation is None:
+            return None
+        return self._record(
+            await self.backend.get(self._item_key(user_id, generation, bookmark_id))
+        )
+
+    async def set_bookmark(
+        self, user_id: str, bookmark_id: str, doc: dict, generation: Optional[str]
+    ) -> None:
+        if generation is not None:
+            await self.backend.set(
+                self._item_key(user_id, generation, bookmark_id), doc
+            )
+
+    async def get_list(
+        self, user_id: str, shape: Dict[str, Any], generation: Optional[str]
+    ) -> Optional[Any]:
+        """Return a cached list result for a query shape, or None on a miss"""
+        if generation is None:
+            return None
+        return self._record(
+            await self.backend.get(self._list_key(user_id, generation, shape))
+        )
+
+    async def set_list(
+        self,
+        user_id: str,
+        shape: Dict[str, Any],
+        result: Any,
+        generation: Optional[str],
+    ) -> None:
+        if generation is not None:
+            await self.backend.set(self._list_key(user_id, generation, shape), result)
+
+    async def invalidate(self, user_id: str) -> None:
+        """Forget every cached bookmark and list result of a user"""
+        self._versions.pop(user_id, None)
+        if not self.enabled:
+            return
+        await self.backend.set_generation(
+            self._generation_key(user_id), uuid.uuid4().hex, False
+        )
+
+    async def clear(self) -> None:
+        """Forget the versions and cached entries of every user.
+
+        Entries on a backend shared by every process are left alone: writes
+        made elsewhere have already invalidated them there.
+        """
+        self._versions.clear()
+        if self.enabled and not self.backend.shared:
+            await self.backend.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for monitoring"""
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend.name if self.enabled else "none",
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+    async def close(self) -> None:
+        if self.enabled:
+            await self.backend.close()
+
+
+def create_cache_backend():
+    """Create the cache backend selected by settings.cache_backend"""
+    if settings.cache_backend == "memory":
+        return InMemoryCacheBackend(
+            max_entries=settings.cache_max_entries,
+            ttl_seconds=settings.cache_ttl_seconds,
+        )
+    if settings.cache_backend == "redis":
+        return RedisCacheBackend(
+            settings.cache_redis_url, ttl_seconds=settings.cache_ttl_seconds
+        )
+    if settings.cache_backend != "none":
+        logger.warning(
+            f"Unknown CACHE_BACKEND '{settings.cache_backend}'. Caching disabled."
+        )
+    return None
+
+
+# Global instance
+bookmark_cache = BookmarkCache(
+    create_cache_backend(),
+    max_versions=settings.cache_max_entries,
+    version_ttl_seconds=settings.cache_ttl_seconds,
+)
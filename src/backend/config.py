@@ -1,4 +1,5 @@
 import os
+import tempfile
 from typing import Optional
 
 from dotenv import load_dotenv
@@ -14,6 +15,107 @@ class Settings(BaseSettings):
     cosmos_database_name: str = os.getenv("COSMOS_DATABASE_NAME", "bookmarks_db")
     cosmos_container_name: str = os.getenv("COSMOS_CONTAINER_NAME", "bookmarks")
 
+    # Azure Cosmos DB connection pool settings (timeouts in seconds)
+    cosmos_pool_size: int = int(os.getenv("COSMOS_POOL_SIZE", "100"))
+    cosmos_connection_timeout: int = int(os.getenv("COSMOS_CONNECTION_TIMEOUT", "10"))
+    cosmos_read_timeout: int = int(os.getenv("COSMOS_READ_TIMEOUT", "30"))
+    cosmos_keepalive_timeout: int = int(os.getenv("COSMOS_KEEPALIVE_TIMEOUT", "60"))
+
+    # Fast start: assume the database and container exist, skip creating them
+    # and connect in the background while /health/ready reports not ready
+    cosmos_fast_start: bool = os.getenv("COSMOS_FAST_START", "false").lower() == "true"
+
+    # Cosmos DB calls at or above either threshold are logged with their query
+    cosmos_slow_query_ru: float = float(os.getenv("COSMOS_SLOW_QUERY_RU", "50"))
+    cosmos_slow_query_ms: float = float(os.getenv("COSMOS_SLOW_QUERY_MS", "500"))
+    # Users whose Cosmos DB usage is tracked, least recently active dropped first
+    cosmos_usage_max_users: int = int(os.getenv("COSMOS_USAGE_MAX_USERS", "10000"))
+
+    # Write-behind: buffer updates for WRITE_BEHIND_DELAY_MS and write each
+    # bookmark's merged changes once, in batches per user
+    write_behind_enabled: bool = os.getenv("WRITE_BEHIND", "false").lower() == "true"
+    write_behind_delay_ms: float = float(os.getenv("WRITE_BEHIND_DELAY_MS", "200"))
+    # Attempts at a failing write before it is dropped; retries back off
+    write_behind_max_attempts: int = int(os.getenv("WRITE_BEHIND_MAX_ATTEMPTS", "5"))
+
+    # Storage used when no Cosmos DB endpoint is configured: "memory" (lost on
+    # restart, one copy per process), "sqlite" (a durable local database file)
+    # or "shared" (a database in shared memory that all worker processes use)
+    storage_backend: str = os.getenv("STORAGE_BACKEND", "memory")
+    sqlite_path: str = os.getenv("SQLITE_PATH", "bookmarks.db")
+    sqlite_readers: int = int(os.getenv("SQLITE_READERS", "4"))
+    shared_store_path: str = os.getenv(
+        "SHARED_STORE_PATH",
+        os.path.join(
+            "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(),
+            "bookmarks-shared.db",
+        ),
+    )
+
+    # Read cache settings (CACHE_BACKEND is "memory", "redis" or "none")
+    cache_backend: str = os.getenv("CACHE_BACKEND", "memory")
+    cache_max_entries: int = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+    cache_ttl_seconds: float = float(os.getenv("CACHE_TTL_SECONDS", "60"))
+    cache_redis_url: str = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+
+    # Full-text search: users whose index is kept in memory, and how old an
+    # index may get before it is rebuilt from storage
+    search_index_max_users: int = int(os.getenv("SEARCH_INDEX_MAX_USERS", "1000"))
+    search_index_max_age_seconds: float = float(
+        os.getenv("SEARCH_INDEX_MAX_AGE_SECONDS", "60")
+    )
+
+    # Category and tag counts: users whose counts are kept in memory, and
+    # how old counts may get before they are rebuilt from storage
+    facet_index_max_users: int = int(os.getenv("FACET_INDEX_MAX_USERS", "10000"))
+    facet_index_max_age_seconds: float = float(
+        os.getenv("FACET_INDEX_MAX_AGE_SECONDS", "60")
+    )
+
+    # Duplicate URLs: "allow" only reports duplicates, "reject" refuses a
+    # second bookmark with the same normalized URL (imports skip it)
+    duplicate_urls: str = os.getenv("DUPLICATE_URLS", "allow")
+    duplicate_index_max_users: int = int(
+        os.getenv("DUPLICATE_INDEX_MAX_USERS", "10000")
+    )
+
+    # Link checks and metadata fetches refuse URLs resolving to loopback,
+    # private, link-local or reserved addresses unless this is set
+    allow_private_urls: bool = (
+        os.getenv("ALLOW_PRIVATE_URLS", "false").lower() == "true"
+    )
+
+    # Link checker: concurrent requests overall and per host, request timeout,
+    # and how long a checked link is trusted before it is checked again
+    link_check_concurrency: int = int(os.getenv("LINK_CHECK_CONCURRENCY", "50"))
+    link_check_per_host: int = int(os.getenv("LINK_CHECK_PER_HOST", "2"))
+    link_check_timeout_seconds: float = float(
+        os.getenv("LINK_CHECK_TIMEOUT_SECONDS", "10")
+    )
+    link_check_recheck_hours: float = float(
+        os.getenv("LINK_CHECK_RECHECK_HOURS", "168")
+    )
+
+    # Metadata enrichment: fetch the title, description and favicon of new
+    # bookmarks in the background (off by default, it makes outbound requests),
+    # with this many fetches at a time, queued bookmarks and request timeout
+    metadata_enrichment: bool = (
+        os.getenv("METADATA_ENRICHMENT", "false").lower() == "true"
+    )
+    metadata_enrichment_workers: int = int(
+        os.getenv("METADATA_ENRICHMENT_WORKERS", "8")
+    )
+    metadata_enrichment_queue_size: int = int(
+        os.getenv("METADATA_ENRICHMENT_QUEUE_SIZE", "1000")
+    )
+    metadata_enrichment_timeout_seconds: float = float(
+        os.getenv("METADATA_ENRICHMENT_TIMEOUT_SECONDS", "5")
+    )
+
+    # Bulk import: documents per batch and concurrent writes per batch
+    import_batch_size: int = int(os.getenv("IMPORT_BATCH_SIZE", "100"))
+    import_concurrency: int = int(os.getenv("IMPORT_CONCURRENCY", "16"))
+
     # Application settings
     app_name: str = "Bookmarks API"
     app_version: str = "1.0.0"
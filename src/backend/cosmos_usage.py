@@ -0,0 +1,285 @@
+"""Request unit (RU) accounting and slow query logging for Cosmos DB calls"""
+
+import heapq
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from backend.config import settings
+from backend.metrics import format_labels, request_scope, route_template
+
+logger = logging.getLogger(__name__)
+
+REQUEST_CHARGE_HEADER = "x-ms-request-charge"
+SERVER_DURATION_HEADER = "x-ms-request-duration-ms"
+RETRY_COUNT_HEADER = "x-ms-throttle-retry-count"
+
+
+def _number(headers, name: str) -> float:
+    try:
+        return float(headers.get(name) or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class UsageTotals:
+    """Running totals of a group of Cosmos DB calls"""
+
+    __slots__ = ("calls", "request_charge", "server_ms", "client_ms", "retries")
+
+    def __init__(self):
+        self.calls = 0
+        self.request_charge = 0.0
+        self.server_ms = 0.0
+        self.client_ms = 0.0
+        self.retries = 0
+
+    def add(
+        self, request_charge: float, server_ms: float, client_ms: float, retries: int
+    ) -> None:
+        self.calls += 1
+        self.request_charge += request_charge
+        self.server_ms += server_ms
+        self.client_ms += client_ms
+        self.retries += retries
+
+    def to_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "request_charge": round(self.request_charge, 2),
+            "server_ms": round(self.server_ms, 2),
+            "client_ms": round(self.client_ms, 2),
+            "retries": self.retries,
+        }
+
+
+class CosmosUsage:
+    """Request charge, server duration and throttle retries of Cosmos DB calls.
+
+    Totals are kept per route template and per user; the per-user totals
+    evict the least recently charged users beyond ``max_users``. Calls at
+    or above the RU or latency threshold are logged with their query.
+    """
+
+    def __init__(
+        self,
+        slow_request_charge: float = 50.0,
+        slow_ms: float = 500.0,
+        max_users: int = 10000,
+    ):
+        self.slow_request_charge = slow_request_charge
+        self.slow_ms = slow_ms
+        self.max_users = max_users
+        self.totals = UsageTotals()
+        self.by_route: Dict[str, UsageTotals] = {}
+        self.by_operation: Dict[str, UsageTotals] = {}
+        self.by_user: "OrderedDict[str, UsageTotals]" = OrderedDict()
+
+    def record(
+        self,
+        operation: str,
+        route: str,
+        user_id: Optional[str],
+        headers,
+        client_ms: float,
+        query: Optional[str] = None,
+        parameters: Optional[list] = None,
+    ) -> None:
+        request_charge = _number(headers, REQUEST_CHARGE_HEADER)
+        server_ms = _number(headers, SERVER_DURATION_HEADER)
+        retries = int(_number(headers, RETRY_COUNT_HEADER))
+
+        self.totals.add(request_charge, server_ms, client_ms, retries)
+        for groups, key in ((self.by_route, route), (self.by_operation, operation)):
+            totals = groups.get(key)
+            if totals is None:
+                totals = groups[key] = UsageTotals()
+            totals.add(request_charge, server_ms, client_ms, retries)
+        if user_id is not None:
+            totals = self.by_user.get(user_id)
+            if totals is None:
+                totals = self.by_user[user_id] = UsageTotals()
+                if len(self.by_user) > self.max_users:
+                    self.by_user.popitem(last=False)
+            else:
+                self.by_user.move_to_end(user_id)
+            totals.add(request_charge, server_ms, client_ms, retries)
+
+        if request_charge >= self.slow_request_charge or client_ms >= self.slow_ms:
+            logger.warning(
+                "Slow Cosmos DB %s on %s for user %s: %.2f RU, %.1f ms "
+                "(server %.1f ms, %d retries) query=%r parameters=%r",
+                operation,
+                route,
+                user_id,
+                request_charge,
+                client_ms,
+                server_ms,
+                retries,
+                query,
+                parameters,
+            )
+
+    def snapshot(self, top_users: int = 10) -> dict:
+        """Totals overall, by route and operation, and the highest-charge users"""
+        users = heapq.nlargest(
+            top_users, self.by_user.items(), key=lambda item: item[1].request_charge
+        )
+        return {
+            "totals": self.totals.to_dict(),
+            "by_route": {k: v.to_dict() for k, v in sorted(self.by_route.items())},
+            "by_operation": {
+                k: v.to_dict() for k, v in sorted(self.by_operation.items())
+            },
+            "top_users": [{"user_id": k, **v.to_dict()} for k, v in users],
+        }
+
+    def render(self) -> List[str]:
+        """Per-route totals as Prometheus counters"""
+        counters = (
+            ("cosmos_requests_total", "Cosmos DB calls by route", "calls"),
+            (
+                "cosmos_request_charge_total",
+                "Cosmos DB request units consumed by route",
+                "request_charge",
+            ),
+            (
+                "cosmos_throttle_retries_total",
+                "Cosmos DB calls retried after throttling by route",
+                "retries",
+            ),
+        )
+        lines = []
+        for name, help, field in counters:
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} counter")
+            for route, totals in sorted(self.by_route.items()):
+                value = getattr(totals, field)
+                lines.append(f"{name}{format_labels(('route',), (route,))} {value}")
+        return lines
+
+    def clear(self) -> None:
+        self.totals = UsageTotals()
+        self.by_route.clear()
+        self.by_operation.clear()
+        self.by_user.clear()
+
+
+class _UsageHook:
+    """``response_hook`` recording one Cosmos DB call, or each page of a query"""
+
+    __slots__ = (
+        "usage",
+        "operation",
+        "route",
+        "user_id",
+        "query",
+        "parameters",
+        "started",
+    )
+
+    def __init__(self, usage, operation, user_id, query=None, parameters=None):
+        self.usage = usage
+        self.operation = operation
+        self.route = route_template(request_scope.get())
+        self.user_id = user_id
+        self.query = query
+        self.parameters = parameters
+        self.started = time.perf_counter()
+
+    def __call__(self, headers, result) -> None:
+        # query_items also calls the hook with the pager itself before any
+        # page is fetched, carrying the previous call's headers
+        if hasattr(result, "by_page"):
+            return
+        now = time.perf_counter()
+        client_ms = (now - self.started) * 1000
+        self.started = now
+        self.usage.record(
+            self.operation,
+            self.route,
+            self.user_id,
+            headers,
+            client_ms,
+            self.query,
+            self.parameters,
+        )
+
+
+class InstrumentedContainer:
+    """Container proxy passing a usage-recording ``response_hook`` to each call.
+
+    Other attributes are forwarded to the wrapped container unchanged.
+    """
+
+    def __init__(self, container, usage: Optional[CosmosUsage] = None):
+        self._container = container
+        self._usage = usage or cosmos_usage
+
+    def __getattr__(self, name):
+        return getattr(self._container, name)
+
+    def _hook(self, operation: str, kwargs: dict, user_id=None, query=None):
+        if user_id is None:
+            user_id = kwargs.get("partition_key")
+        hook = _UsageHook(
+            self._usage, operation, user_id, query, kwargs.get("parameters")
+        )
+        caller_hook = kwargs.get("response_hook")
+        if caller_hook is None:
+            return hook
+
+        def both(headers, result):
+            hook(headers, result)
+            caller_hook(headers, result)
+
+        return both
+
+    async def read_item(self, item, partition_key, **kwargs):
+        kwargs["response_hook"] = self._hook("read_item", kwargs, partition_key)
+        return await self._container.read_item(item, partition_key, **kwargs)
+
+    async def create_item(self, body, **kwargs):
+        kwargs["response_hook"] = self._hook("create_item", kwargs, body.get("user_id"))
+        return await self._container.create_item(body, **kwargs)
+
+    async def upsert_item(self, body, **kwargs):
+        kwargs["response_hook"] = self._hook("upsert_item", kwargs, body.get("user_id"))
+        return await self._container.upsert_item(body, **kwargs)
+
+    async def replace_item(self, item, body, **kwargs):
+        kwargs["response_hook"] = self._hook(
+            "replace_item", kwargs, body.get("user_id")
+        )
+        return await self._container.replace_item(item, body, **kwargs)
+
+    async def patch_item(self, item, partition_key, patch_operations, **kwargs):
+        kwargs["response_hook"] = self._hook("patch_item", kwargs, partition_key)
+        return await self._container.patch_item(
+            item, partition_key, patch_operations, **kwargs
+        )
+
+    async def delete_item(self, item, partition_key, **kwargs):
+        kwargs["response_hook"] = self._hook("delete_item", kwargs, partition_key)
+        return await self._container.delete_item(item, partition_key, **kwargs)
+
+    async def execute_item_batch(self, batch_operations, partition_key, **kwargs):
+        kwargs["response_hook"] = self._hook(
+            "execute_item_batch", kwargs, partition_key
+        )
+        return await self._container.execute_item_batch(
+            batch_operations, partition_key, **kwargs
+        )
+
+    def query_items(self, query, **kwargs):
+        kwargs["response_hook"] = self._hook("query_items", kwargs, query=query)
+        return self._container.query_items(query, **kwargs)
+
+
+# Global instance
+cosmos_usage = CosmosUsage(
+    slow_request_charge=settings.cosmos_slow_query_ru,
+    slow_ms=settings.cosmos_slow_query_ms,
+    max_users=settings.cosmos_usage_max_users,
+)
@@ -1,48 +1,238 @@
+import asyncio
 import logging
-
-from azure.core.exceptions import (
-    AzureError,
-    ClientAuthenticationError,
-    HttpResponseError,
-    ResourceNotFoundError,
-    ServiceRequestError,
-)
-from azure.cosmos import CosmosClient, PartitionKey, exceptions
-from azure.identity import DefaultAzureCredential
+import time
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
 
 from backend.config import settings
+from backend.cosmos_usage import InstrumentedContainer
+
+# The Azure SDKs are imported on first use, so development mode (no Cosmos DB
+# endpoint) and test collection never load them
+if TYPE_CHECKING:
+    from azure.core.credentials import AccessToken
+    from azure.core.pipeline.transport import AioHttpTransport
+    from azure.cosmos.aio import CosmosClient
 
 logger = logging.getLogger(__name__)
 
+# Refresh a cached token this many seconds before it expires
+TOKEN_REFRESH_MARGIN = 300
+
+# Longest pause between background connection attempts in fast-start mode
+WARM_UP_MAX_DELAY = 30
+
+
+def cosmos_exceptions():
+    """Return the ``azure.cosmos.exceptions`` module, importing it on first use"""
+    from azure.cosmos import exceptions
+
+    return exceptions
+
+
+def _authentication_errors() -> tuple:
+    """Errors that make the managed identity path fall back to the key"""
+    from azure.core.exceptions import AzureError, ClientAuthenticationError
+
+    return ClientAuthenticationError, AzureError
+
+
+def _default_credential() -> "CachedTokenCredential":
+    from azure.identity.aio import DefaultAzureCredential
+
+    return CachedTokenCredential(DefaultAzureCredential())
+
+
+class CachedTokenCredential:
+    """Async credential wrapper that reuses a token until shortly before expiry.
+
+    Every client built on it shares one token per scope, and concurrent
+    callers wait for a single fetch instead of each walking the underlying
+    credential chain.
+    """
+
+    def __init__(self, credential, refresh_margin: float = TOKEN_REFRESH_MARGIN):
+        self.credential = credential
+        self.refresh_margin = refresh_margin
+        self._tokens: Dict[Tuple[str, ...], "AccessToken"] = {}
+        self._lock = asyncio.Lock()
+
+    def _cached(self, scopes: Tuple[str, ...]) -> Optional["AccessToken"]:
+        token = self._tokens.get(scopes)
+        if token is not None and token.expires_on - self.refresh_margin > time.time():
+            return token
+        return None
+
+    async def get_token(self, *scopes: str, **kwargs) -> "AccessToken":
+        if kwargs.get("claims"):
+            # A claims challenge needs a fresh token
+            token = await self.credential.get_token(*scopes, **kwargs)
+            self._tokens[scopes] = token
+            return token
+        token = self._cached(scopes)
+        if token is not None:
+            return token
+        async with self._lock:
+            token = self._cached(scopes)
+            if token is None:
+                token = await self.credential.get_token(*scopes, **kwargs)
+                self._tokens[scopes] = token
+            return token
+
+    async def close(self) -> None:
+        await self.credential.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.close()
+
 
 class CosmosDBClient:
     def __init__(self):
         self.client = None
         self.database = None
         self.container = None
+        self.credential = None
+        self.session = None
+        # True once initialize() has run; ready once the database is reachable
+        self.initialized = False
+        self.ready = False
+        self._init_lock = asyncio.Lock()
+        self._warm_up_task: Optional[asyncio.Task] = None
+
+    def _create_transport(self) -> "AioHttpTransport":
+        """Create the pooled HTTP transport shared by every Cosmos DB request"""
+        import aiohttp
+        from azure.core.pipeline.transport import AioHttpTransport
+
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=settings.cosmos_pool_size,
+                limit_per_host=settings.cosmos_pool_size,
+                keepalive_timeout=settings.cosmos_keepalive_timeout,
+            )
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(
+                    connect=settings.cosmos_connection_timeout,
+                    sock_read=settings.cosmos_read_timeout,
+                ),
+            )
+        # The session is owned by this class so it survives a client swap
+        return AioHttpTransport(session=self.session, session_owner=False)
+
+    def _create_client(self, credential) -> "CosmosClient":
+        """Create a client on the shared transport without any network call"""
+        from azure.cosmos.aio import CosmosClient
+
+        return CosmosClient(
+            settings.cosmos_endpoint,
+            credential,
+            transport=self._create_transport(),
+            connection_timeout=settings.cosmos_connection_timeout,
+        )
+
+    def _use_client(self, client: "CosmosClient") -> None:
+        """Point the database and container proxies at a client"""
+        self.client = client
+        self.database = client.get_database_client(settings.cosmos_database_name)
+        self.container = InstrumentedContainer(
+            self.database.get_container_client(settings.cosmos_container_name)
+        )
+
+    async def _connect(self, credential) -> "CosmosClient":
+        """Create a client on the shared transport and verify connectivity"""
+        client = self._create_client(credential)
+        try:
+            # Entering the client fetches the database account, which is the
+            # lightweight connectivity and authentication check
+            await client.__aenter__()
+        except Exception:
+            await client.close()
+            raise
+        return client
 
     async def initialize(self):
         """Initialize the Cosmos DB client and create database/container if they don't exist"""
-        try:
+        async with self._init_lock:
+            if self.initialized:
+                return
             if not settings.cosmos_endpoint:
                 logger.warning("Cosmos DB endpoint not provided. Using mock database.")
+                self.initialized = self.ready = True
+                return
+            if settings.cosmos_fast_start:
+                self._fast_start()
+            else:
+                await self._initialize_resources()
+                self.ready = True
+            self.initialized = True
+
+    def _fast_start(self) -> None:
+        """Build the clients without network calls and warm up in the background.
+
+        The database and container are assumed to exist. Authentication and
+        the first connection happen in :meth:`_warm_up`, which flips
+        ``ready`` when the database is reachable.
+        """
+        logger.info("Fast start: assuming the Cosmos DB database and container exist")
+        self.credential = _default_credential()
+        self._use_client(self._create_client(self.credential))
+        self._warm_up_task = asyncio.create_task(self._warm_up())
+
+    async def _warm_up(self) -> None:
+        """Open the connection in the background, retrying with backoff"""
+        delay = 1.0
+        while True:
+            try:
+                await self._open_connection()
+                self.ready = True
+                logger.info("Cosmos DB connection warmed up")
                 return
+            except Exception as e:
+                logger.error(f"Error warming up Cosmos DB connection: {str(e)}")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, WARM_UP_MAX_DELAY)
+
+    async def _open_connection(self) -> None:
+        """Authenticate and fetch the database account, falling back to the key"""
+        try:
+            # Entering the client fetches the database account
+            await self.client.__aenter__()
+        except _authentication_errors() as managed_identity_error:
+            if self.credential is None or not settings.cosmos_key:
+                raise
+            logger.warning(
+                f"Managed identity authentication failed: {managed_identity_error}"
+            )
+            logger.info("Falling back to cosmos key authentication...")
+            # Switch before connecting so that retries stay on the key
+            identity_client, credential = self.client, self.credential
+            self._use_client(self._create_client(settings.cosmos_key))
+            self.credential = None
+            await identity_client.close()
+            await credential.close()
+            await self.client.__aenter__()
 
+    async def _initialize_resources(self) -> None:
+        """Connect, then create the database and container if they don't exist"""
+        from azure.cosmos import PartitionKey
+
+        try:
             # Try managed identity first
             try:
                 logger.info("Attempting to connect using managed identity...")
-                credential = DefaultAzureCredential()
-                self.client = CosmosClient(settings.cosmos_endpoint, credential)
-
-                # Test the connection by attempting to list databases
-                # Test the connection by attempting to get database account info (lightweight connectivity check)
-                self.client.get_database_account()
+                self.credential = _default_credential()
+                self.client = await self._connect(self.credential)
                 logger.info("Successfully connected using managed identity")
 
-            except (ClientAuthenticationError, AzureError) as managed_identity_error:
+            except _authentication_errors() as managed_identity_error:
                 logger.warning(
                     f"Managed identity authentication failed: {managed_identity_error}"
                 )
+                await self.credential.close()
+                self.credential = None
 
                 # Fall back to cosmos key authentication
                 if not settings.cosmos_key:
@@ -55,39 +245,59 @@ class CosmosDBClient:
                     )
 
                 logger.info("Falling back to cosmos key authentication...")
-                self.client = CosmosClient(
-                    settings.cosmos_endpoint, settings.cosmos_key
-                )
+                self.client = await self._connect(settings.cosmos_key)
                 logger.info("Successfully connected using cosmos key")
 
             # Create database if it doesn't exist
             try:
-                self.database = self.client.create_database_if_not_exists(
+                self.database = await self.client.create_database_if_not_exists(
                     id=settings.cosmos_database_name
                 )
-            except exceptions.CosmosResourceExistsError:
+            except cosmos_exceptions().CosmosResourceExistsError:
                 self.database = self.client.get_database_client(
                     settings.cosmos_database_name
                 )
 
             # Create container if it doesn't exist
             try:
-                self.container = self.database.create_container_if_not_exists(
+                self.container = await self.database.create_container_if_not_exists(
                     id=settings.cosmos_container_name,
                     partition_key=PartitionKey(path="/user_id"),
                     offer_throughput=400,
                 )
-            except exceptions.CosmosResourceExistsError:
+            except cosmos_exceptions().CosmosResourceExistsError:
                 self.container = self.database.get_container_client(
                     settings.cosmos_container_name
                 )
+            self.container = InstrumentedContainer(self.container)
 
             logger.info("Cosmos DB initialized successfully")
 
         except Exception as e:
             logger.error(f"Error initializing Cosmos DB: {str(e)}")
+            await self.close()
             raise
 
+    async def close(self):
+        """Close the Cosmos DB client, credential and pooled HTTP session"""
+        if self._warm_up_task is not None and not self._warm_up_task.done():
+            self._warm_up_task.cancel()
+        self._warm_up_task = None
+        if self.client is not None:
+            await self.client.close()
+        if self.credential is not None:
+            await self.credential.close()
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+
+        self.client = None
+        self.database = None
+        self.container = None
+        self.credential = None
+        self.session = None
+        self.initialized = False
+        self.ready = False
+
     def get_container(self):
         """Get the container client"""
         if not self.container:
@@ -101,7 +311,7 @@ cosmos_client = CosmosDBClient()
 
 async def get_database():
     """Dependency to get database client"""
-    if not cosmos_client.container:
+    if not cosmos_client.initialized:
         await cosmos_client.initialize()
     # Return None if no container is available (development mode)
     return cosmos_client.container
@@ -0,0 +1,152 @@
+from typing import AsyncIterable, Callable, Dict, List, Optional, Set
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from backend.config import settings
+from backend.indexes import UserIndexes
+
+# Query parameters that only track where a click came from
+TRACKING_PARAMETERS = frozenset(
+    {
+        "fbclid",
+        "gclid",
+        "dclid",
+        "msclkid",
+        "mc_cid",
+        "mc_eid",
+        "igshid",
+        "yclid",
+        "_ga",
+        "_hsenc",
+        "_hsmi",
+        "ref_src",
+    }
+)
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def _is_tracking(name: str) -> bool:
+    name = name.lower()
+    return name.startswith("utm_") or name in TRACKING_PARAMETERS
+
+
+def normalize_url(url: str) -> str:
+    """Key under which two URLs for the same page compare equal.
+
+    Scheme and host are lowercased, default ports, trailing slashes,
+    tracking parameters and the fragment are dropped. Other query
+    parameters keep their order.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").rstrip(".")
+    if ":" in host:
+        host = f"[{host}]"
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    if port is not None and port != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{port}"
+    path = parts.path.rstrip("/")
+    query = urlencode(
+        [
+            (name, value)
+            for name, value in parse_qsl(parts.query, keep_blank_values=True)
+            if not _is_tracking(name)
+        ]
+    )
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+class _UserUrls:
+    """Bookmark ids by normalized URL over one user's bookmarks"""
+
+    def __init__(self):
+        # bookmark_id -> normalized URL as last indexed
+        self.doc_urls: Dict[str, str] = {}
+        self.by_url: Dict[str, List[str]] = {}
+        # Normalized URLs held by more than one bookmark
+        self.duplicated: Set[str] = set()
+
+    def add(self, doc: dict) -> None:
+        bookmark_id = doc["id"]
+        self.remove(bookmark_id)
+        url = normalize_url(doc["url"])
+        self.doc_urls[bookmark_id] = url
+        ids = self.by_url.setdefault(url, [])
+        ids.append(bookmark_id)
+        if len(ids) > 1:
+            self.duplicated.add(url)
+
+    def remove(self, bookmark_id: str) -> None:
+        url = self.doc_urls.pop(bookmark_id, None)
+        if url is None:
+            return
+        ids = self.by_url[url]
+        ids.remove(bookmark_id)
+        if not ids:
+            del self.by_url[url]
+        if len(ids) < 2:
+            self.duplicated.discard(url)
+
+    def find(self, url: str, exclude: Optional[str] = None) -> Optional[str]:
+        """ID of a bookmark with the same normalized URL, or None"""
+        for bookmark_id in self.by_url.get(normalize_url(url), ()):
+            if bookmark_id != exclude:
+                return bookmark_id
+        return None
+
+    def clusters(self) -> List[dict]:
+        """Groups of bookmarks sharing a URL, largest first"""
+        clusters = [
+            {"url": url, "bookmark_ids": list(self.by_url[url])}
+            for url in self.duplicated
+        ]
+        clusters.sort(
+            key=lambda cluster: (-len(cluster["bookmark_ids"]), cluster["url"])
+        )
+        return clusters
+
+
+class DuplicateIndex(UserIndexes):
+    """Per-user index of bookmarks by normalized URL.
+
+    Finding the bookmarks that share a URL is a dict lookup, and the URLs
+    held by several bookmarks are tracked as they appear, so duplicate
+    clusters are reported without reading any bookmark documents. A user's
+    index is built from storage whenever it is asked for and not loaded, and
+    then kept current by the service's write paths rather than rebuilt.
+
+    The index is per process: a bookmark written through another process
+    is not seen until the user's index is dropped and rebuilt, so two
+    processes can each accept the same URL.
+    """
+
+    def _new_index(self) -> _UserUrls:
+        return _UserUrls()
+
+    async def find(
+        self,
+        user_id: str,
+        url: str,
+        docs: Callable[[], AsyncIterable[dict]],
+        exclude: Optional[str] = None,
+    ) -> Optional[str]:
+        """ID of a bookmark of the user with the same normalized URL, or None.
+
+        The user's index is built from ``docs()`` first if it is not loaded.
+        """
+        index = await self.loaded(user_id, docs)
+        return index.find(url, exclude)
+
+    async def clusters(
+        self, user_id: str, docs: Callable[[], AsyncIterable[dict]]
+    ) -> List[dict]:
+        """Groups of the user's bookmarks sharing a URL, largest first"""
+        index = await self.loaded(user_id, docs)
+        return index.clusters()
+
+
+# Global instance
+duplicate_index = DuplicateIndex(max_users=settings.duplicate_index_max_users)
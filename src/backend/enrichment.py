@@ -0,0 +1,292 @@
+"""Background fetching of page titles, descriptions and favicons"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from html.parser import HTMLParser
+from typing import Awaitable, Callable, Dict, List, Optional
+from urllib.parse import urljoin, urlsplit
+
+import httpx
+
+from backend.config import settings
+from backend.metrics import Gauge, Histogram
+from backend.outbound import guarded_transport
+
+logger = logging.getLogger(__name__)
+
+# Bytes of a page read at most while looking for the end of its <head>
+MAX_HEAD_BYTES = 64 * 1024
+
+# Domains whose favicon is remembered
+FAVICON_CACHE_SIZE = 10000
+
+USER_AGENT = "BookmarksMetadataFetcher/1.0"
+
+# Meta tags read, by name or property
+_DESCRIPTION_META = ("description", "og:description")
+_TITLE_META = ("og:title",)
+
+# Called with (user_id, bookmark_id, metadata) once a page has been read
+ApplyMetadata = Callable[[str, str, dict], Awaitable[object]]
+
+
+class _HeadParser(HTMLParser):
+    """Collects the title, meta tags and icon links of a page's <head>"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title: List[str] = []
+        self.meta: dict = {}
+        self.icons: List[str] = []
+        self.done = False
+        self._in_title = False
+        self._titles = 0
+
+    def handle_starttag(self, tag, attrs):
+        if self.done:
+            return
+        attributes = {name: value or "" for name, value in attrs}
+        if tag == "title":
+            self._in_title = True
+            self._titles += 1
+        elif tag == "meta":
+            key = (attributes.get("name") or attributes.get("property") or "").lower()
+            if key and attributes.get("content"):
+                self.meta.setdefault(key, attributes["content"])
+        elif tag == "link":
+            rel = attributes.get("rel", "").lower().split()
+            if "icon" in rel and attributes.get("href"):
+                self.icons.append(attributes["href"])
+        elif tag == "body":
+            self.done = True
+
+    def handle_endtag(self, tag):
+        if tag == "title":
+            self._in_title = False
+        elif tag == "head":
+            self.done = True
+
+    def handle_data(self, data):
+        if self._in_title and self._titles == 1 and not self.done:
+            self.title.append(data)
+
+
+def _clean(text: Optional[str]) -> Optional[str]:
+    text = " ".join((text or "").split())
+    return text or None
+
+
+def parse_head(html: str, base_url: str) -> dict:
+    """Title, description and icon URL of an HTML page, each None if absent"""
+    parser = _HeadParser()
+    parser.feed(html)
+    title = _clean("".join(parser.title))
+    for key in _TITLE_META:
+        title = title or _clean(parser.meta.get(key))
+    description = None
+    for key in _DESCRIPTION_META:
+        description = description or _clean(parser.meta.get(key))
+    favicon = urljoin(base_url, parser.icons[0]) if parser.icons else None
+    return {"title": title, "description": description, "favicon_url": favicon}
+
+
+class MetadataEnricher:
+    """Fills in the title, description and favicon of new bookmarks.
+
+    Creating a bookmark only queues its URL; ``workers`` background tasks
+    take URLs off a queue of at most ``queue_size`` and read the page's
+    ``<head>`` over a shared, pooled HTTP client, stopping after
+    ``MAX_HEAD_BYTES`` or at ``</head>``. What was found is handed to the
+    ``apply`` callback given with the URL. A page without an icon link gets
+    its site's ``/favicon.ico`` when that exists, looked up once per domain
+    and remembered.
+
+    When the queue is full new URLs are dropped rather than slowing down
+    bookmark creation. Pages and favicons on addresses that are not public
+    are not fetched, redirects included, unless ``allow_private`` is set.
+    """
+
+    def __init__(
+        self,
+        workers: int = 8,
+        queue_size: int = 1000,
+        timeout: float = 5.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        allow_private: bool = False,
+    ):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.allow_private = allow_private
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks: List[asyncio.Task] = []
+        # scheme://host -> favicon URL, or None when the site has none
+        self._favicons: "OrderedDict[str, Optional[str]]" = OrderedDict()
+        # scheme://host -> lookup in progress, shared by pages of the site
+        self._lookups: Dict[str, asyncio.Task] = {}
+        self.dropped = 0
+        self.duration = Histogram(
+            "metadata_enrichment_duration_seconds",
+            "Metadata fetch latency, from queueing to saving, by result",
+            ("result",),
+        )
+        self.depth = Gauge(
+            "metadata_enrichment_queue_depth", "Bookmarks waiting for their metadata"
+        )
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                transport=guarded_transport(self._transport, self.allow_private),
+                limits=httpx.Limits(
+                    max_connections=self.workers,
+                    max_keepalive_connections=self.workers,
+                ),
+                timeout=self.timeout,
+                follow_redirects=True,
+                headers={"User-Agent": USER_AGENT},
+                # Proxies taken from the environment would bypass the guard
+                trust_env=self.allow_private,
+            )
+        return self._client
+
+    def _start(self) -> asyncio.Queue:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Tasks and a client bound to another event loop cannot be reused
+            self._loop = loop
+            self._client = None
+            self._lookups = {}
+            self._queue = asyncio.Queue(self.queue_size)
+            self._tasks = [
+                asyncio.create_task(self._work()) for _ in range(self.workers)
+            ]
+        return self._queue
+
+    def enqueue(
+        self, user_id: str, bookmark_id: str, url: str, apply: ApplyMetadata
+    ) -> bool:
+        """Queue a bookmark's URL; False when the queue is full and it was dropped"""
+        queue = self._start()
+        try:
+            queue.put_nowait((user_id, bookmark_id, url, apply, time.perf_counter()))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.warning(f"Metadata queue full, not enriching bookmark {bookmark_id}")
+            return False
+        return True
+
+    async def join(self) -> None:
+        """Wait until every queued bookmark has been handled"""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def _work(self) -> None:
+        queue = self._queue
+        while True:
+            user_id, bookmark_id, url, apply, queued = await queue.get()
+            result = "ok"
+            try:
+                metadata = await self.fetch(url)
+                await apply(user_id, bookmark_id, metadata)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                result = "failed"
+                logger.debug(f"Fetching metadata of {url} failed: {e!r}")
+            finally:
+                queue.task_done()
+            self.duration.observe((result,), time.perf_counter() - queued)
+
+    async def fetch(self, url: str) -> dict:
+        """Read a page's head and return its title, description and favicon URL"""
+        client = self._get_client()
+        head = bytearray()
+        async with client.stream("GET", url) as response:
+            response.raise_for_status()
+            page_url = str(response.url)
+            if "html" in response.headers.get("Content-Type", "text/html"):
+                async for chunk in response.aiter_bytes():
+                    # Look a few bytes back in case </head> spans two chunks
+                    start = max(0, len(head) - 6)
+                    head += chunk
+                    if len(head) >= MAX_HEAD_BYTES:
+                        break
+                    if b"</head>" in head[start:].lower():
+                        break
+            encoding = response.charset_encoding or "utf-8"
+        html = bytes(head[:MAX_HEAD_BYTES]).decode(encoding, errors="replace")
+        metadata = parse_head(html, page_url)
+        if metadata["favicon_url"] is None:
+            metadata["favicon_url"] = await self._site_favicon(page_url)
+        return metadata
+
+    async def _site_favicon(self, page_url: str) -> Optional[str]:
+        """The site's /favicon.ico if it has one, looked up once per domain"""
+        parts = urlsplit(page_url)
+        site = f"{parts.scheme}://{parts.netloc.lower()}"
+        if site in self._favicons:
+            self._favicons.move_to_end(site)
+            return self._favicons[site]
+        lookup = self._lookups.get(site)
+        if lookup is None:
+            lookup = self._lookups[site] = asyncio.create_task(
+                self._lookup_favicon(site)
+            )
+            lookup.add_done_callback(lambda _: self._lookups.pop(site, None))
+        return await asyncio.shield(lookup)
+
+    async def _lookup_favicon(self, site: str) -> Optional[str]:
+        favicon = f"{site}/favicon.ico"
+        try:
+            response = await self._get_client().head(favicon)
+            if response.status_code >= 400:
+                favicon = None
+        except httpx.HTTPError:
+            favicon = None
+        self._favicons[site] = favicon
+        if len(self._favicons) > FAVICON_CACHE_SIZE:
+            self._favicons.popitem(last=False)
+        return favicon
+
+    def render(self) -> List[str]:
+        """Queue depth, fetch latency and counts by result, and dropped URLs"""
+        self.depth.value = self._queue.qsize() if self._queue is not None else 0
+        name = "metadata_enrichment_dropped_total"
+        lines = self.duration.render() + self.depth.render()
+        lines.extend(
+            [
+                f"# HELP {name} Bookmarks not enriched because the queue was full",
+                f"# TYPE {name} counter",
+                f"{name} {self.dropped}",
+            ]
+        )
+        return lines
+
+    async def close(self) -> None:
+        """Stop the workers, dropping queued URLs, and close the HTTP client"""
+        tasks = self._tasks + list(self._lookups.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+        self._lookups = {}
+        self._loop = None
+        self._queue = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+# Global instance
+metadata_enricher = MetadataEnricher(
+    workers=settings.metadata_enrichment_workers,
+    queue_size=settings.metadata_enrichment_queue_size,
+    timeout=settings.metadata_enrichment_timeout_seconds,
+    allow_private=settings.allow_private_urls,
+)
@@ -0,0 +1,81 @@
+from collections import Counter
+from typing import Dict, Optional, Tuple
+
+from backend.config import settings
+from backend.indexes import UserIndexes
+
+
+class _UserFacets:
+    """Category and tag counts over one user's bookmarks"""
+
+    def __init__(self):
+        # bookmark_id -> (category, tags) as last counted
+        self.doc_facets: Dict[str, Tuple[str, Tuple[str, ...]]] = {}
+        self.categories: Counter = Counter()
+        self.tags: Counter = Counter()
+
+    def add(self, doc: dict) -> None:
+        bookmark_id = doc["id"]
+        self.remove(bookmark_id)
+        category = doc.get("category")
+        tags = tuple(set(doc.get("tags") or ()))
+        self.doc_facets[bookmark_id] = (category, tags)
+        self.categories[category] += 1
+        self.tags.update(tags)
+
+    def remove(self, bookmark_id: str) -> None:
+        facets = self.doc_facets.pop(bookmark_id, None)
+        if facets is None:
+            return
+        category, tags = facets
+        self.categories[category] -= 1
+        if not self.categories[category]:
+            del self.categories[category]
+        for tag in tags:
+            self.tags[tag] -= 1
+            if not self.tags[tag]:
+                del self.tags[tag]
+
+
+class FacetIndex(UserIndexes):
+    """Per-user counts of bookmarks by category and by tag.
+
+    Counts are adjusted on every create, update and delete, so sidebars and
+    tag clouds are served without reading any bookmark documents. Each
+    bookmark's last counted category and tags are kept so an update can move
+    it between facets. Writes made through other processes are only counted
+    once a user's counts reach ``max_age`` and are rebuilt.
+    """
+
+    def _new_index(self) -> _UserFacets:
+        return _UserFacets()
+
+    def count(self, user_id: str, category: Optional[str] = None) -> Optional[int]:
+        """Number of the user's bookmarks, optionally in one category.
+
+        None when the user's counts are not loaded.
+        """
+        index = self._get(user_id)
+        if index is None:
+            return None
+        if category:
+            return index.categories.get(category, 0)
+        return len(index.doc_facets)
+
+    def facets(self, user_id: str) -> Optional[dict]:
+        """Return ``{"total", "categories", "tags"}`` counts, or None if not loaded"""
+        index = self._get(user_id)
+        if index is None:
+            return None
+        return {
+            "total": len(index.doc_facets),
+            "categories": dict(index.categories),
+            "tags": dict(index.tags),
+        }
+
+
+# Global instance
+facet_index = FacetIndex(
+    max_users=settings.facet_index_max_users,
+    max_age=settings.facet_index_max_age_seconds,
+)
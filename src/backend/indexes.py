@@ -0,0 +1,134 @@
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import AsyncIterable, Callable, Dict, List, Optional, Tuple
+
+
+class UserIndexes(ABC):
+    """In-process per-user indexes derived from the stored bookmarks.
+
+    A user's index is built from storage the first time it is needed and
+    then kept current by the service's write paths. Writes that arrive while
+    an index is being built are replayed once the build finishes. The least
+    recently used users are dropped beyond ``max_users`` and rebuilt on
+    demand.
+
+    Only writes made through this process reach an index. With ``max_age``
+    set, an index is also rebuilt once it is that many seconds old, which
+    bounds how long writes made through other processes go unseen.
+
+    Subclasses implement :meth:`_new_index`; the per-user index must provide
+    ``add(doc)`` and ``remove(bookmark_id)``.
+    """
+
+    def __init__(self, max_users: int = 1000, max_age: Optional[float] = None):
+        self.max_users = max_users
+        self.max_age = max_age
+        self._users: "OrderedDict[str, object]" = OrderedDict()
+        # user_id -> time.monotonic() when the index was built
+        self._built_at: Dict[str, float] = {}
+        self._pending: Dict[str, List[Tuple[str, object]]] = {}
+        self._loaded_events: Dict[str, asyncio.Event] = {}
+
+    @abstractmethod
+    def _new_index(self):
+        """Return an empty index for one user"""
+
+    def is_loaded(self, user_id: str) -> bool:
+        if user_id not in self._users:
+            return False
+        if self.max_age is not None:
+            if time.monotonic() - self._built_at[user_id] > self.max_age:
+                self.drop(user_id)
+                return False
+        return True
+
+    async def load(self, user_id: str, docs: AsyncIterable[dict]) -> Optional[object]:
+        """Build a user's index from their stored bookmarks.
+
+        Returns the index, or None when it was dropped while it was built or
+        another request's build is not available any more.
+        """
+        if self.is_loaded(user_id):
+            return self._get(user_id)
+        if user_id in self._pending:
+            # Another request is already building this index
+            await self._loaded_events[user_id].wait()
+            return self._users.get(user_id)
+
+        self._pending[user_id] = []
+        self._loaded_events[user_id] = asyncio.Event()
+        built_at = time.monotonic()
+        index = self._new_index()
+        try:
+            async for doc in docs:
+                index.add(doc)
+            dropped = False
+            for operation, value in self._pending[user_id]:
+                if operation == "add":
+                    index.add(value)
+                elif operation == "remove":
+                    index.remove(value)
+                else:
+                    dropped = True
+            # An index dropped while it was built may have missed changes
+            if dropped:
+                return None
+            self._users[user_id] = index
+            self._built_at[user_id] = built_at
+            while len(self._users) > self.max_users:
+                evicted, _ = self._users.popitem(last=False)
+                del self._built_at[evicted]
+            return index
+        finally:
+            del self._pending[user_id]
+            self._loaded_events.pop(user_id).set()
+
+    async def loaded(
+        self, user_id: str, docs: Callable[[], AsyncIterable[dict]]
+    ) -> object:
+        """Return a user's index, building it from ``docs()`` if it is not loaded.
+
+        Never None: an index dropped while it was built is built again.
+        """
+        while True:
+            index = await self.load(user_id, docs())
+            if index is not None:
+                return index
+
+    def add(self, doc: dict) -> None:
+        """Index a created or updated bookmark"""
+        user_id = doc["user_id"]
+        if user_id in self._pending:
+            self._pending[user_id].append(("add", doc))
+        elif user_id in self._users:
+            self._users[user_id].add(doc)
+
+    def remove(self, user_id: str, bookmark_id: str) -> None:
+        """Drop a deleted bookmark from the index"""
+        if user_id in self._pending:
+            self._pending[user_id].append(("remove", bookmark_id))
+        elif user_id in self._users:
+            self._users[user_id].remove(bookmark_id)
+
+    def drop(self, user_id: str) -> None:
+        """Forget a user's index so it is rebuilt from storage when next needed"""
+        if user_id in self._pending:
+            self._pending[user_id].append(("drop", None))
+        self._users.pop(user_id, None)
+        self._built_at.pop(user_id, None)
+
+    def _get(self, user_id: str) -> Optional[object]:
+        """Return a loaded user's index and mark it recently used"""
+        if not self.is_loaded(user_id):
+            return None
+        self._users.move_to_end(user_id)
+        return self._users[user_id]
+
+    def clear(self) -> None:
+        """Forget every user's index, including those being built"""
+        for pending in self._pending.values():
+            pending.append(("drop", None))
+        self._users.clear()
+        self._built_at.clear()
@@ -0,0 +1,338 @@
+"""Background checks of bookmark URLs for dead links"""
+
+import asyncio
+import contextlib
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+from backend.config import settings
+from backend.metrics import Gauge, Histogram
+from backend.outbound import guarded_transport
+
+logger = logging.getLogger(__name__)
+
+LINK_OK = "ok"
+LINK_BROKEN = "broken"
+LINK_ERROR = "error"
+LINK_UNREACHABLE = "unreachable"
+
+# Statuses meaning the page is gone rather than temporarily failing
+BROKEN_STATUSES = frozenset({404, 410})
+
+# Results written back to storage per call
+RESULT_BATCH_SIZE = 100
+
+# Broken links listed on a job
+MAX_REPORTED_LINKS = 100
+
+# Finished jobs kept for their status
+MAX_FINISHED_JOBS = 1000
+
+USER_AGENT = "BookmarksLinkChecker/1.0"
+
+
+def classify(status_code: int) -> str:
+    """Link status of a final HTTP status code"""
+    if status_code < 400:
+        return LINK_OK
+    if status_code in BROKEN_STATUSES:
+        return LINK_BROKEN
+    return LINK_ERROR
+
+
+def _checked_at(doc: dict) -> Optional[datetime]:
+    checked_at = doc.get("link_checked_at")
+    if not checked_at:
+        return None
+    try:
+        return datetime.fromisoformat(checked_at)
+    except ValueError:
+        return None
+
+
+class LinkCheckJob:
+    """Progress of one user's link check run"""
+
+    def __init__(self, user_id: str, force: bool = False):
+        self.user_id = user_id
+        self.force = force
+        self.state = "running"
+        self.error: Optional[str] = None
+        self.started_at = datetime.utcnow()
+        self.finished_at: Optional[datetime] = None
+        self._started = time.perf_counter()
+        self._elapsed: Optional[float] = None
+        self.scanned = 0
+        self.skipped = 0
+        self.checked = 0
+        self.results = {
+            LINK_OK: 0,
+            LINK_BROKEN: 0,
+            LINK_ERROR: 0,
+            LINK_UNREACHABLE: 0,
+        }
+        self.broken: List[dict] = []
+
+    @property
+    def elapsed(self) -> float:
+        if self._elapsed is not None:
+            return self._elapsed
+        return time.perf_counter() - self._started
+
+    def record(self, bookmark_id: str, url: str, fields: dict) -> None:
+        self.checked += 1
+        self.results[fields["link_status"]] += 1
+        if fields["link_status"] != LINK_OK and len(self.broken) < MAX_REPORTED_LINKS:
+            self.broken.append(
+                {
+                    "id": bookmark_id,
+                    "url": url,
+                    "link_status": fields["link_status"],
+                    "link_status_code": fields["link_status_code"],
+                }
+            )
+
+    def finish(self, state: str, error: Optional[str] = None) -> None:
+        self.state = state
+        self.error = error
+        self.finished_at = datetime.utcnow()
+        self._elapsed = time.perf_counter() - self._started
+
+    def to_dict(self) -> dict:
+        elapsed = self.elapsed
+        return {
+            "user_id": self.user_id,
+            "state": self.state,
+            "error": self.error,
+            "started_at": self.started_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "elapsed_seconds": round(elapsed, 3),
+            "scanned": self.scanned,
+            "skipped": self.skipped,
+            "checked": self.checked,
+            "checks_per_second": round(self.checked / elapsed, 2) if elapsed else 0.0,
+            "results": dict(self.results),
+            "broken": list(self.broken),
+        }
+
+
+class LinkChecker:
+    """Checks bookmark URLs over a shared, pooled HTTP client.
+
+    At most ``concurrency`` requests are in flight overall and ``per_host``
+    to any one host, so a library full of links to one site does not hammer
+    it. Each URL gets a ``HEAD`` request, followed by a ``GET`` whose body is
+    never read when the server answers ``HEAD`` with an error, since many
+    servers reject or mishandle ``HEAD``. Redirects are followed. A URL
+    checked less than ``recheck_after`` ago is skipped, and a re-check sends
+    ``If-Modified-Since`` so unchanged pages can answer ``304``. Links on
+    addresses that are not public are reported unreachable without being
+    requested, redirects included, unless ``allow_private`` is set.
+
+    Runs are background jobs, one per user at a time, that stream the user's
+    bookmarks and write the results back in batches as they come in.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 50,
+        per_host: int = 2,
+        timeout: float = 10.0,
+        recheck_after: timedelta = timedelta(days=7),
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        allow_private: bool = False,
+    ):
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.timeout = timeout
+        self.recheck_after = recheck_after
+        self.allow_private = allow_private
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._slots = asyncio.Semaphore(concurrency)
+        # host -> [semaphore, checks holding or waiting for it]
+        self._hosts: Dict[str, list] = {}
+        self.jobs: Dict[str, LinkCheckJob] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self.duration = Histogram(
+            "link_check_duration_seconds",
+            "Link check latency by result",
+            ("result",),
+        )
+        self.in_flight = Gauge(
+            "link_checks_in_flight", "Link check requests currently being sent"
+        )
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                transport=guarded_transport(self._transport, self.allow_private),
+                limits=httpx.Limits(
+                    max_connections=self.concurrency,
+                    max_keepalive_connections=self.concurrency,
+                ),
+                timeout=self.timeout,
+                follow_redirects=True,
+                headers={"User-Agent": USER_AGENT},
+                # Proxies taken from the environment would bypass the guard
+                trust_env=self.allow_private,
+            )
+        return self._client
+
+    @contextlib.asynccontextmanager
+    async def _host_slot(self, host: str):
+        entry = self._hosts.get(host)
+        if entry is None:
+            entry = self._hosts[host] = [asyncio.Semaphore(self.per_host), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._hosts[host]
+
+    async def _status(self, method: str, url: str, headers: dict) -> int:
+        # Streamed so a GET fallback never downloads the page body
+        async with self._get_client().stream(method, url, headers=headers) as response:
+            return response.status_code
+
+    async def check(self, url: str, checked_at: Optional[datetime] = None) -> dict:
+        """Check one URL and return the link status fields to store"""
+        headers = {}
+        if checked_at is not None:
+            headers["If-Modified-Since"] = format_datetime(
+                checked_at.replace(tzinfo=timezone.utc), usegmt=True
+            )
+        status_code: Optional[int] = None
+        async with self._host_slot(urlsplit(url).netloc.lower()), self._slots:
+            self.in_flight.value += 1
+            started = time.perf_counter()
+            try:
+                status_code = await self._status("HEAD", url, headers)
+                if status_code >= 400 and status_code != 429:
+                    status_code = await self._status("GET", url, {})
+                link_status = classify(status_code)
+            except (httpx.HTTPError, httpx.InvalidURL) as e:
+                logger.debug(f"Link check of {url} failed: {e!r}")
+                link_status = LINK_UNREACHABLE
+            finally:
+                self.in_flight.value -= 1
+            self.duration.observe((link_status,), time.perf_counter() - started)
+        return {
+            "link_status": link_status,
+            "link_status_code": status_code,
+            "link_checked_at": datetime.utcnow().isoformat(),
+        }
+
+    def start(self, user_id: str, service, force: bool = False) -> LinkCheckJob:
+        """Start checking a user's bookmarks, or return the run in progress.
+
+        ``force`` re-checks links checked within ``recheck_after`` too.
+        """
+        task = self._tasks.get(user_id)
+        if task is not None and not task.done():
+            return self.jobs[user_id]
+        self.jobs.pop(user_id, None)
+        finished = [key for key, job in self.jobs.items() if job.state != "running"]
+        for key in finished[: max(0, len(finished) - MAX_FINISHED_JOBS + 1)]:
+            del self.jobs[key]
+            self._tasks.pop(key, None)
+        job = self.jobs[user_id] = LinkCheckJob(user_id, force)
+        self._tasks[user_id] = asyncio.create_task(self._run(job, service))
+        return job
+
+    def status(self, user_id: str) -> Optional[LinkCheckJob]:
+        """The user's current or last run, or None"""
+        return self.jobs.get(user_id)
+
+    async def wait(self, user_id: str) -> Optional[LinkCheckJob]:
+        """Wait for the user's run to finish"""
+        task = self._tasks.get(user_id)
+        if task is not None:
+            await asyncio.shield(task)
+        return self.jobs.get(user_id)
+
+    async def _run(self, job: LinkCheckJob, service) -> None:
+        cutoff = None if job.force else datetime.utcnow() - self.recheck_after
+        pending = set()
+        results: List[Tuple[str, dict]] = []
+
+        async def check(doc: dict) -> Tuple[str, str, dict]:
+            fields = await self.check(doc["url"], _checked_at(doc))
+            return doc["id"], doc["url"], fields
+
+        async def collect(done) -> None:
+            for task in done:
+                bookmark_id, url, fields = task.result()
+                job.record(bookmark_id, url, fields)
+                results.append((bookmark_id, fields))
+            if len(results) >= RESULT_BATCH_SIZE:
+                await service.set_link_status(job.user_id, results[:])
+                results.clear()
+
+        try:
+            async for doc in service.iter_link_targets(job.user_id):
+                job.scanned += 1
+                checked_at = _checked_at(doc)
+                if cutoff is not None and checked_at and checked_at > cutoff:
+                    job.skipped += 1
+                    continue
+                # Bound the checks waiting for a slot, not just those running
+                while len(pending) >= self.concurrency * 2:
+                    done, pending = await asyncio.wait(
+                        pending, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    await collect(done)
+                pending.add(asyncio.create_task(check(doc)))
+            while pending:
+                done, pending = await asyncio.wait(pending)
+                await collect(done)
+            if results:
+                await service.set_link_status(job.user_id, results)
+            job.finish("finished")
+            logger.info(
+                f"Checked {job.checked} links for {job.user_id} in "
+                f"{job.elapsed:.1f}s: {job.results}"
+            )
+        except asyncio.CancelledError:
+            job.finish("cancelled")
+            raise
+        except Exception as e:
+            logger.error(f"Link check for {job.user_id} failed: {str(e)}")
+            job.finish("failed", str(e))
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def render(self) -> List[str]:
+        """Check latency and counts by result, and requests in flight"""
+        return self.duration.render() + self.in_flight.render()
+
+    async def close(self) -> None:
+        """Cancel running jobs and close the HTTP client"""
+        tasks = [task for task in self._tasks.values() if not task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+# Global instance
+link_checker = LinkChecker(
+    concurrency=settings.link_check_concurrency,
+    per_host=settings.link_check_per_host,
+    timeout=settings.link_check_timeout_seconds,
+    recheck_after=timedelta(hours=settings.link_check_recheck_hours),
+    allow_private=settings.allow_private_urls,
+)
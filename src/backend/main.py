@@ -1,12 +1,19 @@
 import logging
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
+from backend.cache import bookmark_cache
 from backend.config import settings
+from backend.cosmos_usage import cosmos_usage
 from backend.database import cosmos_client
+from backend.enrichment import metadata_enricher
+from backend.link_checker import link_checker
+from backend.metrics import CONTENT_TYPE, MetricsMiddleware, metrics
 from backend.routers import bookmarks_router
+from backend.services import close_local_store, close_write_queue
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -31,6 +38,12 @@ async def lifespan(app: FastAPI):
 
     # Shutdown
     logger.info("Shutting down Bookmarks API...")
+    await link_checker.close()
+    await metadata_enricher.close()
+    await close_write_queue()
+    await cosmos_client.close()
+    await close_local_store()
+    await bookmark_cache.close()
 
 
 # Create FastAPI app
@@ -39,6 +52,7 @@ app = FastAPI(
     version=settings.app_version,
     description="A RESTful API for managing personal bookmarks with Azure Cosmos DB",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # Add CORS middleware
@@ -50,6 +64,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Time every request; added last so it wraps the other middleware
+app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(bookmarks_router, prefix="/api/v1")
 
@@ -66,15 +83,46 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
+    """Liveness check: the process is up, whatever the database state"""
     try:
         # Try to get database status
         container = cosmos_client.get_container() if cosmos_client.container else None
-        db_status = "connected" if container else "disconnected"
+        if not container:
+            db_status = "disconnected"
+        else:
+            db_status = "connected" if cosmos_client.ready else "connecting"
     except Exception:
         db_status = "error"
 
-    return {"status": "healthy", "database": db_status, "version": settings.app_version}
+    return {
+        "status": "healthy",
+        "database": db_status,
+        "ready": bool(cosmos_client.ready),
+        "cache": bookmark_cache.stats(),
+        "version": settings.app_version,
+    }
+
+
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness check: 503 until the database connection is warmed up"""
+    if not cosmos_client.ready:
+        raise HTTPException(status_code=503, detail="Database connection not ready")
+    return {"status": "ready"}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    """Request and service metrics in Prometheus text format"""
+    lines = cosmos_usage.render() + link_checker.render() + metadata_enricher.render()
+    content = metrics.render() + "\n".join(lines) + "\n"
+    return Response(content=content, media_type=CONTENT_TYPE)
+
+
+@app.get("/metrics/cosmos", include_in_schema=False)
+async def cosmos_usage_endpoint(top_users: int = Query(10, ge=0, le=1000)):
+    """Cosmos DB request units, durations and retries by route, operation and user"""
+    return cosmos_usage.snapshot(top_users=top_users)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,234 @@
+"""Request and service metrics in the Prometheus text exposition format"""
+
+import bisect
+import functools
+import inspect
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+# Starlette appends the charset
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    """Label set of a sample, ``{name="value",...}``, or "" without labels"""
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    """Latency histogram keyed by a fixed tuple of label values.
+
+    An observation finds its bucket with one bisect and bumps three numbers;
+    buckets are only made cumulative when the metrics are rendered.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        label_names: Sequence[str],
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        # label values -> [bucket counts..., +Inf count, sum]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, label_values: Tuple[str, ...], value: float) -> None:
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for label_values, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                labels = format_labels(self.label_names, label_values, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            cumulative += series[-2]
+            labels = format_labels(self.label_names, label_values, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = format_labels(self.label_names, label_values)
+            lines.append(f"{self.name}_sum{labels} {series[-1]}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+    def clear(self) -> None:
+        self._series.clear()
+
+
+class Gauge:
+    """A single value that goes up and down"""
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self.value = 0
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.help}",
+            f"# TYPE {self.name} gauge",
+            f"{self.name} {self.value}",
+        ]
+
+
+class MetricsRegistry:
+    """The metrics exposed by ``GET /metrics``"""
+
+    def __init__(self):
+        self.request_duration = Histogram(
+            "http_request_duration_seconds",
+            "HTTP request latency by method, route and status",
+            ("method", "route", "status"),
+        )
+        self.requests_in_flight = Gauge(
+            "http_requests_in_flight", "HTTP requests currently being served"
+        )
+        self.service_duration = Histogram(
+            "bookmark_service_duration_seconds",
+            "BookmarkService method latency by method and outcome",
+            ("method", "outcome"),
+        )
+
+    def render(self) -> str:
+        lines = []
+        for metric in (
+            self.request_duration,
+            self.requests_in_flight,
+            self.service_duration,
+        ):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def clear(self) -> None:
+        self.request_duration.clear()
+        self.service_duration.clear()
+
+
+# Global instance
+metrics = MetricsRegistry()
+
+# ASGI scope of the HTTP request being served, for work done on its behalf
+request_scope: ContextVar[Optional[dict]] = ContextVar("request_scope", default=None)
+
+# endpoint -> route template
+_route_paths: Dict[object, str] = {}
+
+
+def route_template(scope: Optional[dict]) -> str:
+    """Route template of a request (``/api/v1/bookmarks/{bookmark_id}``).
+
+    Labelling by template rather than raw path keeps the number of series
+    bounded. Requests that matched no route share ``unmatched``.
+    """
+    if scope is None:
+        return "background"
+    endpoint = scope.get("endpoint")
+    if endpoint is None:
+        return "unmatched"
+    path = _route_paths.get(endpoint)
+    if path is None:
+        for route in scope["app"].routes:
+            if getattr(route, "endpoint", None) is endpoint:
+                path = route.path
+                break
+        else:
+            path = "unmatched"
+        _route_paths[endpoint] = path
+    return path
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request by its route template.
+
+    The request's scope is published in :data:`request_scope` so work done
+    on its behalf, such as database calls, can be attributed to the route.
+    """
+
+    def __init__(self, app, registry: MetricsRegistry = metrics):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        in_flight = self.registry.requests_in_flight
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_flight.value += 1
+        token = request_scope.set(scope)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            in_flight.value -= 1
+            request_scope.reset(token)
+            self.registry.request_duration.observe(
+                (scope["method"], route_template(scope), str(status)),
+                time.perf_counter() - started,
+            )
+
+
+def _timed(name: str, method, histogram: Histogram):
+    ok, error = (name, "ok"), (name, "error")
+
+    @functools.wraps(method)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            result = await method(*args, **kwargs)
+        except BaseException:
+            histogram.observe(error, time.perf_counter() - started)
+            raise
+        histogram.observe(ok, time.perf_counter() - started)
+        return result
+
+    return wrapper
+
+
+def instrument(cls):
+    """Class decorator timing every public coroutine method into the registry"""
+    for name, method in list(vars(cls).items()):
+        if not name.startswith("_") and inspect.iscoroutinefunction(method):
+            setattr(cls, name, _timed(name, method, metrics.service_duration))
+    return cls
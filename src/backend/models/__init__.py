@@ -1,9 +1,23 @@
 from .bookmark import (
     Bookmark,
+    BookmarkBulkDelete,
+    BookmarkBulkResponse,
+    BookmarkBulkUpdate,
     BookmarkCategory,
     BookmarkCreate,
+    BookmarkFacetsResponse,
+    BookmarkImportError,
+    BookmarkImportResponse,
     BookmarkResponse,
+    BookmarkSearchResponse,
+    BookmarkSearchResult,
+    BookmarkSelection,
     BookmarksListResponse,
     BookmarkUpdate,
+    BrokenLink,
     CategoriesResponse,
+    DuplicateCluster,
+    DuplicatesResponse,
+    FacetCount,
+    LinkCheckResponse,
 )
@@ -1,8 +1,15 @@
 from datetime import datetime
 from enum import Enum
-from typing import List, Optional
+from typing import Dict, List, Optional
 
-from pydantic import BaseModel, Field, HttpUrl
+from pydantic import (
+    AliasChoices,
+    BaseModel,
+    Field,
+    HttpUrl,
+    model_validator,
+)
+from pydantic_core import Url
 
 
 class BookmarkCategory(str, Enum):
@@ -34,6 +41,12 @@ class BookmarkBase(BaseModel):
 
 
 class BookmarkCreate(BookmarkBase):
+    title: Optional[str] = Field(
+        None,
+        min_length=1,
+        max_length=200,
+        description="Title of the bookmark; taken from the page when omitted",
+    )
     user_id: str = Field(
         default="default_user", description="User ID for future multi-user support"
     )
@@ -60,9 +73,77 @@ class Bookmark(BookmarkBase):
     updated_at: datetime = Field(
         default_factory=datetime.utcnow, description="Last update timestamp"
     )
+    etag: Optional[str] = Field(
+        default=None,
+        validation_alias=AliasChoices("_etag", "etag"),
+        description="Version tag for If-Match on updates",
+    )
+    link_status: Optional[str] = Field(
+        default=None,
+        description="Last link check: ok, broken, error or unreachable",
+    )
+    link_status_code: Optional[int] = Field(
+        default=None, description="HTTP status returned by the last link check"
+    )
+    link_checked_at: Optional[datetime] = Field(
+        default=None, description="When the link was last checked"
+    )
+    favicon_url: Optional[str] = Field(
+        default=None, description="Icon of the bookmarked site, when found"
+    )
 
     model_config = {"from_attributes": True}
 
+    @classmethod
+    def from_document(cls, doc: dict):
+        """Build from a stored document without validating it again.
+
+        Stored documents were validated when they were written, so only the
+        types JSON cannot carry are restored and the model is filled in the
+        way ``model_construct`` does. Documents that do not have that shape
+        are validated normally.
+        """
+        try:
+            fields = {
+                "title": doc["title"],
+                "url": Url(doc["url"]),
+                "description": doc.get("description"),
+                "category": BookmarkCategory(doc.get("category") or "other"),
+                "tags": doc.get("tags") or [],
+                "id": doc["id"],
+                "user_id": doc["user_id"],
+                "created_at": datetime.fromisoformat(doc["created_at"]),
+                "updated_at": datetime.fromisoformat(doc["updated_at"]),
+                "etag": doc.get("_etag", doc.get("etag")),
+                "link_status": doc.get("link_status"),
+                "link_status_code": doc.get("link_status_code"),
+                "link_checked_at": (
+                    datetime.fromisoformat(doc["link_checked_at"])
+                    if doc.get("link_checked_at")
+                    else None
+                ),
+                "favicon_url": doc.get("favicon_url"),
+            }
+        except (KeyError, TypeError, ValueError):
+            return cls.model_validate(doc)
+        return cls.from_fields(fields)
+
+    @classmethod
+    def from_fields(cls, fields: dict):
+        """Build from every field, already of its declared type, unvalidated"""
+        bookmark = cls.__new__(cls)
+        object.__setattr__(bookmark, "__dict__", fields)
+        object.__setattr__(bookmark, "__pydantic_fields_set__", set(fields))
+        object.__setattr__(bookmark, "__pydantic_extra__", None)
+        object.__setattr__(bookmark, "__pydantic_private__", None)
+        return bookmark
+
+    def to_json_dict(self) -> dict:
+        """Fields as a dict orjson can encode, skipping pydantic serialization"""
+        fields = self.__dict__.copy()
+        fields["url"] = str(self.url)
+        return fields
+
 
 class BookmarkResponse(Bookmark):
     """Response model for bookmark operations"""
@@ -72,9 +153,120 @@ class BookmarkResponse(Bookmark):
 
 class BookmarksListResponse(BaseModel):
     bookmarks: List[BookmarkResponse]
-    total: int = Field(..., description="Total number of bookmarks")
+    total: Optional[int] = Field(
+        ..., description="Total number of bookmarks, null when include_total=false"
+    )
     page: int = Field(default=1, description="Current page number")
     page_size: int = Field(default=50, description="Number of items per page")
+    next_cursor: Optional[str] = Field(
+        default=None,
+        description="Opaque cursor for the next page, or null on the last page",
+    )
+
+
+class BookmarkSearchResult(BookmarkResponse):
+    score: float = Field(..., description="Relevance score (BM25)")
+
+
+class BookmarkSearchResponse(BaseModel):
+    query: str = Field(..., description="The search query")
+    results: List[BookmarkSearchResult]
+    total: int = Field(..., description="Number of bookmarks matching the query")
+
+
+class BookmarkImportError(BaseModel):
+    row: int = Field(..., description="1-based position of the row in the file")
+    error: str = Field(..., description="Why the row was not imported")
+
+
+class BookmarkImportResponse(BaseModel):
+    imported: int = Field(..., description="Number of bookmarks created")
+    failed: int = Field(..., description="Number of rows that were not imported")
+    duplicates: int = Field(
+        default=0, description="Rows skipped because the URL is already bookmarked"
+    )
+    errors: List[BookmarkImportError] = Field(
+        default=[], description="Details of the first failed rows"
+    )
+
+
+class BookmarkSelection(BaseModel):
+    """Bookmarks targeted by a bulk operation: listed ids, a filter, or both"""
+
+    ids: Optional[List[str]] = Field(
+        None, max_length=1000, description="IDs of the bookmarks to change"
+    )
+    category: Optional[str] = Field(None, description="Only bookmarks in this category")
+    tags: Optional[List[str]] = Field(
+        None, description="Only bookmarks carrying any of these tags"
+    )
+
+    @model_validator(mode="after")
+    def check_not_empty(self):
+        if self.ids is None and not self.category and not self.tags:
+            raise ValueError("Give ids, a category or tags to select bookmarks")
+        return self
+
+
+class BookmarkBulkDelete(BookmarkSelection):
+    pass
+
+
+class BookmarkBulkUpdate(BookmarkSelection):
+    update: BookmarkUpdate = Field(..., description="Fields to set on every bookmark")
+
+
+class BookmarkBulkResponse(BaseModel):
+    matched: int = Field(..., description="Number of bookmarks selected")
+    processed: int = Field(..., description="Number of bookmarks changed")
+    batches: int = Field(..., description="Number of transactional batches sent")
+
+
+class DuplicateCluster(BaseModel):
+    url: str = Field(..., description="Normalized URL shared by the bookmarks")
+    bookmark_ids: List[str] = Field(..., description="Bookmarks with this URL")
+
+
+class DuplicatesResponse(BaseModel):
+    clusters: List[DuplicateCluster] = Field(..., description="Largest clusters first")
+    duplicates: int = Field(
+        ..., description="Bookmarks that could go, keeping one per cluster"
+    )
+
+
+class BrokenLink(BaseModel):
+    id: str = Field(..., description="Bookmark ID")
+    url: str = Field(..., description="Bookmark URL")
+    link_status: str = Field(..., description="broken, error or unreachable")
+    link_status_code: Optional[int] = Field(None, description="HTTP status, if any")
+
+
+class LinkCheckResponse(BaseModel):
+    user_id: str
+    state: str = Field(..., description="running, finished, failed or cancelled")
+    error: Optional[str] = Field(None, description="Why the run failed")
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+    elapsed_seconds: float
+    scanned: int = Field(..., description="Bookmarks read so far")
+    skipped: int = Field(..., description="Bookmarks checked recently, not rechecked")
+    checked: int = Field(..., description="Links checked so far")
+    checks_per_second: float
+    results: Dict[str, int] = Field(..., description="Links checked per status")
+    broken: List[BrokenLink] = Field(
+        default=[], description="The first links found not to be ok"
+    )
+
+
+class FacetCount(BaseModel):
+    value: str = Field(..., description="Category or tag")
+    count: int = Field(..., description="Number of bookmarks with this value")
+
+
+class BookmarkFacetsResponse(BaseModel):
+    total: int = Field(..., description="Total number of bookmarks")
+    categories: List[FacetCount] = Field(..., description="Most used categories first")
+    tags: List[FacetCount] = Field(..., description="Most used tags first")
 
 
 class CategoriesResponse(BaseModel):
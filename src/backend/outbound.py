@@ -0,0 +1,94 @@
+"""Guard for requests the server sends to URLs given by users"""
+
+import asyncio
+import ipaddress
+import socket
+from typing import List, Optional
+
+import httpx
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+class BlockedAddressError(httpx.TransportError):
+    """Raised instead of sending a request to an address that is not public"""
+
+
+def is_public_address(address: str) -> bool:
+    """Whether an IP address belongs to the public internet.
+
+    Loopback, private (RFC 1918), link-local (such as the cloud metadata
+    endpoint 169.254.169.254), shared, reserved, multicast and unspecified
+    addresses are not; neither are IPv4 addresses mapped into IPv6.
+    """
+    ip = ipaddress.ip_address(address)
+    if isinstance(ip, ipaddress.IPv6Address) and ip.ipv4_mapped is not None:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not (ip.is_multicast or ip.is_reserved)
+
+
+async def _resolve(host: str, port: int) -> List[str]:
+    infos = await asyncio.get_running_loop().getaddrinfo(
+        host, port, type=socket.SOCK_STREAM
+    )
+    return [info[4][0] for info in infos]
+
+
+class PublicAddressTransport(httpx.AsyncBaseTransport):
+    """Transport that only sends requests to public addresses.
+
+    The host of every request is resolved before it is sent, and the
+    request fails with :class:`BlockedAddressError` when any of the host's
+    addresses is not public. A client following redirects sends each hop
+    through the transport, so a public page cannot redirect to an internal
+    one. Plain HTTP requests are sent to the address that was checked, so a
+    host cannot resolve elsewhere by the time it is connected to; over HTTPS
+    the certificate check ties the connection to the host name instead.
+    """
+
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self._transport = transport or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        url = request.url
+        port = url.port or _DEFAULT_PORTS.get(url.scheme, 80)
+        try:
+            addresses = await _resolve(url.host, port)
+        except (socket.gaierror, UnicodeError) as e:
+            raise httpx.ConnectError(
+                f"Cannot resolve {url.host}: {e}", request=request
+            ) from e
+        for address in addresses:
+            if not is_public_address(address):
+                raise BlockedAddressError(
+                    f"{url.host} resolves to {address}, which is not public",
+                    request=request,
+                )
+        if url.scheme == "http" and addresses[0] != url.host:
+            # Keeps the original Host header; the response is still reported
+            # against the request the client made
+            request = httpx.Request(
+                request.method,
+                url.copy_with(host=addresses[0]),
+                headers=request.headers,
+                stream=request.stream,
+                extensions=request.extensions,
+            )
+        return await self._transport.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+def guarded_transport(
+    transport: Optional[httpx.AsyncBaseTransport] = None, allow_private: bool = False
+) -> Optional[httpx.AsyncBaseTransport]:
+    """Transport for clients fetching user-given URLs.
+
+    Wraps ``transport`` in :class:`PublicAddressTransport` unless
+    ``allow_private`` is set (``ALLOW_PRIVATE_URLS``), for deployments whose
+    bookmarks point into their own network.
+    """
+    if allow_private:
+        return transport
+    return PublicAddressTransport(transport)
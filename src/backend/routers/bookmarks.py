@@ -1,20 +1,92 @@
+import hashlib
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+)
+from fastapi.responses import ORJSONResponse, StreamingResponse
 
+from backend.link_checker import link_checker
 from backend.models import (
     Bookmark,
+    BookmarkBulkDelete,
+    BookmarkBulkResponse,
+    BookmarkBulkUpdate,
     BookmarkCreate,
+    BookmarkFacetsResponse,
+    BookmarkImportResponse,
     BookmarkResponse,
+    BookmarkSearchResponse,
     BookmarksListResponse,
     BookmarkUpdate,
     CategoriesResponse,
+    DuplicatesResponse,
+    FacetCount,
+    LinkCheckResponse,
+)
+from backend.services import (
+    BookmarkService,
+    DuplicateBookmarkError,
+    InvalidCursorError,
+    PreconditionFailedError,
+    get_bookmark_service,
+)
+from backend.services.bookmark_io import (
+    EXPORT_MEDIA_TYPES,
+    ImportFormatError,
+    iter_export,
+    iter_import_rows,
 )
-from backend.services import BookmarkService, get_bookmark_service
 
 router = APIRouter(prefix="/bookmarks", tags=["bookmarks"])
 
 
+def _etag_matches(if_none_match: Optional[str], etag: Optional[str]) -> bool:
+    """Whether an If-None-Match header matches an ETag (weak comparison)"""
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return etag.removeprefix("W/") in (tag.removeprefix("W/") for tag in candidates)
+
+
+def _version_etag(version: str, request: Request) -> str:
+    """Weak ETag for a list response, from the user's version and the query"""
+    query = hashlib.sha1(  # nosec - ETag, not a security boundary
+        str(request.query_params).encode("utf-8")
+    ).hexdigest()
+    return f'W/"{version}-{query[:16]}"'
+
+
+def _facet_counts(counts: dict) -> List[FacetCount]:
+    ordered = sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+    return [FacetCount(value=value, count=count) for value, count in ordered]
+
+
+def _not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+
+def _json_response(
+    content, status_code: int = status.HTTP_200_OK, etag: Optional[str] = None
+) -> ORJSONResponse:
+    """Encode a response body in one orjson pass.
+
+    Returning a response skips FastAPI's second validation and serialization
+    of the result against ``response_model``, which is kept for the schema.
+    """
+    headers = {"ETag": etag} if etag else None
+    return ORJSONResponse(content, status_code=status_code, headers=headers)
+
+
 @router.post("/", response_model=BookmarkResponse, status_code=status.HTTP_201_CREATED)
 async def create_bookmark(
     bookmark: BookmarkCreate, service: BookmarkService = Depends(get_bookmark_service)
@@ -22,7 +94,70 @@ async def create_bookmark(
     """Create a new bookmark"""
     try:
         created_bookmark = await service.create_bookmark(bookmark)
-        return created_bookmark
+        return _json_response(
+            created_bookmark.to_json_dict(),
+            status_code=status.HTTP_201_CREATED,
+        )
+    except DuplicateBookmarkError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
+        )
+
+
+@router.post("/import", response_model=BookmarkImportResponse)
+async def import_bookmarks(
+    request: Request,
+    user_id: str = Query(default="default_user", description="User ID"),
+    format: Optional[str] = Query(
+        None,
+        pattern="^(html|json)$",
+        description="Export format: html (Netscape) or json; detected when omitted",
+    ),
+    service: BookmarkService = Depends(get_bookmark_service),
+):
+    """Import a browser bookmark export sent as the raw request body"""
+    try:
+        rows = iter_import_rows(request.stream(), format)
+        result = await service.import_bookmarks(user_id, rows)
+        return BookmarkImportResponse(**result)
+    except ImportFormatError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
+        )
+
+
+@router.post("/bulk/delete", response_model=BookmarkBulkResponse)
+async def bulk_delete_bookmarks(
+    selection: BookmarkBulkDelete,
+    user_id: str = Query(default="default_user", description="User ID"),
+    service: BookmarkService = Depends(get_bookmark_service),
+):
+    """Delete bookmarks by ID and/or by category and tags"""
+    try:
+        result = await service.bulk_delete(user_id, selection)
+        return BookmarkBulkResponse(**result)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
+        )
+
+
+@router.post("/bulk/update", response_model=BookmarkBulkResponse)
+async def bulk_update_bookmarks(
+    request: BookmarkBulkUpdate,
+    user_id: str = Query(default="default_user", description="User ID"),
+    service: BookmarkService = Depends(get_bookmark_service),
+):
+    """Set the same fields on bookmarks selected by ID and/or by category and tags"""
+    try:
+        result = await service.bulk_update(user_id, request, request.update)
+        return BookmarkBulkResponse(**result)
+    except DuplicateBookmarkError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
@@ -31,51 +166,210 @@ async def create_bookmark(
 
 @router.get("/", response_model=BookmarksListResponse)
 async def get_bookmarks(
+    request: Request,
     user_id: str = Query(default="default_user", description="User ID"),
     category: Optional[str] = Query(None, description="Filter by category"),
     tags: Optional[str] = Query(None, description="Filter by tags (comma-separated)"),
     page: int = Query(1, ge=1, description="Page number"),
     page_size: int = Query(50, ge=1, le=100, description="Items per page"),
+    cursor: Optional[str] = Query(
+        None, description="Cursor from the previous page's next_cursor"
+    ),
+    include_total: bool = Query(
+        True, description="Count all matching bookmarks; false skips the count"
+    ),
+    if_none_match: Optional[str] = Header(None),
     service: BookmarkService = Depends(get_bookmark_service),
 ):
     """Get all bookmarks for a user with optional filtering"""
     try:
+        # Answer unchanged polls without running the query
+        etag = _version_etag(await service.get_version(user_id), request)
+        if _etag_matches(if_none_match, etag):
+            return _not_modified(etag)
+
         # Parse tags if provided
         tag_list = None
         if tags:
             tag_list = [tag.strip() for tag in tags.split(",") if tag.strip()]
 
-        bookmarks, total = await service.get_bookmarks(
+        bookmarks, total, next_cursor = await service.get_bookmarks(
             user_id=user_id,
             category=category,
             tags=tag_list,
             page=page,
             page_size=page_size,
+            cursor=cursor,
+            include_total=include_total,
         )
 
-        return BookmarksListResponse(
-            bookmarks=bookmarks, total=total, page=page, page_size=page_size
+        return _json_response(
+            {
+                "bookmarks": [bookmark.to_json_dict() for bookmark in bookmarks],
+                "total": total,
+                "page": page,
+                "page_size": page_size,
+                "next_cursor": next_cursor,
+            },
+            etag=etag,
         )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
         )
 
 
+@router.get("/export")
+async def export_bookmarks(
+    user_id: str = Query(default="default_user", description="User ID"),
+    format: str = Query(
+        "ndjson", pattern="^(ndjson|csv|html)$", description="ndjson, csv or html"
+    ),
+    category: Optional[str] = Query(None, description="Filter by category"),
+    tags: Optional[str] = Query(None, description="Filter by tags (comma-separated)"),
+    service: BookmarkService = Depends(get_bookmark_service),
+):
+    """Download bookmarks as NDJSON, CSV or a Netscape HTML bookmark file"""
+    tag_list = None
+    if tags:
+        tag_list = [tag.strip() for tag in tags.split(",") if tag.strip()]
+
+    media_type, extension = EXPORT_MEDIA_TYPES[format]
+    docs = service.export_bookmarks(user_id=user_id, category=category, tags=tag_list)
+    return StreamingResponse(
+        iter_export(docs, format),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="bookmarks.{extension}"'
+        },
+    )
+
+
+@router.get("/search", response_model=BookmarkSearchResponse)
+async def search_bookmarks(
+    q: str = Query(..., min_length=1, max_length=200, description="Search terms"),
+    user_id: str = Query(default="default_user", description="User ID"),
+    limit: int = Query(20, ge=1, le=100, description="Maximum number of results"),
+    service: BookmarkService = Depends(get_bookmark_service),
+):
+    """Search bookmark titles, descriptions and URLs, best matches first"""
+    try:
+        results, total = await service.search_bookmarks(
+            user_id=user_id, query=q, limit=limit
+        )
+        return _json_response(
+            {
+                "query": q,
+                "results": [
+                    {**bookmark.to_json_dict(), "score": score}
+                    for bookmark, score in results
+                ],
+                "total": total,
+            }
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
+        )
+
+
+@router.get("/facets", response_model=BookmarkFacetsResponse)
+async def get_facets(
+    request: Request,
+    response: Response,
+    user_id: str = Query(default="default_user", description="User ID"),
+    if_none_match: Optional[str] = Header(None),
+    service: BookmarkService = Depends(get_bookmark_service),
+):
+    """Count bookmarks per category and per tag"""
+    try:
+        etag = _version_etag(await service.get_version(user_id), request)
+        if _etag_matches(if_none_match, etag):
+            return _not_modified(etag)
+
+        facets = await service.get_facets(user_id)
+        response.headers["ETag"] = etag
+        return BookmarkFacetsResponse(
+            total=facets["total"],
+            categories=_facet_counts(facets["categories"]),
+            tags=_facet_counts(facets["tags"]),
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
+        )
+
+
+@router.get("/duplicates", response_model=DuplicatesResponse)
+async def get_duplicates(
+    user_id: str = Query(default="default_user", description="User ID"),
+    service: BookmarkService = Depends(get_bookmark_service),
+):
+    """List groups of bookmarks that point to the same page"""
+    try:
+        clusters = await service.get_duplicates(user_id)
+        return DuplicatesResponse(
+            clusters=clusters,
+            duplicates=sum(len(c["bookmark_ids"]) - 1 for c in clusters),
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
+        )
+
+
+@router.post(
+    "/link-check",
+    response_model=LinkCheckResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def start_link_check(
+    user_id: str = Query(default="default_user", description="User ID"),
+    force: bool = Query(False, description="Also re-check links checked recently"),
+    service: BookmarkService = Depends(get_bookmark_service),
+):
+    """Start checking the user's bookmark URLs in the background"""
+    job = link_checker.start(user_id, service, force=force)
+    return LinkCheckResponse(**job.to_dict())
+
+
+@router.get("/link-check", response_model=LinkCheckResponse)
+async def get_link_check(
+    user_id: str = Query(default="default_user", description="User ID"),
+):
+    """Progress of the user's current or last link check"""
+    job = link_checker.status(user_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="No link check has run"
+        )
+    return LinkCheckResponse(**job.to_dict())
+
+
 @router.get("/{bookmark_id}", response_model=BookmarkResponse)
 async def get_bookmark(
     bookmark_id: str,
     user_id: str = Query(default="default_user", description="User ID"),
+    if_none_match: Optional[str] = Header(None),
     service: BookmarkService = Depends(get_bookmark_service),
 ):
     """Get a specific bookmark by ID"""
     try:
+        if if_none_match:
+            # Answer a matching poll without reading the bookmark itself
+            etag = await service.get_etag(bookmark_id, user_id)
+            if _etag_matches(if_none_match, etag):
+                return _not_modified(etag)
         bookmark = await service.get_bookmark(bookmark_id, user_id)
         if not bookmark:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Bookmark not found"
             )
-        return bookmark
+        if _etag_matches(if_none_match, bookmark.etag):
+            return _not_modified(bookmark.etag)
+        return _json_response(bookmark.to_json_dict(), etag=bookmark.etag)
     except HTTPException:
         raise
     except Exception as e:
@@ -89,18 +383,29 @@ async def update_bookmark(
     bookmark_id: str,
     bookmark_update: BookmarkUpdate,
     user_id: str = Query(default="default_user", description="User ID"),
+    if_match: Optional[str] = Header(
+        None, description="Only update if the bookmark still has this ETag"
+    ),
     service: BookmarkService = Depends(get_bookmark_service),
 ):
     """Update an existing bookmark"""
     try:
         updated_bookmark = await service.update_bookmark(
-            bookmark_id, bookmark_update, user_id
+            bookmark_id, bookmark_update, user_id, if_match=if_match
         )
         if not updated_bookmark:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Bookmark not found"
             )
-        return updated_bookmark
+        return _json_response(
+            updated_bookmark.to_json_dict(), etag=updated_bookmark.etag
+        )
+    except PreconditionFailedError as e:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED, detail=str(e)
+        )
+    except DuplicateBookmarkError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
     except HTTPException:
         raise
     except Exception as e:
@@ -132,12 +437,20 @@ async def delete_bookmark(
 
 @router.get("/categories/", response_model=CategoriesResponse)
 async def get_categories(
+    request: Request,
+    response: Response,
     user_id: str = Query(default="default_user", description="User ID"),
+    if_none_match: Optional[str] = Header(None),
     service: BookmarkService = Depends(get_bookmark_service),
 ):
     """Get all bookmark categories"""
     try:
+        etag = _version_etag(await service.get_version(user_id), request)
+        if _etag_matches(if_none_match, etag):
+            return _not_modified(etag)
+
         categories = await service.get_categories(user_id)
+        response.headers["ETag"] = etag
         return CategoriesResponse(categories=categories)
     except Exception as e:
         raise HTTPException(
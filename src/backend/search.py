@@ -0,0 +1,140 @@
+import heapq
+import math
+import re
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from backend.config import settings
+from backend.indexes import UserIndexes
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Term frequency weight of each indexed field
+FIELD_WEIGHTS = {"title": 3.0, "description": 1.0, "url": 1.0}
+
+_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+_URL_NOISE = frozenset({"www", "com", "http", "https", "html", "htm", "php", "index"})
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from in is it of on or the to with".split()
+)
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Split text into lowercase search terms"""
+    if not text:
+        return []
+    return [
+        token
+        for token in _TOKEN_PATTERN.findall(text.lower())
+        if token not in _STOPWORDS
+    ]
+
+
+def _url_tokens(url: Optional[str]) -> List[str]:
+    if not url:
+        return []
+    parts = urlsplit(url)
+    tokens = tokenize(f"{parts.hostname or ''} {parts.path}")
+    return [token for token in tokens if token not in _URL_NOISE]
+
+
+def document_terms(doc: dict) -> Dict[str, float]:
+    """Weighted term frequencies of a bookmark's title, description and URL"""
+    terms: Dict[str, float] = {}
+    fields = (
+        ("title", tokenize(doc.get("title"))),
+        ("description", tokenize(doc.get("description"))),
+        ("url", _url_tokens(doc.get("url"))),
+    )
+    for field, tokens in fields:
+        weight = FIELD_WEIGHTS[field]
+        for token in tokens:
+            terms[token] = terms.get(token, 0.0) + weight
+    return terms
+
+
+class _UserIndex:
+    """Inverted index over one user's bookmarks"""
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[str, float]] = {}
+        self.doc_terms: Dict[str, Dict[str, float]] = {}
+        self.doc_lengths: Dict[str, float] = {}
+        self.total_length = 0.0
+
+    def add(self, doc: dict) -> None:
+        bookmark_id = doc["id"]
+        self.remove(bookmark_id)
+        terms = document_terms(doc)
+        for term, frequency in terms.items():
+            self.postings.setdefault(term, {})[bookmark_id] = frequency
+        length = sum(terms.values())
+        self.doc_terms[bookmark_id] = terms
+        self.doc_lengths[bookmark_id] = length
+        self.total_length += length
+
+    def remove(self, bookmark_id: str) -> None:
+        terms = self.doc_terms.pop(bookmark_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            posting = self.postings[term]
+            del posting[bookmark_id]
+            if not posting:
+                del self.postings[term]
+        self.total_length -= self.doc_lengths.pop(bookmark_id)
+
+    def search(
+        self, terms: List[str], limit: int
+    ) -> Tuple[List[Tuple[str, float]], int]:
+        """Rank the bookmarks matching any term with BM25"""
+        doc_count = len(self.doc_terms)
+        if not doc_count:
+            return [], 0
+        average_length = self.total_length / doc_count or 1.0
+
+        scores: Dict[str, float] = {}
+        for term in set(terms):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (doc_count - len(posting) + 0.5) / (len(posting) + 0.5))
+            for bookmark_id, frequency in posting.items():
+                norm = K1 * (1 - B + B * self.doc_lengths[bookmark_id] / average_length)
+                score = idf * frequency * (K1 + 1) / (frequency + norm)
+                scores[bookmark_id] = scores.get(bookmark_id, 0.0) + score
+
+        top = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return top, len(scores)
+
+
+class SearchIndex(UserIndexes):
+    """Per-user full-text indexes over title, description and URL.
+
+    A user's index is built from storage on their first search and then
+    kept current by the service's create, update and delete paths, so a
+    query only touches the postings of its own terms. Bookmarks written
+    through other processes are only found once the user's index reaches
+    ``max_age`` and is rebuilt.
+    """
+
+    def _new_index(self) -> _UserIndex:
+        return _UserIndex()
+
+    def search(
+        self, user_id: str, query: str, limit: int = 20
+    ) -> Tuple[List[Tuple[str, float]], int]:
+        """Return the top ``limit`` (bookmark_id, score) pairs and the match count"""
+        index = self._get(user_id)
+        if index is None:
+            return [], 0
+        return index.search(tokenize(query), limit)
+
+
+# Global instance
+search_index = SearchIndex(
+    max_users=settings.search_index_max_users,
+    max_age=settings.search_index_max_age_seconds,
+)
@@ -1 +1,9 @@
-from .bookmark_service import BookmarkService, get_bookmark_service
+from .bookmark_service import (
+    BookmarkService,
+    DuplicateBookmarkError,
+    InvalidCursorError,
+    PreconditionFailedError,
+    close_local_store,
+    close_write_queue,
+    get_bookmark_service,
+)
@@ -0,0 +1,356 @@
+"""Streaming parsers and serializers for bookmark imports and exports"""
+
+import codecs
+import csv
+import html
+import io
+import json
+from datetime import datetime, timezone
+from html.parser import HTMLParser
+from typing import AsyncIterable, AsyncIterator, Iterator, List, Optional
+
+IMPORT_FORMATS = ("html", "json")
+EXPORT_FORMATS = ("ndjson", "csv", "html")
+
+# Fields written by every export format, in column order
+EXPORT_FIELDS = [
+    "id",
+    "title",
+    "url",
+    "description",
+    "category",
+    "tags",
+    "created_at",
+    "updated_at",
+]
+
+# Media type and file extension of each export format
+EXPORT_MEDIA_TYPES = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv", "csv"),
+    "html": ("text/html", "html"),
+}
+
+# Bytes gathered before a chunk is sent once the first row is out
+_EXPORT_CHUNK_SIZE = 64 * 1024
+
+
+class ImportFormatError(ValueError):
+    """Raised when an import file cannot be parsed"""
+
+
+class NetscapeBookmarkParser(HTMLParser):
+    """Incremental parser for the Netscape bookmark file format.
+
+    This is the HTML format every major browser exports. Feed it text as
+    it arrives and collect finished rows with :meth:`pop_rows`. Folder
+    names become tags on the bookmarks inside them, alongside any
+    ``TAGS`` attribute.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self._rows: List[dict] = []
+        self._folders: List[str] = []
+        self._folder_title: Optional[str] = None
+        self._pending_folder: Optional[str] = None
+        self._link: Optional[dict] = None
+        self._description: Optional[dict] = None
+        self._in_folder_title = False
+
+    def pop_rows(self, final: bool = False) -> List[dict]:
+        """Return the rows completed so far and forget them.
+
+        The latest row is held back until the end of input or the next
+        link, because a ``<DD>`` description may still follow it.
+        """
+        if final:
+            self._flush_description()
+            rows, self._rows = self._rows, []
+        else:
+            rows, self._rows = self._rows[:-1], self._rows[-1:]
+        return rows
+
+    def _flush_description(self) -> None:
+        if self._description is not None:
+            description = self._description.get("description")
+            if description is not None:
+                self._description["description"] = description.strip() or None
+            self._description = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ("dt", "dl", "a", "h3"):
+            self._flush_description()
+        if tag == "a":
+            attributes = dict(attrs)
+            tags = [t.strip() for t in (attributes.get("tags") or "").split(",")]
+            self._link = {
+                "url": attributes.get("href"),
+                "title": "",
+                "tags": [t for t in self._folders + tags if t],
+            }
+        elif tag == "h3":
+            self._in_folder_title = True
+            self._folder_title = ""
+        elif tag == "dl":
+            if self._pending_folder is not None:
+                self._folders.append(self._pending_folder)
+                self._pending_folder = None
+            else:
+                # Keep the stack balanced for lists that are not folders
+                self._folders.append("")
+        elif tag == "dd" and self._rows:
+            self._description = self._rows[-1]
+            self._description["description"] = ""
+
+    def handle_endtag(self, tag):
+        if tag == "a" and self._link is not None:
+            self._link["title"] = self._link["title"].strip()
+            self._rows.append(self._link)
+            self._link = None
+        elif tag == "h3" and self._in_folder_title:
+            self._in_folder_title = False
+            self._pending_folder = self._folder_title.strip()
+        elif tag == "dl" and self._folders:
+            self._folders.pop()
+
+    def handle_data(self, data):
+        if self._link is not None:
+            self._link["title"] += data
+        elif self._in_folder_title:
+            self._folder_title += data
+        elif self._description is not None:
+            self._description["description"] += data
+
+
+def _walk_json_tree(node, folders: List[str]) -> Iterator[dict]:
+    """Flatten Chrome ("roots") and Firefox ("children") bookmark trees"""
+    if isinstance(node, list):
+        for child in node:
+            yield from _walk_json_tree(child, folders)
+        return
+    if not isinstance(node, dict):
+        return
+
+    url = node.get("url") or node.get("uri")
+    # Firefox "place:" URLs are saved searches, not bookmarks; any other
+    # value is passed on for validation to report
+    if url and not (isinstance(url, str) and url.startswith("place:")):
+        row = dict(node)
+        row["url"] = url
+        row["title"] = node.get("title") or node.get("name")
+        row["tags"] = [f for f in folders if f] + list(node.get("tags") or [])
+        yield row
+        return
+
+    name = node.get("title") or node.get("name") or ""
+    children = node.get("children")
+    if children is None and isinstance(node.get("roots"), dict):
+        children = list(node["roots"].values())
+        name = ""
+    if children is not None:
+        yield from _walk_json_tree(children, folders + [name])
+
+
+def _json_rows(value) -> Iterator[dict]:
+    if isinstance(value, dict) and ("url" in value or "uri" in value):
+        row = dict(value)
+        row.setdefault("url", row.get("uri"))
+        yield row
+    else:
+        yield from _walk_json_tree(value, [])
+
+
+async def _decode(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    async for chunk in chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    text = decoder.decode(b"", final=True)
+    if text:
+        yield text
+
+
+async def iter_netscape_rows(chunks: AsyncIterable[bytes]) -> AsyncIterator[dict]:
+    """Yield bookmark rows from a Netscape HTML export as it streams in"""
+    parser = NetscapeBookmarkParser()
+    async for text in _decode(chunks):
+        parser.feed(text)
+        for row in parser.pop_rows():
+            yield row
+    parser.close()
+    for row in parser.pop_rows(final=True):
+        yield row
+
+
+async def iter_json_rows(chunks: AsyncIterable[bytes]) -> AsyncIterator[dict]:
+    """Yield bookmark rows from JSON as it streams in.
+
+    A top-level array of bookmark objects and newline-delimited JSON are
+    decoded one element at a time. Nested browser exports (Chrome's
+    ``roots``, Firefox's ``children``) are a single JSON document and are
+    flattened once it has been read.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    in_array = None
+    finished = False
+    # Unparsed characters needed before retrying a value that was cut off;
+    # doubling it keeps a large single document from being re-scanned on
+    # every chunk
+    retry_length = 0
+
+    async def values(final: bool):
+        nonlocal buffer, position, in_array, finished, retry_length
+        if not final and len(buffer) < retry_length:
+            return
+        while not finished:
+            # Skip whitespace and array punctuation between values
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+            if position >= len(buffer):
+                break
+            if in_array is None:
+                in_array = buffer[position] == "["
+                if in_array:
+                    position += 1
+                    continue
+            if in_array and buffer[position] == "]":
+                finished = True
+                break
+            try:
+                value, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if final:
+                    raise ImportFormatError("Invalid JSON in import file")
+                retry_length = 2 * (len(buffer) - position)
+                break
+            position = end
+            retry_length = 0
+            yield value
+        buffer = buffer[position:]
+        position = 0
+
+    async for text in _decode(chunks):
+        buffer += text
+        async for value in values(final=False):
+            for row in _json_rows(value):
+                yield row
+    async for value in values(final=True):
+        for row in _json_rows(value):
+            yield row
+
+
+async def iter_import_rows(
+    chunks: AsyncIterable[bytes], format: Optional[str] = None
+) -> AsyncIterator[dict]:
+    """Yield bookmark rows from an export, sniffing the format when not given"""
+    iterator = chunks.__aiter__()
+    first = b""
+    if format is None:
+        # Read until the first meaningful byte decides between HTML and JSON
+        async for chunk in iterator:
+            first += chunk
+            stripped = first.lstrip(b"\xef\xbb\xbf \t\r\n")
+            if stripped:
+                format = "html" if stripped.startswith(b"<") else "json"
+                break
+        else:
+            return
+
+    async def replay():
+        if first:
+            yield first
+        async for chunk in iterator:
+            yield chunk
+
+    parse = iter_netscape_rows if format == "html" else iter_json_rows
+    async for row in parse(replay()):
+        yield row
+
+
+def _ndjson_row(doc: dict) -> str:
+    row = {field: doc.get(field) for field in EXPORT_FIELDS}
+    return json.dumps(row, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+def _csv_row(values: List) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(values)
+    return buffer.getvalue()
+
+
+def _epoch(timestamp: Optional[str]) -> str:
+    try:
+        moment = datetime.fromisoformat(timestamp)
+    except (TypeError, ValueError):
+        return ""
+    if moment.tzinfo is None:
+        # Stored timestamps are UTC
+        moment = moment.replace(tzinfo=timezone.utc)
+    return str(int(moment.timestamp()))
+
+
+def _netscape_row(doc: dict) -> str:
+    attributes = f'HREF="{html.escape(doc.get("url") or "")}"'
+    add_date = _epoch(doc.get("created_at"))
+    if add_date:
+        attributes += f' ADD_DATE="{add_date}"'
+    if doc.get("tags"):
+        attributes += f' TAGS="{html.escape(",".join(doc["tags"]))}"'
+    row = f"    <DT><A {attributes}>{html.escape(doc.get('title') or '')}</A>\n"
+    if doc.get("description"):
+        row += f"    <DD>{html.escape(doc['description'])}\n"
+    return row
+
+
+_NETSCAPE_HEADER = """<!DOCTYPE NETSCAPE-Bookmark-file-1>
+<META HTTP-EQUIV="Content-Type" CONTENT="text/html; charset=UTF-8">
+<TITLE>Bookmarks</TITLE>
+<H1>Bookmarks</H1>
+<DL><p>
+"""
+_NETSCAPE_FOOTER = "</DL><p>\n"
+
+
+async def _export_parts(docs: AsyncIterable[dict], format: str) -> AsyncIterator[str]:
+    if format == "csv":
+        yield _csv_row(EXPORT_FIELDS)
+        async for doc in docs:
+            values = [doc.get(field) for field in EXPORT_FIELDS]
+            values[EXPORT_FIELDS.index("tags")] = ",".join(doc.get("tags") or [])
+            yield _csv_row(values)
+    elif format == "html":
+        yield _NETSCAPE_HEADER
+        async for doc in docs:
+            yield _netscape_row(doc)
+        yield _NETSCAPE_FOOTER
+    else:
+        async for doc in docs:
+            yield _ndjson_row(doc)
+
+
+async def iter_export(docs: AsyncIterable[dict], format: str) -> AsyncIterator[bytes]:
+    """Serialize bookmark documents one at a time into an export file.
+
+    The first part is sent as soon as it is ready so the download starts at
+    once; after that parts are gathered into chunks of about 64 KiB.
+    """
+    pending: List[str] = []
+    pending_size = 0
+    first = True
+    async for part in _export_parts(docs, format):
+        if first:
+            yield part.encode("utf-8")
+            first = False
+            continue
+        pending.append(part)
+        pending_size += len(part)
+        if pending_size >= _EXPORT_CHUNK_SIZE:
+            yield "".join(pending).encode("utf-8")
+            pending = []
+            pending_size = 0
+    if pending:
+        yield "".join(pending).encode("utf-8")
@@ -1,83 +1,415 @@
+import asyncio
+import base64
+import json
 import logging
 import uuid
 from datetime import datetime
-from typing import List, Optional
+from typing import AsyncIterable, AsyncIterator, List, Optional
 
-from azure.cosmos import exceptions
+from pydantic import ValidationError
 
-from backend.database import get_database
-from backend.models import Bookmark, BookmarkCategory, BookmarkCreate, BookmarkUpdate
+from backend.cache import BookmarkCache, bookmark_cache
+from backend.config import settings
+from backend.database import cosmos_exceptions, get_database
+from backend.duplicates import duplicate_index
+from backend.enrichment import MetadataEnricher, metadata_enricher
+from backend.facets import facet_index
+from backend.metrics import instrument
+from backend.models import (
+    Bookmark,
+    BookmarkCategory,
+    BookmarkCreate,
+    BookmarkSelection,
+    BookmarkUpdate,
+)
+from backend.search import search_index
+from backend.services.bookmark_io import ImportFormatError
+from backend.storage import BookmarkRecord, create_local_store
+from backend.write_behind import WriteBehindQueue
 
 logger = logging.getLogger(__name__)
 
-# Global mock storage for development mode
-_mock_storage = []
+# Global storage for when Cosmos DB is not configured (STORAGE_BACKEND)
+_mock_storage = create_local_store()
 
+# Fields the full-text index needs when loading a user's bookmarks
+_SEARCH_FIELDS = ["id", "user_id", "title", "description", "url"]
 
+# Fields the facet counts need when loading a user's bookmarks
+_FACET_FIELDS = ["id", "category", "tags"]
+
+# Fields the duplicate URL index needs when loading a user's bookmarks
+_DUPLICATE_FIELDS = ["id", "url"]
+
+# Fields the link checker needs when scanning a user's bookmarks
+_LINK_CHECK_FIELDS = ["id", "url", "link_checked_at"]
+
+# Link check results, cleared when a bookmark's URL changes
+_LINK_STATUS_FIELDS = ("link_status", "link_status_code", "link_checked_at")
+
+# Attempts at saving fetched metadata when the bookmark changes meanwhile
+METADATA_WRITE_ATTEMPTS = 3
+
+# Bookmarks read per step when scanning the in-memory store
+_SCAN_CHUNK_SIZE = 500
+
+# Row errors reported back from a single import
+MAX_IMPORT_ERRORS = 100
+
+# Operations per Cosmos DB transactional batch (the service limit)
+BATCH_MAX_OPERATIONS = 100
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded"""
+
+
+class PreconditionFailedError(Exception):
+    """Raised when a write's If-Match ETag no longer matches the bookmark"""
+
+
+class DuplicateBookmarkError(Exception):
+    """Raised when the user already has a bookmark with the same normalized URL"""
+
+    def __init__(self, bookmark_id: str):
+        super().__init__(f"URL is already bookmarked as {bookmark_id}")
+        self.bookmark_id = bookmark_id
+
+
+def _encode_cursor(position: dict) -> str:
+    """Encode a page position as an opaque, URL-safe cursor"""
+    raw = json.dumps(position, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> dict:
+    """Decode a cursor produced by :func:`_encode_cursor`"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError) as e:
+        raise InvalidCursorError("Invalid pagination cursor") from e
+    if isinstance(position, dict):
+        if isinstance(position.get("t"), str):
+            return position
+        keyset = position.get("k")
+        if isinstance(keyset, list) and len(keyset) == 2:
+            if all(isinstance(part, str) for part in keyset):
+                return position
+    raise InvalidCursorError("Invalid pagination cursor")
+
+
+def _cursor_part(position: Optional[dict], part: str):
+    """Return one part of a decoded cursor, rejecting cursors from another backend"""
+    if position is None:
+        return None
+    if part not in position:
+        raise InvalidCursorError("Pagination cursor does not match this data store")
+    return position[part]
+
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in detail['loc'])}: {detail['msg']}"
+        for detail in error.errors()
+    )
+
+
+def _keyset(item: dict) -> tuple[str, str]:
+    """Sort key used for keyset pagination of stored bookmark documents"""
+    return item["created_at"], item["id"]
+
+
+def _to_bookmark(item) -> Bookmark:
+    """Response model of a stored document or an in-memory store record"""
+    if isinstance(item, BookmarkRecord):
+        return item.to_bookmark()
+    return Bookmark.from_document(item)
+
+
+def _new_document(bookmark_data: BookmarkCreate) -> dict:
+    """Build the stored document for a new bookmark"""
+    now = datetime.utcnow().isoformat()
+    url = str(bookmark_data.url)
+    return {
+        "id": str(uuid.uuid4()),
+        # The URL stands in for a missing title until the page's is fetched
+        "title": bookmark_data.title or url,
+        "url": url,
+        "description": bookmark_data.description,
+        "category": bookmark_data.category.value,
+        "tags": bookmark_data.tags or [],
+        "user_id": bookmark_data.user_id,
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+def _import_candidate(row: dict, user_id: str) -> BookmarkCreate:
+    """Validate an imported row, fitting browser titles into the model limits"""
+    url = row.get("url")
+    title = row.get("title") or url or ""
+    description = row.get("description") or None
+    tags = row.get("tags") or []
+    if isinstance(tags, str):
+        tags = [tag.strip() for tag in tags.split(",") if tag.strip()]
+    return BookmarkCreate(
+        title=title.strip()[:200] if isinstance(title, str) else title,
+        url=url,
+        description=description[:500] if isinstance(description, str) else description,
+        category=row.get("category") or BookmarkCategory.OTHER,
+        tags=tags,
+        user_id=user_id,
+    )
+
+
+def _update_fields(bookmark_update: BookmarkUpdate) -> dict:
+    """Stored values of the fields set on an update"""
+    update_dict = bookmark_update.dict(exclude_unset=True)
+
+    # Convert URL to string if provided; the last link check was of the old URL
+    if "url" in update_dict and update_dict["url"] is not None:
+        update_dict["url"] = str(update_dict["url"])
+        update_dict.update(dict.fromkeys(_LINK_STATUS_FIELDS))
+
+    # Convert category to value if provided
+    if "category" in update_dict and update_dict["category"] is not None:
+        update_dict["category"] = update_dict["category"].value
+
+    return update_dict
+
+
+def _patch_operations(fields: dict) -> List[dict]:
+    """Cosmos DB patch operations setting each of the fields"""
+    return [
+        {"op": "set", "path": f"/{field}", "value": value}
+        for field, value in fields.items()
+    ]
+
+
+def _matches_filter(
+    doc: dict, category: Optional[str], tags: Optional[List[str]]
+) -> bool:
+    """Whether a document passes the filter built by :func:`_build_filter`"""
+    if category and doc["category"] != category:
+        return False
+    if tags and not set(tags).intersection(doc.get("tags") or ()):
+        return False
+    return True
+
+
+def _index_saved(doc: dict) -> None:
+    """Update the in-process indexes for a created or updated document"""
+    search_index.add(doc)
+    facet_index.add(doc)
+    duplicate_index.add(doc)
+
+
+def _drop_indexes(user_id: str) -> None:
+    """Forget the user's in-process indexes, to be rebuilt from storage"""
+    search_index.drop(user_id)
+    facet_index.drop(user_id)
+    duplicate_index.drop(user_id)
+
+
+def _index_deleted(user_id: str, bookmark_id: str) -> None:
+    """Update the in-process indexes for a deleted document"""
+    search_index.remove(user_id, bookmark_id)
+    facet_index.remove(user_id, bookmark_id)
+    duplicate_index.remove(user_id, bookmark_id)
+
+
+def _build_filter(
+    user_id: str, category: Optional[str] = None, tags: Optional[List[str]] = None
+) -> tuple[str, List[dict]]:
+    """Build the WHERE clause and parameters for a bookmark filter"""
+    where_clause = "c.user_id = @user_id"
+    parameters = [{"name": "@user_id", "value": user_id}]
+
+    if category:
+        where_clause += " AND c.category = @category"
+        parameters.append({"name": "@category", "value": category})
+
+    if tags:
+        tag_conditions = []
+        for i, tag in enumerate(tags):
+            tag_param = f"@tag{i}"
+            tag_conditions.append(f"ARRAY_CONTAINS(c.tags, {tag_param})")
+            parameters.append({"name": tag_param, "value": tag})
+
+        if tag_conditions:
+            where_clause += f" AND ({' OR '.join(tag_conditions)})"
+
+    return where_clause, parameters
+
+
+@instrument
 class BookmarkService:
-    def __init__(self, container):
+    def __init__(
+        self,
+        container,
+        cache: Optional[BookmarkCache] = None,
+        write_queue: Optional[WriteBehindQueue] = None,
+        enricher: Optional[MetadataEnricher] = None,
+    ):
         self.container = container
+        self.cache = cache if cache is not None else bookmark_cache
+        # Buffer updates before writing them to Cosmos DB (WRITE_BEHIND)
+        if write_queue is None and container and settings.write_behind_enabled:
+            write_queue = _write_queue
+        self.write_queue = write_queue if container else None
+        # Fetch page metadata for new bookmarks (METADATA_ENRICHMENT)
+        if enricher is None and settings.metadata_enrichment:
+            enricher = metadata_enricher
+        self.enricher = enricher
         # Use global mock storage for development mode so it persists across service instances
         self._mock_storage = _mock_storage if not container else None
 
     async def create_bookmark(self, bookmark_data: BookmarkCreate) -> Bookmark:
-        """Create a new bookmark"""
+        """Create a new bookmark.
+
+        Raises :class:`DuplicateBookmarkError` when duplicate URLs are
+        rejected and the user already has a bookmark for the same page.
+        With metadata enrichment on, a bookmark missing its title or
+        description is returned as given and queued for the page's metadata,
+        which is saved onto it in the background.
+        """
         try:
-            # Generate unique ID
-            bookmark_id = str(uuid.uuid4())
-
-            # Create bookmark document
-            bookmark_doc = {
-                "id": bookmark_id,
-                "title": bookmark_data.title,
-                "url": str(bookmark_data.url),
-                "description": bookmark_data.description,
-                "category": bookmark_data.category.value,
-                "tags": bookmark_data.tags or [],
-                "user_id": bookmark_data.user_id,
-                "created_at": datetime.utcnow().isoformat(),
-                "updated_at": datetime.utcnow().isoformat(),
-            }
+            bookmark_doc = _new_document(bookmark_data)
+            await self._check_duplicate(bookmark_doc["user_id"], bookmark_doc["url"])
+            # Claim the URL before the write so a concurrent create sees it
+            duplicate_index.add(bookmark_doc)
 
-            if self.container:
-                # Insert into Cosmos DB
-                created_item = self.container.create_item(body=bookmark_doc)
-                return Bookmark(**created_item)
-            else:
-                # Mock storage for development
-                self._mock_storage.append(bookmark_doc)
-                logger.info(
-                    f"Created bookmark in mock storage: {bookmark_doc['title']}"
+            try:
+                if self.container:
+                    # Insert into Cosmos DB
+                    created_item = await self.container.create_item(body=bookmark_doc)
+                else:
+                    # Mock storage for development
+                    created_item = await self._mock_storage.insert(bookmark_doc)
+                    logger.info(
+                        f"Created bookmark in mock storage: {bookmark_doc['title']}"
+                    )
+            except Exception:
+                duplicate_index.remove(bookmark_doc["user_id"], bookmark_doc["id"])
+                raise
+
+            await self._on_saved(created_item)
+            if self.enricher is not None and (
+                not bookmark_data.title or not bookmark_data.description
+            ):
+                self.enricher.enqueue(
+                    bookmark_doc["user_id"],
+                    bookmark_doc["id"],
+                    bookmark_doc["url"],
+                    self.apply_metadata,
                 )
-                return Bookmark(**bookmark_doc)
+            return _to_bookmark(created_item)
 
-        except exceptions.CosmosHttpResponseError as e:
+        except DuplicateBookmarkError:
+            raise
+        except cosmos_exceptions().CosmosHttpResponseError as e:
             logger.error(f"Error creating bookmark: {e.message}")
             raise Exception(f"Failed to create bookmark: {e.message}")
         except Exception as e:
             logger.error(f"Unexpected error creating bookmark: {str(e)}")
             raise Exception(f"Failed to create bookmark: {str(e)}")
 
+    def _duplicate_docs(self, user_id: str):
+        """Source of the user's duplicate URL index when it has to be built"""
+        return lambda: self._iter_documents(user_id, fields=_DUPLICATE_FIELDS)
+
+    async def _check_duplicate(
+        self, user_id: str, url: str, bookmark_id: Optional[str] = None
+    ) -> None:
+        """Raise :class:`DuplicateBookmarkError` if another bookmark has the URL"""
+        if settings.duplicate_urls != "reject":
+            return
+        existing_id = await duplicate_index.find(
+            user_id, url, self._duplicate_docs(user_id), exclude=bookmark_id
+        )
+        if existing_id is not None:
+            raise DuplicateBookmarkError(existing_id)
+
+    async def get_duplicates(self, user_id: str = "default_user") -> List[dict]:
+        """Groups of the user's bookmarks that share a normalized URL.
+
+        Served from the duplicate URL index; a user's index is built with
+        one projected scan whenever it is needed and not loaded.
+        """
+        try:
+            return await duplicate_index.clusters(
+                user_id, self._duplicate_docs(user_id)
+            )
+        except Exception as e:
+            logger.error(f"Error retrieving duplicates: {str(e)}")
+            raise Exception(f"Failed to retrieve duplicates: {str(e)}")
+
     async def get_bookmark(
         self, bookmark_id: str, user_id: str = "default_user"
     ) -> Optional[Bookmark]:
         """Get a specific bookmark by ID"""
         try:
-            if self.container:
-                item = self.container.read_item(item=bookmark_id, partition_key=user_id)
-                return Bookmark(**item)
-            else:
-                # Mock storage for development
-                for item in self._mock_storage:
-                    if item["id"] == bookmark_id and item["user_id"] == user_id:
-                        return Bookmark(**item)
+            if self.write_queue is not None:
+                item = self.write_queue.get(user_id, bookmark_id)
+                if item is not None:
+                    return _to_bookmark(item)
+
+            generation = await self.cache.generation(user_id)
+            item = await self.cache.get_bookmark(user_id, bookmark_id, generation)
+            if item is not None:
+                return _to_bookmark(item)
+
+            item = await self._read_document(bookmark_id, user_id)
+            if item is None:
                 return None
-        except exceptions.CosmosResourceNotFoundError:
-            return None
+
+            await self.cache.set_bookmark(user_id, bookmark_id, item, generation)
+            return _to_bookmark(item)
         except Exception as e:
             logger.error(f"Error retrieving bookmark {bookmark_id}: {str(e)}")
             raise Exception(f"Failed to retrieve bookmark: {str(e)}")
 
+    async def _read_document(self, bookmark_id: str, user_id: str) -> Optional[dict]:
+        """Read a bookmark document from storage, bypassing the cache"""
+        if self.container:
+            try:
+                return await self.container.read_item(
+                    item=bookmark_id, partition_key=user_id
+                )
+            except cosmos_exceptions().CosmosResourceNotFoundError:
+                return None
+        else:
+            # Mock storage for development
+            return await self._mock_storage.get(user_id, bookmark_id)
+
+    async def get_etag(
+        self, bookmark_id: str, user_id: str = "default_user"
+    ) -> Optional[str]:
+        """ETag of a bookmark, if it can be had without reading the document.
+
+        Answered from the cache or, on the development stores, from the
+        stored ETag alone. None when the bookmark has to be read in full:
+        on Cosmos DB a point read costs the same with or without the body.
+        """
+        if self.write_queue is not None:
+            # A cached ETag can predate a buffered update that is not
+            # written yet, so the bookmark is read in full
+            return None
+        item = await self.cache.get_bookmark(
+            user_id, bookmark_id, await self.cache.generation(user_id)
+        )
+        if item is not None:
+            return item.get("_etag")
+        if self.container:
+            return None
+        # Mock storage for development
+        return await self._mock_storage.etag(user_id, bookmark_id)
+
+    async def get_version(self, user_id: str = "default_user") -> str:
+        """Token that changes whenever the user's bookmarks change"""
+        return await self.cache.version(user_id)
+
     async def get_bookmarks(
         self,
         user_id: str = "default_user",
@@ -85,171 +417,853 @@ class BookmarkService:
         tags: Optional[List[str]] = None,
         page: int = 1,
         page_size: int = 50,
-    ) -> tuple[List[Bookmark], int]:
-        """Get all bookmarks for a user with optional filtering"""
-        try:
-            if self.container:
-                # Build query
-                query = "SELECT * FROM c WHERE c.user_id = @user_id"
-                parameters = [{"name": "@user_id", "value": user_id}]
-
-                if category:
-                    query += " AND c.category = @category"
-                    parameters.append({"name": "@category", "value": category})
+        cursor: Optional[str] = None,
+        include_total: bool = True,
+    ) -> tuple[List[Bookmark], Optional[int], Optional[str]]:
+        """Get a page of bookmarks for a user with optional filtering.
 
-                if tags:
-                    tag_conditions = []
-                    for i, tag in enumerate(tags):
-                        tag_param = f"@tag{i}"
-                        tag_conditions.append(f"ARRAY_CONTAINS(c.tags, {tag_param})")
-                        parameters.append({"name": tag_param, "value": tag})
+        Pages are fetched with ``cursor`` (the ``next_cursor`` of the previous
+        page) so each page costs the same however deep the client scrolls.
+        ``page`` is kept for offset-based clients. The total is None when
+        ``include_total`` is false.
+        """
+        try:
+            position = _decode_cursor(cursor) if cursor else None
 
-                    if tag_conditions:
-                        query += f" AND ({' OR '.join(tag_conditions)})"
+            shape = {
+                "category": category,
+                "tags": sorted(tags) if tags else None,
+                "page": page,
+                "page_size": page_size,
+                "cursor": cursor,
+                "include_total": include_total,
+            }
+            # Read before the fetch, so a write landing meanwhile is not cached
+            generation = await self.cache.generation(user_id)
+            result = await self.cache.get_list(user_id, shape, generation)
+            if result is None:
+                result = await self._fetch_page(
+                    user_id, category, tags, page, page_size, position, include_total
+                )
+                await self.cache.set_list(user_id, shape, result, generation)
 
-                query += " ORDER BY c.created_at DESC"
+            bookmarks = [_to_bookmark(item) for item in result["items"]]
+            return bookmarks, result["total"], result["next_cursor"]
 
-                # Execute query
-                items = list(
-                    self.container.query_items(
-                        query=query,
-                        parameters=parameters,
-                        enable_cross_partition_query=True,
-                    )
-                )
-            else:
-                # Mock storage for development
-                items = []
-                for item in self._mock_storage:
-                    if item["user_id"] != user_id:
-                        continue
+        except InvalidCursorError:
+            raise
+        except Exception as e:
+            logger.error(f"Error retrieving bookmarks: {str(e)}")
+            raise Exception(f"Failed to retrieve bookmarks: {str(e)}")
 
-                    if category and item["category"] != category:
-                        continue
+    async def _fetch_page(
+        self,
+        user_id: str,
+        category: Optional[str],
+        tags: Optional[List[str]],
+        page: int,
+        page_size: int,
+        position: Optional[dict],
+        include_total: bool = True,
+    ) -> dict:
+        """Read one page of bookmark documents and the total from storage"""
+        if self.container:
+            await self._settle(user_id)
+            where_clause, filter_parameters = _build_filter(user_id, category, tags)
+            query = f"SELECT * FROM c WHERE {where_clause} ORDER BY c.created_at DESC"
+            parameters = list(filter_parameters)
 
-                    if tags:
-                        item_tags = item.get("tags", [])
-                        if not any(tag in item_tags for tag in tags):
-                            continue
+            offset_paging = position is None and page > 1
+            if offset_paging:
+                # Offset-based page: skip server-side, no continuation
+                query += " OFFSET @offset LIMIT @limit"
+                parameters.append({"name": "@offset", "value": (page - 1) * page_size})
+                parameters.append({"name": "@limit", "value": page_size})
 
-                    items.append(item)
+            # Fetch the page and the total concurrently, scoped to the
+            # user's partition
+            reads = [
+                self._query_page(
+                    query,
+                    parameters,
+                    user_id,
+                    page_size,
+                    _cursor_part(position, "t"),
+                )
+            ]
+            if include_total:
+                reads.append(self._count_total(user_id, category, tags))
+            results = await asyncio.gather(*reads)
+            page_items, next_token = results[0]
+            total_count = results[1] if include_total else None
+            if offset_paging:
+                next_token = None
+            next_cursor = _encode_cursor({"t": next_token}) if next_token else None
+        else:
+            # Mock storage for development: keyset pagination on the
+            # store's (created_at, id) indexes
+            after = _cursor_part(position, "k")
+            try:
+                page_items, has_more = await self._mock_storage.query(
+                    user_id=user_id,
+                    category=category,
+                    tags=tags,
+                    after=tuple(after) if after else None,
+                    offset=0 if position is not None else (page - 1) * page_size,
+                    limit=page_size,
+                )
+            except ValueError as e:
+                raise InvalidCursorError("Invalid pagination cursor") from e
+            total_count = (
+                await self._mock_storage.count(user_id, category, tags)
+                if include_total
+                else None
+            )
+            next_cursor = (
+                _encode_cursor({"k": list(_keyset(page_items[-1]))})
+                if page_items and has_more
+                else None
+            )
 
-                # Sort by created_at descending
-                items.sort(key=lambda x: x["created_at"], reverse=True)
+        return {
+            "items": page_items,
+            "total": total_count,
+            "next_cursor": next_cursor,
+        }
 
-            total_count = len(items)
+    async def _query_page(
+        self,
+        query: str,
+        parameters: List[dict],
+        user_id: str,
+        page_size: int,
+        continuation_token: Optional[str],
+    ) -> tuple[List[dict], Optional[str]]:
+        """Fetch a single page of query results and its continuation token"""
+        pager = self.container.query_items(
+            query=query,
+            parameters=parameters,
+            partition_key=user_id,
+            max_item_count=page_size,
+        ).by_page(continuation_token)
+        try:
+            page_iterator = await pager.__anext__()
+        except StopAsyncIteration:
+            return [], None
+        items = [item async for item in page_iterator]
+        return items, pager.continuation_token
 
-            # Apply pagination
-            start_index = (page - 1) * page_size
-            end_index = start_index + page_size
-            paginated_items = items[start_index:end_index]
+    async def _count_total(
+        self, user_id: str, category: Optional[str], tags: Optional[List[str]]
+    ) -> int:
+        """Count matching bookmarks, from the facet counts when they can answer.
 
-            bookmarks = [Bookmark(**item) for item in paginated_items]
-            return bookmarks, total_count
+        The counts are at most ``FACET_INDEX_MAX_AGE_SECONDS`` behind writes
+        made through other processes.
+        """
+        if not tags:
+            total_count = facet_index.count(user_id, category)
+            if total_count is not None:
+                return total_count
+        where_clause, parameters = _build_filter(user_id, category, tags)
+        return await self._query_count(where_clause, parameters, user_id)
 
-        except Exception as e:
-            logger.error(f"Error retrieving bookmarks: {str(e)}")
-            raise Exception(f"Failed to retrieve bookmarks: {str(e)}")
+    async def _query_count(
+        self, where_clause: str, parameters: List[dict], user_id: str
+    ) -> int:
+        """Count the documents matching a filter without reading them"""
+        query = f"SELECT VALUE COUNT(1) FROM c WHERE {where_clause}"
+        async for count in self.container.query_items(
+            query=query,
+            parameters=parameters,
+            partition_key=user_id,
+        ):
+            return count
+        return 0
 
     async def update_bookmark(
         self,
         bookmark_id: str,
         bookmark_update: BookmarkUpdate,
         user_id: str = "default_user",
+        if_match: Optional[str] = None,
     ) -> Optional[Bookmark]:
-        """Update an existing bookmark"""
-        try:
-            # First, get the existing bookmark
-            existing_bookmark = await self.get_bookmark(bookmark_id, user_id)
-            if not existing_bookmark:
-                return None
+        """Update an existing bookmark.
 
-            # Create update document with only provided fields
-            update_data = existing_bookmark.dict()
-            update_dict = bookmark_update.dict(exclude_unset=True)
+        Only the fields set on ``bookmark_update`` are written. On Cosmos DB
+        this is a single ``patch_item`` round-trip. When ``if_match`` is
+        given the write only succeeds if the bookmark's ETag still matches,
+        otherwise :class:`PreconditionFailedError` is raised.
 
-            # Convert URL to string if provided
-            if "url" in update_dict and update_dict["url"] is not None:
-                update_dict["url"] = str(update_dict["url"])
+        With write-behind enabled, an unconditional update is buffered and
+        merged with other updates to the bookmark in the next flush.
+        Changing the URL to one the user already has raises
+        :class:`DuplicateBookmarkError` when duplicate URLs are rejected.
+        """
+        if if_match == "*":
+            if_match = None
+        try:
+            update_dict = _update_fields(bookmark_update)
+            update_dict["updated_at"] = datetime.utcnow().isoformat()
+            if update_dict.get("url"):
+                await self._check_duplicate(user_id, update_dict["url"], bookmark_id)
 
-            # Convert category to value if provided
-            if "category" in update_dict and update_dict["category"] is not None:
-                update_dict["category"] = update_dict["category"].value
+            if self.container:
+                from azure.core import MatchConditions
 
-            # Update the fields
-            update_data.update(update_dict)
-            update_data["updated_at"] = datetime.utcnow().isoformat()
+                if self.write_queue is not None:
+                    if not if_match:
+                        return await self._buffer_update(
+                            bookmark_id, user_id, update_dict
+                        )
+                    # The ETag to compare with is the one after buffered updates
+                    await self.write_queue.drain(user_id)
 
-            if self.container:
-                # Update in Cosmos DB
-                updated_item = self.container.replace_item(
-                    item=bookmark_id, body=update_data
+                # Patch in place, conditional on the client's ETag if given
+                updated_item = await self.container.patch_item(
+                    item=bookmark_id,
+                    partition_key=user_id,
+                    patch_operations=_patch_operations(update_dict),
+                    etag=if_match,
+                    match_condition=MatchConditions.IfNotModified if if_match else None,
                 )
-                return Bookmark(**updated_item)
             else:
                 # Mock storage for development
-                for i, item in enumerate(self._mock_storage):
-                    if item["id"] == bookmark_id and item["user_id"] == user_id:
-                        self._mock_storage[i] = update_data
-                        logger.info(
-                            f"Updated bookmark in mock storage: {update_data['title']}"
-                        )
-                        return Bookmark(**update_data)
-                return None
+                existing_item = await self._mock_storage.get(user_id, bookmark_id)
+                if not existing_item:
+                    return None
+                if if_match and existing_item.get("_etag") != if_match:
+                    raise PreconditionFailedError("Bookmark has been modified")
+                updated_item = await self._mock_storage.replace(
+                    {**existing_item, **update_dict}
+                )
+                if not updated_item:
+                    return None
+                logger.info(
+                    f"Updated bookmark in mock storage: {updated_item['title']}"
+                )
 
-        except exceptions.CosmosResourceNotFoundError:
+            await self._on_saved(updated_item)
+            return _to_bookmark(updated_item)
+
+        except (PreconditionFailedError, DuplicateBookmarkError):
+            raise
+        except cosmos_exceptions().CosmosResourceNotFoundError:
             return None
+        except cosmos_exceptions().CosmosAccessConditionFailedError:
+            raise PreconditionFailedError("Bookmark has been modified")
         except Exception as e:
             logger.error(f"Error updating bookmark {bookmark_id}: {str(e)}")
             raise Exception(f"Failed to update bookmark: {str(e)}")
 
+    async def _buffer_update(
+        self, bookmark_id: str, user_id: str, update_dict: dict
+    ) -> Optional[Bookmark]:
+        """Queue an update for write-behind and return the bookmark it gives"""
+        doc = self.write_queue.get(user_id, bookmark_id)
+        if doc is None:
+            doc = await self.cache.get_bookmark(
+                user_id, bookmark_id, await self.cache.generation(user_id)
+            )
+            if doc is None:
+                doc = await self._read_document(bookmark_id, user_id)
+                if doc is None:
+                    return None
+            # The stored ETag no longer applies once the update is written
+            doc = {key: value for key, value in doc.items() if key != "_etag"}
+        updated_item = self.write_queue.enqueue(user_id, bookmark_id, update_dict, doc)
+        await self._on_saved(updated_item)
+        return _to_bookmark(updated_item)
+
+    async def write_buffered(
+        self, user_id: str, writes: List[tuple[str, dict]]
+    ) -> None:
+        """Patch coalesced updates from the write-behind queue into Cosmos DB.
+
+        The patches go out as transactional batches on the user's partition;
+        a bookmark deleted in the meantime is skipped.
+        """
+        operations = [
+            ("patch", (bookmark_id, _patch_operations(fields)))
+            for bookmark_id, fields in writes
+        ]
+        await self._execute_batches(user_id, operations)
+        # Drop anything cached from storage while the updates were buffered
+        await self.cache.invalidate(user_id)
+
+    async def drop_buffered(self, user_id: str, bookmark_ids: List[str]) -> None:
+        """Forget derived state built from updates the write-behind queue dropped.
+
+        The indexes and cache were updated when the updates were buffered;
+        they are rebuilt from storage, which never got the updates.
+        """
+        _drop_indexes(user_id)
+        await self.cache.invalidate(user_id)
+
+    async def set_link_status(
+        self, user_id: str, results: List[tuple[str, dict]]
+    ) -> int:
+        """Write link check results onto the user's bookmarks.
+
+        ``results`` pairs bookmark IDs with the link status fields to set.
+        On Cosmos DB they are patched in transactional batches; bookmarks
+        deleted since they were checked are skipped. Returns the number of
+        bookmarks updated.
+        """
+        try:
+            if self.container:
+                operations = [
+                    ("patch", (bookmark_id, _patch_operations(fields)))
+                    for bookmark_id, fields in results
+                ]
+                batch_results, _ = await self._execute_batches(user_id, operations)
+                updated = sum(1 for _, result in batch_results if result is not None)
+            else:
+                # Mock storage for development
+                updated = len(await self._mock_storage.patch_many(user_id, results))
+            await self.cache.invalidate(user_id)
+            return updated
+        except Exception as e:
+            logger.error(f"Error saving link status: {str(e)}")
+            raise Exception(f"Failed to save link status: {str(e)}")
+
+    async def apply_metadata(
+        self, user_id: str, bookmark_id: str, metadata: dict
+    ) -> Optional[Bookmark]:
+        """Save fetched page metadata onto a bookmark.
+
+        The title only replaces the URL standing in for a missing one, and
+        the description and favicon are only set when the bookmark has none,
+        so nothing the user wrote is overwritten. On Cosmos DB the patch is
+        conditional on the ETag read, and retried if the bookmark changed in
+        between. Returns None when the bookmark no longer exists.
+        """
+        try:
+            for _ in range(METADATA_WRITE_ATTEMPTS):
+                doc = None
+                if self.write_queue is not None:
+                    doc = self.write_queue.get(user_id, bookmark_id)
+                if doc is None:
+                    doc = await self._read_document(bookmark_id, user_id)
+                if doc is None:
+                    return None
+
+                fields = {}
+                title = metadata.get("title")
+                if title and doc["title"] == doc["url"]:
+                    fields["title"] = title[:200]
+                description = metadata.get("description")
+                if description and not doc.get("description"):
+                    fields["description"] = description[:500]
+                if metadata.get("favicon_url") and not doc.get("favicon_url"):
+                    fields["favicon_url"] = metadata["favicon_url"]
+                if not fields:
+                    return _to_bookmark(doc)
+
+                if self.container:
+                    from azure.core import MatchConditions
+
+                    etag = doc.get("_etag")
+                    try:
+                        updated_item = await self.container.patch_item(
+                            item=bookmark_id,
+                            partition_key=user_id,
+                            patch_operations=_patch_operations(fields),
+                            etag=etag,
+                            match_condition=(
+                                MatchConditions.IfNotModified if etag else None
+                            ),
+                        )
+                    except cosmos_exceptions().CosmosAccessConditionFailedError:
+                        continue
+                else:
+                    # Mock storage for development
+                    patched = await self._mock_storage.patch_many(
+                        user_id, [(bookmark_id, fields)]
+                    )
+                    if not patched:
+                        return None
+                    updated_item = patched[0]
+
+                await self._on_saved(updated_item)
+                return _to_bookmark(updated_item)
+            logger.info(f"Bookmark {bookmark_id} kept changing, metadata not saved")
+            return None
+        except cosmos_exceptions().CosmosResourceNotFoundError:
+            return None
+        except Exception as e:
+            logger.error(f"Error saving metadata of bookmark {bookmark_id}: {str(e)}")
+            raise Exception(f"Failed to save bookmark metadata: {str(e)}")
+
+    def iter_link_targets(self, user_id: str) -> AsyncIterator[dict]:
+        """Stream the ID, URL and last link check time of a user's bookmarks"""
+        return self._iter_documents(user_id, fields=_LINK_CHECK_FIELDS)
+
+    async def sync_shared_store(self) -> None:
+        """Catch up with bookmarks written by other worker processes.
+
+        Only the shared store (``STORAGE_BACKEND=shared``) is written by
+        more than one process. The indexes and cached reads of users whose
+        bookmarks another process changed are dropped, so they are rebuilt
+        from storage when next needed. When the store can no longer say what
+        changed, those of every user are dropped.
+        """
+        if self.container or not hasattr(self._mock_storage, "changes"):
+            return
+        changes = await self._mock_storage.changes()
+        if changes is None:
+            for index in (search_index, facet_index, duplicate_index):
+                index.clear()
+            await self.cache.clear()
+            return
+        for user_id in changes:
+            _drop_indexes(user_id)
+            await self.cache.invalidate(user_id)
+
+    async def _settle(self, user_id: str) -> None:
+        """Write the user's buffered updates before reading by query"""
+        if self.write_queue is not None and self.write_queue.has_pending(user_id):
+            await self.write_queue.drain(user_id)
+
     async def delete_bookmark(
         self, bookmark_id: str, user_id: str = "default_user"
     ) -> bool:
         """Delete a bookmark"""
         try:
             if self.container:
-                self.container.delete_item(item=bookmark_id, partition_key=user_id)
-                return True
+                if self.write_queue is not None:
+                    await self.write_queue.discard(user_id, bookmark_id)
+                await self.container.delete_item(
+                    item=bookmark_id, partition_key=user_id
+                )
             else:
                 # Mock storage for development
-                for i, item in enumerate(self._mock_storage):
-                    if item["id"] == bookmark_id and item["user_id"] == user_id:
-                        deleted_item = self._mock_storage.pop(i)
-                        logger.info(
-                            f"Deleted bookmark from mock storage: {deleted_item['title']}"
-                        )
-                        return True
-                return False
-        except exceptions.CosmosResourceNotFoundError:
+                deleted_item = await self._mock_storage.delete(user_id, bookmark_id)
+                if not deleted_item:
+                    return False
+                logger.info(
+                    f"Deleted bookmark from mock storage: {deleted_item['title']}"
+                )
+
+            await self._on_deleted(user_id, bookmark_id)
+            return True
+        except cosmos_exceptions().CosmosResourceNotFoundError:
+            await self._on_deleted(user_id, bookmark_id)
             return False
         except Exception as e:
             logger.error(f"Error deleting bookmark {bookmark_id}: {str(e)}")
             raise Exception(f"Failed to delete bookmark: {str(e)}")
 
-    async def get_categories(self, user_id: str = "default_user") -> List[str]:
-        """Get all categories used by the user"""
+    async def bulk_delete(self, user_id: str, selection: BookmarkSelection) -> dict:
+        """Delete every selected bookmark of a user.
+
+        Bookmarks are partitioned by user, so the deletes go out as
+        transactional batches of up to ``BATCH_MAX_OPERATIONS`` operations
+        and cost one round-trip per batch rather than one per bookmark.
+        """
+        try:
+            bookmark_ids = await self._select_ids(user_id, selection)
+            if self.container:
+                operations = [
+                    ("delete", (bookmark_id,)) for bookmark_id in bookmark_ids
+                ]
+                results, batches = await self._execute_batches(user_id, operations)
+                deleted_ids = [
+                    operation[1][0]
+                    for operation, result in results
+                    if result is not None
+                ]
+            else:
+                # Mock storage for development: one atomic step
+                deleted = await self._mock_storage.delete_many(user_id, bookmark_ids)
+                deleted_ids = [doc["id"] for doc in deleted]
+                batches = 1 if bookmark_ids else 0
+
+            for bookmark_id in deleted_ids:
+                _index_deleted(user_id, bookmark_id)
+            if deleted_ids:
+                await self.cache.invalidate(user_id)
+            logger.info(f"Bulk deleted {len(deleted_ids)} bookmarks for {user_id}")
+            return {
+                "matched": len(bookmark_ids),
+                "processed": len(deleted_ids),
+                "batches": batches,
+            }
+
+        except Exception as e:
+            logger.error(f"Error bulk deleting bookmarks: {str(e)}")
+            raise Exception(f"Failed to delete bookmarks: {str(e)}")
+
+    async def bulk_update(
+        self,
+        user_id: str,
+        selection: BookmarkSelection,
+        bookmark_update: BookmarkUpdate,
+    ) -> dict:
+        """Set the same fields on every selected bookmark of a user.
+
+        On Cosmos DB each bookmark is patched in place inside transactional
+        batches, so nothing is read back first. Setting a URL raises
+        :class:`DuplicateBookmarkError` when duplicate URLs are rejected and
+        another bookmark has it, or when several bookmarks are selected.
+        """
         try:
+            bookmark_ids = await self._select_ids(user_id, selection)
+            update_dict = _update_fields(bookmark_update)
+            update_dict["updated_at"] = datetime.utcnow().isoformat()
+
+            if "url" in update_dict and bookmark_ids:
+                # One URL on several bookmarks makes them duplicates of each other
+                if len(bookmark_ids) > 1 and settings.duplicate_urls == "reject":
+                    raise DuplicateBookmarkError(bookmark_ids[0])
+                await self._check_duplicate(
+                    user_id, update_dict["url"], bookmark_ids[0]
+                )
+
             if self.container:
-                query = "SELECT DISTINCT c.category FROM c WHERE c.user_id = @user_id"
-                parameters = [{"name": "@user_id", "value": user_id}]
-
-                items = list(
-                    self.container.query_items(
-                        query=query,
-                        parameters=parameters,
-                        enable_cross_partition_query=True,
+                patch = _patch_operations(update_dict)
+                operations = [
+                    ("patch", (bookmark_id, patch)) for bookmark_id in bookmark_ids
+                ]
+                results, batches = await self._execute_batches(user_id, operations)
+                updated = [
+                    result.get("resourceBody")
+                    for _, result in results
+                    if result is not None
+                ]
+            else:
+                # Mock storage for development: one atomic step
+                docs = []
+                for bookmark_id in bookmark_ids:
+                    existing_item = await self._mock_storage.get(user_id, bookmark_id)
+                    if existing_item is not None:
+                        docs.append({**existing_item, **update_dict})
+                updated = await self._mock_storage.replace_many(docs) or []
+                batches = 1 if bookmark_ids else 0
+
+            for doc in updated:
+                if doc:
+                    _index_saved(doc)
+            if bookmark_ids:
+                await self.cache.invalidate(user_id)
+            logger.info(f"Bulk updated {len(updated)} bookmarks for {user_id}")
+            return {
+                "matched": len(bookmark_ids),
+                "processed": len(updated),
+                "batches": batches,
+            }
+
+        except DuplicateBookmarkError:
+            raise
+        except Exception as e:
+            logger.error(f"Error bulk updating bookmarks: {str(e)}")
+            raise Exception(f"Failed to update bookmarks: {str(e)}")
+
+    async def _select_ids(
+        self, user_id: str, selection: BookmarkSelection
+    ) -> List[str]:
+        """IDs of the user's bookmarks matching a bulk selection"""
+        category, tags = selection.category, selection.tags
+        if self.container:
+            await self._settle(user_id)
+            where_clause, parameters = _build_filter(user_id, category, tags)
+            if selection.ids is not None:
+                where_clause += " AND ARRAY_CONTAINS(@ids, c.id)"
+                parameters.append({"name": "@ids", "value": selection.ids})
+            return [
+                bookmark_id
+                async for bookmark_id in self.container.query_items(
+                    query=f"SELECT VALUE c.id FROM c WHERE {where_clause}",
+                    parameters=parameters,
+                    partition_key=user_id,
+                )
+            ]
+
+        # Mock storage for development
+        if selection.ids is None:
+            return [
+                item["id"]
+                async for item in self._iter_documents(user_id, category, tags)
+            ]
+        bookmark_ids = []
+        for bookmark_id in dict.fromkeys(selection.ids):
+            item = await self._mock_storage.get(user_id, bookmark_id)
+            if item is not None and _matches_filter(item, category, tags):
+                bookmark_ids.append(bookmark_id)
+        return bookmark_ids
+
+    async def _execute_batches(
+        self, user_id: str, operations: List[tuple]
+    ) -> tuple[List[tuple[tuple, Optional[dict]]], int]:
+        """Run operations on one user's partition as transactional batches.
+
+        Returns each operation paired with its result, or with None when its
+        bookmark no longer existed, and the number of batches sent. A batch
+        is all or nothing, so a bookmark deleted since it was selected is
+        dropped from its batch and the batch is sent again.
+        """
+        results = []
+        batches = 0
+        for start in range(0, len(operations), BATCH_MAX_OPERATIONS):
+            end = start + BATCH_MAX_OPERATIONS
+            batch = operations[start:end]
+            while batch:
+                batches += 1
+                try:
+                    batch_results = await self.container.execute_item_batch(
+                        batch_operations=batch, partition_key=user_id
                     )
+                except cosmos_exceptions().CosmosBatchOperationError as e:
+                    failed = e.operation_responses[e.error_index]
+                    if int(failed.get("statusCode", 0)) != 404:
+                        raise
+                    results.append((batch.pop(e.error_index), None))
+                    continue
+                results.extend(zip(batch, batch_results))
+                break
+        return results, batches
+
+    async def import_bookmarks(
+        self,
+        user_id: str,
+        rows: AsyncIterable[dict],
+        batch_size: Optional[int] = None,
+        concurrency: Optional[int] = None,
+    ) -> dict:
+        """Import parsed export rows in bounded, concurrently written batches.
+
+        Rows are consumed as they are parsed, so only one batch is held in
+        memory. Rows that fail validation or storage are counted and the
+        first few are reported with their row number. When duplicate URLs
+        are rejected, rows for a page the user already has (or that appeared
+        earlier in the file) are skipped and counted as duplicates.
+        """
+        batch_size = batch_size or settings.import_batch_size
+        semaphore = asyncio.Semaphore(concurrency or settings.import_concurrency)
+        result = {"imported": 0, "failed": 0, "duplicates": 0, "errors": []}
+        skip_duplicates = settings.duplicate_urls == "reject"
+
+        def record_error(row_number: int, error: str) -> None:
+            result["failed"] += 1
+            if len(result["errors"]) < MAX_IMPORT_ERRORS:
+                result["errors"].append({"row": row_number, "error": error})
+
+        async def write(row_number: int, doc: dict) -> Optional[dict]:
+            async with semaphore:
+                try:
+                    return await self.container.create_item(body=doc)
+                except cosmos_exceptions().CosmosHttpResponseError as e:
+                    duplicate_index.remove(user_id, doc["id"])
+                    record_error(row_number, e.message)
+                    return None
+
+        async def flush(batch: List[tuple[int, dict]]) -> None:
+            if self.container:
+                written = await asyncio.gather(*(write(n, doc) for n, doc in batch))
+            else:
+                # Mock storage for development
+                written = await self._mock_storage.insert_many(
+                    [doc for _, doc in batch]
+                )
+            for doc in written:
+                if doc is not None:
+                    _index_saved(doc)
+                    result["imported"] += 1
+            await self.cache.invalidate(user_id)
+            logger.info(
+                f"Importing bookmarks for {user_id}: {result['imported']} imported, "
+                f"{result['failed']} failed"
+            )
+
+        def release(batch: List[tuple[int, dict]]) -> None:
+            # URLs claimed by rows that were never written
+            for _, doc in batch:
+                duplicate_index.remove(user_id, doc["id"])
+
+        batch = []
+        try:
+            if skip_duplicates:
+                # Held for the whole import, so rows are checked against the
+                # rows claimed before them even if the index is evicted
+                urls = await duplicate_index.loaded(
+                    user_id, self._duplicate_docs(user_id)
+                )
+            row_number = 0
+            async for row in rows:
+                row_number += 1
+                try:
+                    candidate = _import_candidate(row, user_id)
+                except ValidationError as e:
+                    record_error(row_number, _validation_message(e))
+                    continue
+                doc = _new_document(candidate)
+                if skip_duplicates:
+                    if urls.find(doc["url"]) is not None:
+                        result["duplicates"] += 1
+                        continue
+                    # Claimed now so later rows with the same URL are skipped
+                    urls.add(doc)
+                batch.append((row_number, doc))
+                if len(batch) >= batch_size:
+                    await flush(batch)
+                    batch = []
+            if batch:
+                await flush(batch)
+            return result
+
+        except ImportFormatError:
+            release(batch)
+            raise
+        except Exception as e:
+            release(batch)
+            logger.error(f"Error importing bookmarks: {str(e)}")
+            raise Exception(f"Failed to import bookmarks: {str(e)}")
+
+    async def export_bookmarks(
+        self,
+        user_id: str = "default_user",
+        category: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+    ) -> AsyncIterator[dict]:
+        """Stream every matching bookmark document, newest first.
+
+        Documents come straight from the storage iterator one at a time, so
+        memory stays flat whatever the size of the library.
+        """
+        try:
+            async for item in self._iter_documents(user_id, category, tags):
+                yield item
+        except Exception as e:
+            logger.error(f"Error exporting bookmarks: {str(e)}")
+            raise Exception(f"Failed to export bookmarks: {str(e)}")
+
+    async def search_bookmarks(
+        self, user_id: str = "default_user", query: str = "", limit: int = 20
+    ) -> tuple[List[tuple[Bookmark, float]], int]:
+        """Full-text search over title, description and URL, ranked by BM25"""
+        try:
+            await self._settle(user_id)
+            if not self.container and hasattr(self._mock_storage, "search"):
+                # The local store ranks matches itself (SQLite FTS5)
+                matches, total_count = await self._mock_storage.search(
+                    user_id, query, limit
+                )
+                results = [(_to_bookmark(doc), score) for doc, score in matches]
+                return results, total_count
+
+            if not search_index.is_loaded(user_id):
+                await search_index.load(
+                    user_id, self._iter_documents(user_id, fields=_SEARCH_FIELDS)
                 )
+            ranked, total_count = search_index.search(user_id, query, limit)
+            if not ranked:
+                return [], total_count
 
-                categories = [item["category"] for item in items]
+            if self.container:
+                items = {
+                    item["id"]: item
+                    async for item in self.container.query_items(
+                        query="SELECT * FROM c WHERE ARRAY_CONTAINS(@ids, c.id)",
+                        parameters=[{"name": "@ids", "value": [i for i, _ in ranked]}],
+                        partition_key=user_id,
+                    )
+                }
             else:
                 # Mock storage for development
-                categories = []
-                for item in self._mock_storage:
-                    if item["user_id"] == user_id:
-                        categories.append(item["category"])
-                categories = list(set(categories))  # Remove duplicates
+                items = {}
+                for bookmark_id, _ in ranked:
+                    item = await self._mock_storage.get(user_id, bookmark_id)
+                    if item:
+                        items[bookmark_id] = item
+
+            results = [
+                (_to_bookmark(items[bookmark_id]), score)
+                for bookmark_id, score in ranked
+                if bookmark_id in items
+            ]
+            return results, total_count
+
+        except Exception as e:
+            logger.error(f"Error searching bookmarks: {str(e)}")
+            raise Exception(f"Failed to search bookmarks: {str(e)}")
+
+    async def _iter_documents(
+        self,
+        user_id: str,
+        category: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        fields: Optional[List[str]] = None,
+    ) -> AsyncIterator[dict]:
+        """Stream a user's matching bookmark documents, newest first.
+
+        ``fields`` limits the Cosmos DB projection to the named fields.
+        """
+        if self.container:
+            await self._settle(user_id)
+            where_clause, parameters = _build_filter(user_id, category, tags)
+            projection = ", ".join(f"c.{field}" for field in fields) if fields else "*"
+            query = f"SELECT {projection} FROM c WHERE {where_clause}"
+            if not fields:
+                query += " ORDER BY c.created_at DESC"
+            async for item in self.container.query_items(
+                query=query, parameters=parameters, partition_key=user_id
+            ):
+                yield item
+        else:
+            # Mock storage for development: walk the indexes in chunks so
+            # writes between chunks are safe
+            after = None
+            while True:
+                items, has_more = await self._mock_storage.query(
+                    user_id, category, tags, after=after, limit=_SCAN_CHUNK_SIZE
+                )
+                for item in items:
+                    yield item
+                if not has_more:
+                    break
+                after = _keyset(items[-1])
+
+    async def _on_saved(self, doc: dict) -> None:
+        """Bring derived read state up to date after a create or update"""
+        _index_saved(doc)
+        await self.cache.invalidate(doc["user_id"])
+
+    async def _on_deleted(self, user_id: str, bookmark_id: str) -> None:
+        """Bring derived read state up to date after a delete"""
+        _index_deleted(user_id, bookmark_id)
+        await self.cache.invalidate(user_id)
+
+    async def get_facets(self, user_id: str = "default_user") -> dict:
+        """Count the user's bookmarks in total, per category and per tag.
+
+        Served from counts kept current on every write; a user's counts are
+        built with one projected scan the first time they are asked for, and
+        again once they are ``FACET_INDEX_MAX_AGE_SECONDS`` old.
+        """
+        try:
+            if self.container:
+                if not facet_index.is_loaded(user_id):
+                    await facet_index.load(
+                        user_id, self._iter_documents(user_id, fields=_FACET_FIELDS)
+                    )
+                facets = facet_index.facets(user_id)
+                if facets is None:
+                    # Evicted straight away by other users' loads
+                    facets = {"total": 0, "categories": {}, "tags": {}}
+                return facets
+            else:
+                # Mock storage for development: sizes of the store's indexes
+                return await self._mock_storage.facets(user_id)
+
+        except Exception as e:
+            logger.error(f"Error retrieving facets: {str(e)}")
+            raise Exception(f"Failed to retrieve facets: {str(e)}")
+
+    async def get_categories(self, user_id: str = "default_user") -> List[str]:
+        """Get all categories used by the user"""
+        try:
+            facets = await self.get_facets(user_id)
+            categories = list(facets["categories"])
 
             # Include all available categories from enum
             all_categories = [category.value for category in BookmarkCategory]
@@ -265,7 +1279,57 @@ class BookmarkService:
             raise Exception(f"Failed to retrieve categories: {str(e)}")
 
 
+def _is_retryable_write(error: Exception) -> bool:
+    """Whether a failed write may succeed if sent again.
+
+    Cosmos DB client errors other than throttling and timeouts (a 400 for a
+    malformed patch, a 409, a 413 for an oversized document) fail the same
+    way every time; anything else, including network errors, is retried.
+    """
+    status = getattr(error, "status_code", None)
+    if not status or status in (408, 429, 449):
+        return True
+    return not 400 <= status < 500
+
+
+async def _write_buffered(user_id: str, writes: List[tuple[str, dict]]) -> None:
+    service = BookmarkService(await get_database())
+    await service.write_buffered(user_id, writes)
+
+
+async def _drop_buffered(user_id: str, bookmark_ids: List[str]) -> None:
+    service = BookmarkService(await get_database())
+    await service.drop_buffered(user_id, bookmark_ids)
+
+
+# Updates waiting to be written to Cosmos DB when WRITE_BEHIND is enabled
+_write_queue = WriteBehindQueue(
+    _write_buffered,
+    delay_ms=settings.write_behind_delay_ms,
+    max_batch=BATCH_MAX_OPERATIONS,
+    max_attempts=settings.write_behind_max_attempts,
+    retryable=_is_retryable_write,
+    on_drop=_drop_buffered,
+)
+
+
+async def close_local_store() -> None:
+    """Close the storage used without Cosmos DB"""
+    await _mock_storage.close()
+
+
+async def close_write_queue() -> None:
+    """Write every update still buffered for write-behind"""
+    await _write_queue.close()
+
+
 async def get_bookmark_service():
-    """Dependency to get bookmark service"""
+    """Dependency to get bookmark service.
+
+    With ``STORAGE_BACKEND=shared`` this reads the store's change log, one
+    SQLite read on every request, to catch up with other workers' writes.
+    """
     container = await get_database()
-    return BookmarkService(container)
+    service = BookmarkService(container)
+    await service.sync_shared_store()
+    return service
@@ -0,0 +1,18 @@
+from backend.config import settings
+
+from .memory import BookmarkRecord, InMemoryBookmarkStore
+from .shared import SharedBookmarkStore
+from .sqlite import SQLiteBookmarkStore
+
+
+def create_local_store():
+    """The store used when no Cosmos DB endpoint is configured"""
+    if settings.storage_backend == "sqlite":
+        return SQLiteBookmarkStore(
+            settings.sqlite_path, readers=settings.sqlite_readers
+        )
+    if settings.storage_backend == "shared":
+        return SharedBookmarkStore(
+            settings.shared_store_path, readers=settings.sqlite_readers
+        )
+    return InMemoryBookmarkStore()
@@ -0,0 +1,429 @@
+import bisect
+import heapq
+import itertools
+import sys
+import uuid
+from collections.abc import Mapping
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from pydantic_core import Url
+
+from backend.models import Bookmark, BookmarkCategory
+
+# (created_at in microseconds since the epoch, id) - the order bookmarks are
+# listed in, newest last
+SortKey = Tuple[int, str]
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+# ETags are this process's prefix plus a per-write counter, so a version is
+# stored as one small integer and never repeats across restarts
+_ETAG_PREFIX = uuid.uuid4().hex[:12]
+_versions = itertools.count(1)
+
+# Keys of the document view of a record, in stored document order; the link
+# check keys are left out until the link has been checked, and the favicon
+# until one has been found
+_DOCUMENT_KEYS = (
+    "id",
+    "title",
+    "url",
+    "description",
+    "category",
+    "tags",
+    "user_id",
+    "created_at",
+    "updated_at",
+    "link_status",
+    "link_status_code",
+    "link_checked_at",
+    "favicon_url",
+    "_etag",
+)
+# (link checked, favicon found) -> keys of the document view
+_VIEW_KEYS = {}
+for _checked in (False, True):
+    for _has_favicon in (False, True):
+        _VIEW_KEYS[_checked, _has_favicon] = tuple(
+            key
+            for key in _DOCUMENT_KEYS
+            if (_checked or not key.startswith("link_"))
+            if (_has_favicon or key != "favicon_url")
+        )
+
+
+def to_micros(timestamp: str) -> int:
+    """Microseconds since the epoch of an ISO timestamp (UTC when naive)"""
+    moment = datetime.fromisoformat(timestamp)
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return (moment - _EPOCH) // _MICROSECOND
+
+
+def from_micros(micros: int) -> str:
+    return (_EPOCH + micros * _MICROSECOND).isoformat()
+
+
+class BookmarkRecord(Mapping):
+    """Compact stored form of a bookmark document.
+
+    Slots instead of a dict, timestamps as integer microseconds, the etag as
+    an integer version, and interned user, category and tag strings shared
+    by every record that uses them. The record reads as the document it was
+    built from (a read-only mapping), so ``doc["created_at"]`` still gives an
+    ISO string; values are only converted when they are read, and
+    :meth:`to_bookmark` builds the response model at the boundary.
+    """
+
+    __slots__ = (
+        "id",
+        "title",
+        "url",
+        "description",
+        "category",
+        "tags",
+        "user_id",
+        "created_at",
+        "updated_at",
+        "link_status",
+        "link_status_code",
+        "link_checked_at",
+        "favicon_url",
+        "version",
+    )
+
+    def __init__(self, doc):
+        self.id = doc["id"]
+        self.title = doc["title"]
+        self.url = doc["url"]
+        self.description = doc.get("description")
+        self.category = sys.intern(doc.get("category") or "other")
+        self.tags = tuple(sys.intern(tag) for tag in doc.get("tags") or ())
+        self.user_id = sys.intern(doc["user_id"])
+        self.created_at = to_micros(doc["created_at"])
+        self.updated_at = to_micros(doc["updated_at"])
+        link_status = doc.get("link_status")
+        self.link_status = sys.intern(link_status) if link_status else None
+        self.link_status_code = doc.get("link_status_code")
+        checked_at = doc.get("link_checked_at")
+        self.link_checked_at = to_micros(checked_at) if checked_at else None
+        self.favicon_url = doc.get("favicon_url")
+        self.version = next(_versions)
+
+    @property
+    def sort_key(self) -> SortKey:
+        return self.created_at, self.id
+
+    @property
+    def etag(self) -> str:
+        return f'"{_ETAG_PREFIX}-{self.version:x}"'
+
+    def to_bookmark(self) -> Bookmark:
+        """Convert to a ``Bookmark`` directly, without an ISO string round trip"""
+        return Bookmark.from_fields(
+            {
+                "title": self.title,
+                "url": Url(self.url),
+                "description": self.description,
+                "category": BookmarkCategory(self.category),
+                "tags": list(self.tags),
+                "id": self.id,
+                "user_id": self.user_id,
+                "created_at": _EPOCH + self.created_at * _MICROSECOND,
+                "updated_at": _EPOCH + self.updated_at * _MICROSECOND,
+                "etag": self.etag,
+                "link_status": self.link_status,
+                "link_status_code": self.link_status_code,
+                "link_checked_at": (
+                    None
+                    if self.link_checked_at is None
+                    else _EPOCH + self.link_checked_at * _MICROSECOND
+                ),
+                "favicon_url": self.favicon_url,
+            }
+        )
+
+    def __getitem__(self, key: str):
+        if key in ("created_at", "updated_at", "link_checked_at"):
+            micros = getattr(self, key)
+            return None if micros is None else from_micros(micros)
+        if key == "tags":
+            return list(self.tags)
+        if key == "_etag":
+            return self.etag
+        if key in _DOCUMENT_KEYS:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def _keys(self) -> Tuple[str, ...]:
+        return _VIEW_KEYS[
+            self.link_checked_at is not None, self.favicon_url is not None
+        ]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys())
+
+    def __len__(self) -> int:
+        return len(self._keys())
+
+    def __repr__(self) -> str:
+        return f"BookmarkRecord({dict(self)!r})"
+
+
+def _insert_key(keys: List[SortKey], key: SortKey) -> None:
+    # New bookmarks are almost always the newest, so appending is the fast path
+    if not keys or keys[-1] < key:
+        keys.append(key)
+    else:
+        bisect.insort(keys, key)
+
+
+def _remove_key(keys: List[SortKey], key: SortKey) -> None:
+    index = bisect.bisect_left(keys, key)
+    if index < len(keys) and keys[index] == key:
+        del keys[index]
+
+
+def _descending(keys: List[SortKey], after: Optional[SortKey]) -> Iterator[SortKey]:
+    """Iterate keys newest first, starting strictly after ``after``"""
+    end = len(keys) if after is None else bisect.bisect_left(keys, after)
+    return (keys[i] for i in range(end - 1, -1, -1))
+
+
+class InMemoryBookmarkStore:
+    """Indexed in-memory storage for bookmark documents.
+
+    Used when no Cosmos DB endpoint is configured. Documents are kept as
+    compact :class:`BookmarkRecord` objects in a dict per user; each user
+    has a list of sort keys ordered by ``(created_at, id)``, plus one per
+    category and per tag that serve as inverted indexes. Point operations
+    are O(1) and filtered listing walks only the matching index, so cost
+    follows the size of the result rather than the size of the store.
+
+    Records handed out by the store are read-only mappings with the keys of
+    the stored document; use :meth:`replace` with a new document to change a
+    bookmark. Like Cosmos DB, every write stamps the document with a fresh
+    ``_etag``.
+    """
+
+    def __init__(self):
+        # user_id -> bookmark_id -> record
+        self._docs: Dict[str, Dict[str, BookmarkRecord]] = {}
+        self._by_user: Dict[str, List[SortKey]] = {}
+        # user_id -> category / tag -> sort keys
+        self._by_category: Dict[str, Dict[str, List[SortKey]]] = {}
+        self._by_tag: Dict[str, Dict[str, List[SortKey]]] = {}
+
+    def __len__(self) -> int:
+        return sum(len(records) for records in self._docs.values())
+
+    def _index(self, record: BookmarkRecord) -> None:
+        user_id = record.user_id
+        key = record.sort_key
+        _insert_key(self._by_user.setdefault(user_id, []), key)
+        categories = self._by_category.setdefault(user_id, {})
+        _insert_key(categories.setdefault(record.category, []), key)
+        tags = self._by_tag.setdefault(user_id, {})
+        for tag in set(record.tags):
+            _insert_key(tags.setdefault(tag, []), key)
+
+    def _unindex(self, record: BookmarkRecord) -> None:
+        user_id = record.user_id
+        key = record.sort_key
+        indexes = [(self._by_user, user_id)]
+        categories = self._by_category.get(user_id, {})
+        indexes.append((categories, record.category))
+        tags = self._by_tag.get(user_id, {})
+        indexes.extend((tags, tag) for tag in set(record.tags))
+        for index, index_key in indexes:
+            keys = index.get(index_key)
+            if keys is None:
+                continue
+            _remove_key(keys, key)
+            if not keys:
+                del index[index_key]
+        if not categories:
+            self._by_category.pop(user_id, None)
+        if not tags:
+            self._by_tag.pop(user_id, None)
+
+    def _store(self, record: BookmarkRecord) -> None:
+        self._docs.setdefault(record.user_id, {})[record.id] = record
+        self._index(record)
+
+    def _pop(self, user_id: str, bookmark_id: str) -> Optional[BookmarkRecord]:
+        records = self._docs.get(user_id)
+        if records is None:
+            return None
+        record = records.pop(bookmark_id, None)
+        if record is not None:
+            self._unindex(record)
+            if not records:
+                del self._docs[user_id]
+        return record
+
+    def _matching(
+        self,
+        user_id: str,
+        category: Optional[str],
+        tags: Optional[List[str]],
+        after: Optional[SortKey],
+    ) -> Iterator[SortKey]:
+        """Iterate the keys of matching bookmarks, newest first"""
+        if not tags:
+            if category:
+                keys = self._by_category.get(user_id, {}).get(category, [])
+            else:
+                keys = self._by_user.get(user_id, [])
+            return _descending(keys, after)
+
+        # Bookmarks match any of the tags: merge the per-tag indexes and drop
+        # the repeats of bookmarks carrying several of them
+        user_tags = self._by_tag.get(user_id, {})
+        tag_keys = [user_tags.get(tag, []) for tag in set(tags)]
+        merged = heapq.merge(
+            *(_descending(keys, after) for keys in tag_keys if keys), reverse=True
+        )
+        matches: Iterable[SortKey] = (key for key, _ in itertools.groupby(merged))
+        if category:
+            records = self._docs.get(user_id, {})
+            matches = (key for key in matches if records[key[1]].category == category)
+        return iter(matches)
+
+    async def insert(self, doc: dict) -> BookmarkRecord:
+        """Store a new bookmark document"""
+        record = BookmarkRecord(doc)
+        self._store(record)
+        return record
+
+    async def insert_many(self, docs: List[dict]) -> List[BookmarkRecord]:
+        """Store several new bookmark documents"""
+        return [await self.insert(doc) for doc in docs]
+
+    async def get(self, user_id: str, bookmark_id: str) -> Optional[BookmarkRecord]:
+        """Return a bookmark, or None if it does not exist"""
+        return self._docs.get(user_id, {}).get(bookmark_id)
+
+    async def etag(self, user_id: str, bookmark_id: str) -> Optional[str]:
+        """Return a bookmark's ETag, or None if it does not exist"""
+        record = self._docs.get(user_id, {}).get(bookmark_id)
+        return record.etag if record is not None else None
+
+    async def replace(self, doc: dict) -> Optional[BookmarkRecord]:
+        """Replace an existing bookmark document, or return None if it does not exist"""
+        if self._pop(doc["user_id"], doc["id"]) is None:
+            return None
+        record = BookmarkRecord(doc)
+        self._store(record)
+        return record
+
+    async def delete(self, user_id: str, bookmark_id: str) -> Optional[BookmarkRecord]:
+        """Remove a bookmark and return it, or None if it does not exist"""
+        return self._pop(user_id, bookmark_id)
+
+    async def replace_many(self, docs: List[dict]) -> Optional[List[BookmarkRecord]]:
+        """Replace several existing documents at once.
+
+        All or nothing: if any document does not exist, nothing is changed
+        and None is returned.
+        """
+        if any(doc["id"] not in self._docs.get(doc["user_id"], ()) for doc in docs):
+            return None
+        records = []
+        for doc in docs:
+            self._pop(doc["user_id"], doc["id"])
+            record = BookmarkRecord(doc)
+            self._store(record)
+            records.append(record)
+        return records
+
+    async def patch_many(
+        self, user_id: str, patches: List[Tuple[str, dict]]
+    ) -> List[BookmarkRecord]:
+        """Set fields on existing bookmarks and return the ones that existed"""
+        records = []
+        for bookmark_id, fields in patches:
+            existing = self._pop(user_id, bookmark_id)
+            if existing is not None:
+                record = BookmarkRecord({**existing, **fields})
+                self._store(record)
+                records.append(record)
+        return records
+
+    async def delete_many(
+        self, user_id: str, bookmark_ids: List[str]
+    ) -> List[BookmarkRecord]:
+        """Remove several bookmarks at once and return the ones that existed"""
+        deleted = []
+        for bookmark_id in bookmark_ids:
+            record = self._pop(user_id, bookmark_id)
+            if record is not None:
+                deleted.append(record)
+        return deleted
+
+    async def query(
+        self,
+        user_id: str,
+        category: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        after: Optional[Tuple[str, str]] = None,
+        offset: int = 0,
+        limit: int = 50,
+    ) -> Tuple[List[BookmarkRecord], bool]:
+        """Return a page of matching bookmarks, newest first.
+
+        The page starts strictly after the ``after`` position, a
+        ``(created_at, id)`` pair as read from a document, when given, then
+        skips ``offset`` matches. The second element of the result tells
+        whether more matches follow the page.
+        """
+        if after is not None:
+            after = (to_micros(after[0]), after[1])
+        keys = itertools.islice(
+            self._matching(user_id, category, tags, after), offset, offset + limit + 1
+        )
+        records = self._docs.get(user_id, {})
+        page = [records[bookmark_id] for _, bookmark_id in keys]
+        return page[:limit], len(page) > limit
+
+    async def count(
+        self,
+        user_id: str,
+        category: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+    ) -> int:
+        """Count the matching documents"""
+        if not tags:
+            if category:
+                return len(self._by_category.get(user_id, {}).get(category, ()))
+            return len(self._by_user.get(user_id, ()))
+        return sum(1 for _ in self._matching(user_id, category, tags, None))
+
+    async def categories(self, user_id: str) -> List[str]:
+        """Return the categories the user has bookmarks in"""
+        return list(self._by_category.get(user_id, {}))
+
+    async def facets(self, user_id: str) -> dict:
+        """Count the user's bookmarks in total, per category and per tag"""
+        return {
+            "total": len(self._by_user.get(user_id, ())),
+            "categories": {
+                category: len(keys)
+                for category, keys in self._by_category.get(user_id, {}).items()
+            },
+            "tags": {
+                tag: len(keys) for tag, keys in self._by_tag.get(user_id, {}).items()
+            },
+        }
+
+    def clear(self) -> None:
+        """Remove every document"""
+        self._docs.clear()
+        self._by_user.clear()
+        self._by_category.clear()
+        self._by_tag.clear()
+
+    async def close(self) -> None:
+        """Nothing to release; kept for parity with the SQLite store"""
@@ -0,0 +1,145 @@
+import os
+import sqlite3
+import time
+import uuid
+from typing import Optional, Set
+
+from .sqlite import SQLiteBookmarkStore
+
+# Bytes of the database file each connection maps into memory
+MMAP_SIZE = 256 * 1024 * 1024
+
+# Changes are kept this long for processes that have not caught up yet,
+# and trimmed at most once per interval
+CHANGE_LOG_RETENTION_SECONDS = 3600
+CHANGE_LOG_TRIM_INTERVAL_SECONDS = 60
+
+# Every write to a bookmark appends its user and ID to the change log under a
+# new seq. The writer column is left empty here, so any connection can write
+# to the database, and filled in by the process that made the change.
+_CHANGE_TRIGGER = """
+CREATE TRIGGER IF NOT EXISTS bookmarks_logged_after_{event} AFTER {event} ON bookmarks
+BEGIN
+    INSERT INTO bookmark_change_log (user_id, bookmark_id, changed_at)
+        VALUES ({row}.user_id, {row}.id, CAST(strftime('%s', 'now') AS INTEGER));
+END;
+"""
+
+_SHARED_SCHEMA = """
+CREATE TABLE IF NOT EXISTS bookmark_change_log (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    bookmark_id TEXT NOT NULL,
+    changed_at INTEGER NOT NULL,
+    writer TEXT
+);
+CREATE INDEX IF NOT EXISTS bookmark_change_log_changed_at
+    ON bookmark_change_log (changed_at);
+""" + "".join(
+    _CHANGE_TRIGGER.format(event=event, row=row)
+    for event, row in (("INSERT", "new"), ("UPDATE", "new"), ("DELETE", "old"))
+)
+
+# Highest seq ever handed out, which trimming the log does not lower
+_SELECT_SEQ = "SELECT seq FROM sqlite_sequence WHERE name = 'bookmark_change_log'"
+
+_SELECT_FIRST_SEQ = "SELECT MIN(seq) FROM bookmark_change_log"
+
+_CLAIM_CHANGES = "UPDATE bookmark_change_log SET writer = ? WHERE seq > ?"
+
+_TRIM_CHANGES = "DELETE FROM bookmark_change_log WHERE changed_at < ?"
+
+_SELECT_CHANGES = """
+SELECT DISTINCT user_id FROM bookmark_change_log
+WHERE seq > ? AND seq <= ? AND writer IS NOT ?
+"""
+
+
+def _last_seq(connection: sqlite3.Connection) -> int:
+    row = connection.execute(_SELECT_SEQ).fetchone()
+    return row[0] if row else 0
+
+
+class SharedBookmarkStore(SQLiteBookmarkStore):
+    """Bookmark storage shared by every worker process on the machine.
+
+    Used when ``STORAGE_BACKEND=shared`` and no Cosmos DB endpoint is
+    configured, so ``uvicorn --workers N`` or gunicorn processes all read
+    and write the same bookmarks. It is the SQLite store on a database file
+    that, by default, lives in ``/dev/shm``: the file is in shared memory
+    and each connection maps it with ``mmap``, so reads are served straight
+    from memory. In WAL mode readers never wait for a writer, in this
+    process or another, and writers from all processes take turns on
+    SQLite's write lock.
+
+    Each process still keeps its own derived state, such as the search,
+    facet and duplicate indexes and the in-memory read cache. Triggers append
+    every write to a change log; each write transaction of this process then
+    marks the entries it added as its own. :meth:`changes` reports the users
+    whose bookmarks anyone else wrote since the last call, including tools
+    such as the ``sqlite3`` shell or a plain :class:`SQLiteBookmarkStore`,
+    so that state can be dropped before it is read. Entries are trimmed
+    after ``CHANGE_LOG_RETENTION_SECONDS``.
+    """
+
+    def __init__(self, path: str, readers: int = 4):
+        super().__init__(path, readers=readers)
+        # Tells this process's writes apart from those of other processes
+        self.writer_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._shared_schema_ready = False
+        self._seen_seq: Optional[int] = None
+        self._next_trim = 0.0
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = super()._connect()
+        connection.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+        with self._schema_lock:
+            if not self._shared_schema_ready:
+                connection.executescript(_SHARED_SCHEMA)
+                self._shared_schema_ready = True
+        return connection
+
+    def _transact(self, connection: sqlite3.Connection, function):
+        def logged(connection):
+            # The write lock is held, so every entry after this one is ours
+            seq = _last_seq(connection)
+            result = function(connection)
+            connection.execute(_CLAIM_CHANGES, (self.writer_id, seq))
+            now = time.time()
+            if now >= self._next_trim:
+                cutoff = int(now) - CHANGE_LOG_RETENTION_SECONDS
+                connection.execute(_TRIM_CHANGES, (cutoff,))
+                self._next_trim = now + CHANGE_LOG_TRIM_INTERVAL_SECONDS
+            return result
+
+        return super()._transact(connection, logged)
+
+    async def changes(self) -> Optional[Set[str]]:
+        """IDs of the users whose bookmarks others wrote since the last call.
+
+        The first call only records where the log stands, since a process
+        that has just started has nothing derived to drop. None when entries
+        since the last call have already been trimmed, so what changed is
+        not known and all derived state has to be dropped.
+        """
+
+        def read(connection):
+            seq = _last_seq(connection)
+            seen = self._seen_seq
+            if seen is None or seq <= seen:
+                return seq, []
+            first = connection.execute(_SELECT_FIRST_SEQ).fetchone()[0]
+            if first is None or first > seen + 1:
+                return seq, None
+            # Bounded by seq so changes committed meanwhile are read next time
+            rows = connection.execute(
+                _SELECT_CHANGES, (seen, seq, self.writer_id)
+            ).fetchall()
+            return seq, rows
+
+        seq, rows = await self._read(read)
+        if self._seen_seq is None or seq > self._seen_seq:
+            self._seen_seq = seq
+        if rows is None:
+            return None
+        return {user_id for user_id, in rows}
@@ -0,0 +1,570 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+from backend.search import FIELD_WEIGHTS, tokenize
+
+from .memory import from_micros, to_micros
+
+# SQLite's default limit on host parameters is 999 before 3.32; stay below it
+_MAX_PARAMETERS = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS bookmarks (
+    user_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    title TEXT NOT NULL,
+    url TEXT NOT NULL,
+    description TEXT,
+    category TEXT NOT NULL,
+    tags TEXT NOT NULL,
+    created_at INTEGER NOT NULL,
+    updated_at INTEGER NOT NULL,
+    etag TEXT NOT NULL,
+    link_status TEXT,
+    link_status_code INTEGER,
+    link_checked_at INTEGER,
+    favicon_url TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS bookmarks_user_id
+    ON bookmarks (user_id, id);
+CREATE INDEX IF NOT EXISTS bookmarks_user_created
+    ON bookmarks (user_id, created_at, id);
+CREATE INDEX IF NOT EXISTS bookmarks_user_category
+    ON bookmarks (user_id, category, created_at, id);
+
+CREATE TABLE IF NOT EXISTS bookmark_tags (
+    user_id TEXT NOT NULL,
+    tag TEXT NOT NULL,
+    created_at INTEGER NOT NULL,
+    bookmark_id TEXT NOT NULL,
+    PRIMARY KEY (user_id, tag, created_at, bookmark_id)
+) WITHOUT ROWID;
+
+CREATE VIRTUAL TABLE IF NOT EXISTS bookmarks_fts USING fts5 (
+    title, description, url,
+    content='bookmarks', content_rowid='rowid',
+    tokenize='unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER IF NOT EXISTS bookmarks_after_insert AFTER INSERT ON bookmarks BEGIN
+    INSERT INTO bookmark_tags (user_id, tag, created_at, bookmark_id)
+        SELECT DISTINCT new.user_id, value, new.created_at, new.id
+        FROM json_each(new.tags);
+    INSERT INTO bookmarks_fts (rowid, title, description, url)
+        VALUES (new.rowid, new.title, new.description, new.url);
+END;
+
+CREATE TRIGGER IF NOT EXISTS bookmarks_after_delete AFTER DELETE ON bookmarks BEGIN
+    DELETE FROM bookmark_tags
+        WHERE user_id = old.user_id
+        AND tag IN (SELECT value FROM json_each(old.tags))
+        AND created_at = old.created_at
+        AND bookmark_id = old.id;
+    INSERT INTO bookmarks_fts (bookmarks_fts, rowid, title, description, url)
+        VALUES ('delete', old.rowid, old.title, old.description, old.url);
+END;
+
+CREATE TRIGGER IF NOT EXISTS bookmarks_after_update AFTER UPDATE ON bookmarks BEGIN
+    DELETE FROM bookmark_tags
+        WHERE user_id = old.user_id
+        AND tag IN (SELECT value FROM json_each(old.tags))
+        AND created_at = old.created_at
+        AND bookmark_id = old.id;
+    INSERT INTO bookmark_tags (user_id, tag, created_at, bookmark_id)
+        SELECT DISTINCT new.user_id, value, new.created_at, new.id
+        FROM json_each(new.tags);
+    INSERT INTO bookmarks_fts (bookmarks_fts, rowid, title, description, url)
+        VALUES ('delete', old.rowid, old.title, old.description, old.url);
+    INSERT INTO bookmarks_fts (rowid, title, description, url)
+        VALUES (new.rowid, new.title, new.description, new.url);
+END;
+"""
+
+_COLUMNS = (
+    "id, title, url, description, category, tags, user_id, created_at, updated_at, "
+    "etag, link_status, link_status_code, link_checked_at, favicon_url"
+)
+
+# Columns added since the first schema, created on databases that lack them
+_ADDED_COLUMNS = {
+    "link_status": "TEXT",
+    "link_status_code": "INTEGER",
+    "link_checked_at": "INTEGER",
+    "favicon_url": "TEXT",
+}
+
+# The same columns read from the bookmarks table joined as "b"
+_JOINED_COLUMNS = ", ".join(f"b.{column}" for column in _COLUMNS.split(", "))
+
+_INSERT = (
+    f"INSERT INTO bookmarks ({_COLUMNS}) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+_UPDATE = """
+UPDATE bookmarks
+SET title = ?, url = ?, description = ?, category = ?, tags = ?,
+    updated_at = ?, etag = ?, link_status = ?, link_status_code = ?,
+    link_checked_at = ?, favicon_url = ?
+WHERE user_id = ? AND id = ?
+"""
+
+_SELECT_ONE = f"SELECT {_COLUMNS} FROM bookmarks WHERE user_id = ? AND id = ?"
+
+_SELECT_ETAG = "SELECT etag FROM bookmarks WHERE user_id = ? AND id = ?"
+
+_DELETE_ONE = f"DELETE FROM bookmarks WHERE user_id = ? AND id = ? RETURNING {_COLUMNS}"
+
+
+def _new_etag() -> str:
+    # Quoted like the _etag Cosmos DB puts on its documents
+    return f'"{uuid.uuid4()}"'
+
+
+def _document(row: tuple) -> dict:
+    """Stored document of a ``_COLUMNS`` row"""
+    doc = {
+        "id": row[0],
+        "title": row[1],
+        "url": row[2],
+        "description": row[3],
+        "category": row[4],
+        "tags": json.loads(row[5]),
+        "user_id": row[6],
+        "created_at": from_micros(row[7]),
+        "updated_at": from_micros(row[8]),
+        "_etag": row[9],
+    }
+    if row[12] is not None:
+        doc["link_status"] = row[10]
+        doc["link_status_code"] = row[11]
+        doc["link_checked_at"] = from_micros(row[12])
+    if row[13] is not None:
+        doc["favicon_url"] = row[13]
+    return doc
+
+
+def _placeholders(count: int) -> str:
+    return ", ".join("?" * count)
+
+
+def _match_expression(query: str) -> Optional[str]:
+    """FTS5 query matching any of the search terms, each quoted as a string"""
+    terms = dict.fromkeys(tokenize(query))
+    if not terms:
+        return None
+    return " OR ".join(f'"{term}"' for term in terms)
+
+
+class _MissingDocument(Exception):
+    """Rolls back a write that found one of its bookmarks missing"""
+
+
+class SQLiteBookmarkStore:
+    """Durable bookmark storage in an embedded SQLite database.
+
+    Used instead of the in-memory store when ``STORAGE_BACKEND=sqlite`` and no
+    Cosmos DB endpoint is configured; the operations and their results are
+    the same as :class:`~backend.storage.InMemoryBookmarkStore`.
+
+    The database runs in WAL mode, so readers never wait for the writer.
+    Writes go through one writer thread and reads through a small pool of
+    reader threads, each with its own connection, so no call blocks the event
+    loop. Statements are fixed strings with ``?`` parameters, which the
+    connections' statement caches keep prepared. Tags live in a
+    ``bookmark_tags`` table keyed by ``(user_id, tag, created_at, id)`` and
+    titles, descriptions and URLs in an FTS5 table; triggers keep both in
+    step with the ``bookmarks`` table.
+    """
+
+    def __init__(self, path: str, readers: int = 4):
+        self.path = path
+        self.readers = readers
+        # Started on first use, and again after close()
+        self._writer: Optional[ThreadPoolExecutor] = None
+        self._readers: Optional[ThreadPoolExecutor] = None
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(
+            self.path,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=256,
+        )
+        connection.execute("PRAGMA journal_mode = WAL")
+        connection.execute("PRAGMA synchronous = NORMAL")
+        connection.execute("PRAGMA busy_timeout = 5000")
+        connection.execute("PRAGMA temp_store = MEMORY")
+        with self._schema_lock:
+            if not self._schema_ready:
+                connection.executescript(_SCHEMA)
+                existing = {
+                    row[1] for row in connection.execute("PRAGMA table_info(bookmarks)")
+                }
+                for column, column_type in _ADDED_COLUMNS.items():
+                    if column not in existing:
+                        connection.execute(
+                            f"ALTER TABLE bookmarks ADD COLUMN {column} {column_type}"
+                        )
+                self._schema_ready = True
+            self._connections.append(connection)
+        return connection
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = self._connect()
+        return connection
+
+    def _executors(self) -> Tuple[ThreadPoolExecutor, ThreadPoolExecutor]:
+        if self._writer is None:
+            self._writer = ThreadPoolExecutor(1, thread_name_prefix="sqlite-writer")
+            self._readers = ThreadPoolExecutor(
+                self.readers, thread_name_prefix="sqlite-reader"
+            )
+        return self._writer, self._readers
+
+    async def _read(self, function):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executors()[1], lambda: function(self._connection())
+        )
+
+    def _transact(self, connection: sqlite3.Connection, function):
+        """Run a write function in one immediate transaction"""
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            return function(connection)
+
+    async def _write(self, function):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executors()[0],
+            lambda: self._transact(self._connection(), function),
+        )
+
+    @staticmethod
+    def _row(doc: dict, etag: str) -> tuple:
+        checked_at = doc.get("link_checked_at")
+        return (
+            doc["id"],
+            doc["title"],
+            doc["url"],
+            doc.get("description"),
+            doc.get("category") or "other",
+            json.dumps(doc.get("tags") or []),
+            doc["user_id"],
+            to_micros(doc["created_at"]),
+            to_micros(doc["updated_at"]),
+            etag,
+            doc.get("link_status"),
+            doc.get("link_status_code"),
+            to_micros(checked_at) if checked_at else None,
+            doc.get("favicon_url"),
+        )
+
+    @classmethod
+    def _update_parameters(cls, doc: dict, etag: str) -> tuple:
+        row = cls._row(doc, etag)
+        # title, url, description, category, tags, updated_at, etag, the link
+        # check columns, favicon_url, user_id, id
+        return row[1:6] + (row[8], etag) + row[10:14] + (row[6], row[0])
+
+    async def insert(self, doc: dict) -> dict:
+        """Store a new bookmark document"""
+        return (await self.insert_many([doc]))[0]
+
+    async def insert_many(self, docs: List[dict]) -> List[dict]:
+        """Store several new bookmark documents in one transaction"""
+        stored = [{**doc, "_etag": _new_etag()} for doc in docs]
+
+        def insert(connection):
+            connection.executemany(
+                _INSERT, [self._row(doc, doc["_etag"]) for doc in stored]
+            )
+
+        await self._write(insert)
+        return stored
+
+    async def get(self, user_id: str, bookmark_id: str) -> Optional[dict]:
+        """Return a bookmark document, or None if it does not exist"""
+
+        def get(connection):
+            rows = connection.execute(_SELECT_ONE, (user_id, bookmark_id)).fetchall()
+            return _document(rows[0]) if rows else None
+
+        return await self._read(get)
+
+    async def etag(self, user_id: str, bookmark_id: str) -> Optional[str]:
+        """Return a bookmark's ETag without reading the document"""
+
+        def etag(connection):
+            rows = connection.execute(_SELECT_ETAG, (user_id, bookmark_id)).fetchall()
+            return rows[0][0] if rows else None
+
+        return await self._read(etag)
+
+    async def replace(self, doc: dict) -> Optional[dict]:
+        """Replace an existing bookmark document, or return None if it does not exist"""
+        stored = {**doc, "_etag": _new_etag()}
+
+        def replace(connection):
+            cursor = connection.execute(
+                _UPDATE, self._update_parameters(stored, stored["_etag"])
+            )
+            return stored if cursor.rowcount else None
+
+        return await self._write(replace)
+
+    async def delete(self, user_id: str, bookmark_id: str) -> Optional[dict]:
+        """Remove a bookmark document and return it, or None if it does not exist"""
+
+        def delete(connection):
+            # Read every row so the statement finishes and releases the lock
+            rows = connection.execute(_DELETE_ONE, (user_id, bookmark_id)).fetchall()
+            return _document(rows[0]) if rows else None
+
+        return await self._write(delete)
+
+    async def replace_many(self, docs: List[dict]) -> Optional[List[dict]]:
+        """Replace several existing documents at once.
+
+        All or nothing: if any document does not exist, nothing is changed
+        and None is returned.
+        """
+        stored = [{**doc, "_etag": _new_etag()} for doc in docs]
+
+        def replace_many(connection):
+            for doc in stored:
+                cursor = connection.execute(
+                    _UPDATE, self._update_parameters(doc, doc["_etag"])
+                )
+                if not cursor.rowcount:
+                    raise _MissingDocument()
+            return stored
+
+        try:
+            return await self._write(replace_many)
+        except _MissingDocument:
+            return None
+
+    async def patch_many(
+        self, user_id: str, patches: List[Tuple[str, dict]]
+    ) -> List[dict]:
+        """Set fields on existing bookmarks and return the ones that existed"""
+
+        def patch_many(connection):
+            stored = []
+            for bookmark_id, fields in patches:
+                rows = connection.execute(
+                    _SELECT_ONE, (user_id, bookmark_id)
+                ).fetchall()
+                if not rows:
+                    continue
+                doc = {**_document(rows[0]), **fields, "_etag": _new_etag()}
+                connection.execute(_UPDATE, self._update_parameters(doc, doc["_etag"]))
+                stored.append(doc)
+            return stored
+
+        return await self._write(patch_many)
+
+    async def delete_many(self, user_id: str, bookmark_ids: List[str]) -> List[dict]:
+        """Remove several documents at once and return the ones that existed"""
+        unique_ids = list(dict.fromkeys(bookmark_ids))
+
+        def delete_many(connection):
+            deleted = []
+            for start in range(0, len(unique_ids), _MAX_PARAMETERS):
+                end = start + _MAX_PARAMETERS
+                chunk = unique_ids[start:end]
+                rows = connection.execute(
+                    f"DELETE FROM bookmarks WHERE user_id = ? "
+                    f"AND id IN ({_placeholders(len(chunk))}) RETURNING {_COLUMNS}",
+                    (user_id, *chunk),
+                ).fetchall()
+                deleted.extend(_document(row) for row in rows)
+            return deleted
+
+        return await self._write(delete_many)
+
+    @staticmethod
+    def _filter(
+        user_id: str,
+        category: Optional[str],
+        tags: Optional[List[str]],
+    ) -> Tuple[str, str, list]:
+        """FROM clause, WHERE clause and parameters of a bookmark filter.
+
+        The sort columns are ``k.created_at`` and ``k.id``: the bookmarks
+        table itself, or the tag table when filtering by tags so the scan
+        follows its ``(user_id, tag, created_at)`` key.
+        """
+        if not tags:
+            where = "k.user_id = ?"
+            parameters = [user_id]
+            if category:
+                where += " AND k.category = ?"
+                parameters.append(category)
+            return "bookmarks AS k", where, parameters
+
+        unique_tags = list(dict.fromkeys(tags))
+        source = (
+            "(SELECT user_id, tag, created_at, bookmark_id AS id FROM bookmark_tags) AS k "
+            "JOIN bookmarks AS b ON b.user_id = k.user_id AND b.id = k.id"
+        )
+        where = f"k.user_id = ? AND k.tag IN ({_placeholders(len(unique_tags))})"
+        parameters = [user_id, *unique_tags]
+        if category:
+            where += " AND b.category = ?"
+            parameters.append(category)
+        return source, where, parameters
+
+    async def query(
+        self,
+        user_id: str,
+        category: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        after: Optional[Tuple[str, str]] = None,
+        offset: int = 0,
+        limit: int = 50,
+    ) -> Tuple[List[dict], bool]:
+        """Return a page of matching documents, newest first.
+
+        The page starts strictly after the ``after`` position, a
+        ``(created_at, id)`` pair as read from a document, when given, then
+        skips ``offset`` matches. The second element of the result tells
+        whether more matches follow the page.
+        """
+        source, where, parameters = self._filter(user_id, category, tags)
+        if after is not None:
+            where += " AND (k.created_at, k.id) < (?, ?)"
+            parameters += [to_micros(after[0]), after[1]]
+        if tags:
+            # One row per bookmark carrying several of the tags
+            sql = f"SELECT {_JOINED_COLUMNS} FROM {source} WHERE {where} "
+            sql += "GROUP BY k.created_at, k.id "
+        else:
+            sql = f"SELECT {_COLUMNS} FROM {source} WHERE {where} "
+        sql += "ORDER BY k.created_at DESC, k.id DESC LIMIT ? OFFSET ?"
+        parameters += [limit + 1, offset]
+
+        def query(connection):
+            return connection.execute(sql, parameters).fetchall()
+
+        rows = await self._read(query)
+        docs = [_document(row) for row in rows]
+        return docs[:limit], len(docs) > limit
+
+    async def count(
+        self,
+        user_id: str,
+        category: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+    ) -> int:
+        """Count the matching documents"""
+        source, where, parameters = self._filter(user_id, category, tags)
+        counted = "COUNT(DISTINCT k.id)" if tags else "COUNT(*)"
+        sql = f"SELECT {counted} FROM {source} WHERE {where}"
+
+        def count(connection):
+            return connection.execute(sql, parameters).fetchone()[0]
+
+        return await self._read(count)
+
+    async def categories(self, user_id: str) -> List[str]:
+        """Return the categories the user has bookmarks in"""
+        return list((await self.facets(user_id))["categories"])
+
+    async def facets(self, user_id: str) -> dict:
+        """Count the user's bookmarks in total, per category and per tag"""
+
+        def facets(connection):
+            categories = dict(
+                connection.execute(
+                    "SELECT category, COUNT(*) FROM bookmarks "
+                    "WHERE user_id = ? GROUP BY category",
+                    (user_id,),
+                ).fetchall()
+            )
+            tags = dict(
+                connection.execute(
+                    "SELECT tag, COUNT(*) FROM bookmark_tags "
+                    "WHERE user_id = ? GROUP BY tag",
+                    (user_id,),
+                ).fetchall()
+            )
+            return {
+                "total": sum(categories.values()),
+                "categories": categories,
+                "tags": tags,
+            }
+
+        return await self._read(facets)
+
+    async def search(
+        self, user_id: str, query: str, limit: int = 20
+    ) -> Tuple[List[Tuple[dict, float]], int]:
+        """Rank the user's bookmarks matching any search term with FTS5's BM25.
+
+        Returns the top ``limit`` (document, score) pairs, best first, and
+        the number of matching bookmarks.
+        """
+        expression = _match_expression(query)
+        if expression is None:
+            return [], 0
+        weights = ", ".join(
+            str(FIELD_WEIGHTS[f]) for f in ("title", "description", "url")
+        )
+        matches = (
+            "FROM bookmarks_fts JOIN bookmarks AS b ON b.rowid = bookmarks_fts.rowid "
+            "WHERE bookmarks_fts MATCH ? AND b.user_id = ?"
+        )
+
+        def search(connection):
+            rows = connection.execute(
+                f"SELECT {_JOINED_COLUMNS}, bm25(bookmarks_fts, {weights}) AS rank {matches} "
+                "ORDER BY rank LIMIT ?",
+                (expression, user_id, limit),
+            ).fetchall()
+            total = connection.execute(
+                f"SELECT COUNT(*) {matches}", (expression, user_id)
+            ).fetchone()[0]
+            return rows, total
+
+        rows, total = await self._read(search)
+        # bm25() is lower for better matches
+        return [(_document(row[:-1]), -row[-1]) for row in rows], total
+
+    def clear(self) -> None:
+        """Remove every document"""
+
+        def clear(connection):
+            connection.execute("DELETE FROM bookmarks")
+
+        writer, _ = self._executors()
+        writer.submit(lambda: self._transact(self._connection(), clear)).result()
+
+    async def close(self) -> None:
+        """Finish pending work and close every connection.
+
+        The store opens new connections if it is used again.
+        """
+        if self._writer is None:
+            return
+        writer, readers = self._writer, self._readers
+        self._writer = self._readers = None
+        writer.shutdown(wait=True)
+        readers.shutdown(wait=True)
+        with self._schema_lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections.clear()
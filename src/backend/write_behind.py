@@ -0,0 +1,278 @@
+"""Write-behind buffering that coalesces bursts of bookmark updates"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Writes one user's coalesced updates: (bookmark_id, fields to set) pairs
+Writer = Callable[[str, List[Tuple[str, dict]]], Awaitable[None]]
+
+# Told the IDs of one user's bookmarks whose updates were dropped
+DropHandler = Callable[[str, List[str]], Awaitable[None]]
+
+
+class _PendingWrite:
+    """Fields still to be written to one bookmark, and the document they give"""
+
+    __slots__ = ("fields", "doc", "attempts")
+
+    def __init__(self, doc: dict):
+        self.fields: dict = {}
+        self.doc = doc
+        # Failed attempts at writing these fields
+        self.attempts = 0
+
+    def merge(self, fields: dict) -> None:
+        self.fields.update(fields)
+        self.doc.update(fields)
+
+
+def _always(error: Exception) -> bool:
+    return True
+
+
+class WriteBehindQueue:
+    """Buffer of pending bookmark updates, written per user after a short delay.
+
+    Updates to the same bookmark within ``delay_ms`` are merged into one
+    write, and a user's pending writes go out together, at most
+    ``max_batch`` per call to ``writer``. Each user (a Cosmos DB partition)
+    has at most one flush running, so writes to a partition stay in order.
+    Until a write lands, :meth:`get` returns the updated document, so a
+    client reads back what it wrote.
+
+    A write that fails with an error ``retryable`` accepts is tried again,
+    waiting twice as long after each failure up to ``max_backoff_ms``, and
+    dropped after ``max_attempts``. Any other failure drops the update at
+    once; when a batch fails that way its updates are sent one by one, so
+    only the ones that cannot be applied are lost. Dropped updates are
+    logged, counted in :attr:`dropped` and passed to ``on_drop``, so state
+    derived from the updated documents can be rebuilt from storage.
+    """
+
+    def __init__(
+        self,
+        writer: Writer,
+        delay_ms: float = 200,
+        max_batch: int = 100,
+        max_attempts: int = 5,
+        max_backoff_ms: float = 30000,
+        retryable: Callable[[Exception], bool] = _always,
+        on_drop: Optional[DropHandler] = None,
+    ):
+        self._writer = writer
+        self._on_drop = on_drop
+        self.delay = delay_ms / 1000
+        self.max_batch = max_batch
+        self.max_attempts = max_attempts
+        self.max_backoff = max_backoff_ms / 1000
+        self._retryable = retryable
+        # user_id -> bookmark_id -> write waiting for the next flush
+        self._pending: Dict[str, Dict[str, _PendingWrite]] = {}
+        # user_id -> bookmark_id -> write being sent right now
+        self._inflight: Dict[str, Dict[str, _PendingWrite]] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._wakeups: Dict[str, asyncio.Event] = {}
+        # user_id -> drains waiting for the user's next flush to finish
+        self._waiters: Dict[str, List[asyncio.Future]] = {}
+        self._closing = False
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return sum(len(writes) for writes in self._pending.values())
+
+    def get(self, user_id: str, bookmark_id: str) -> Optional[dict]:
+        """The document as updated by writes not yet stored, or None"""
+        for buffer in (self._pending, self._inflight):
+            write = buffer.get(user_id, {}).get(bookmark_id)
+            if write is not None:
+                return write.doc
+        return None
+
+    def has_pending(self, user_id: str) -> bool:
+        return user_id in self._pending or user_id in self._inflight
+
+    def enqueue(self, user_id: str, bookmark_id: str, fields: dict, doc: dict) -> dict:
+        """Buffer an update and return the document it gives.
+
+        ``doc`` is the bookmark as currently stored; it is only used when
+        no earlier update to the bookmark is still buffered.
+        """
+        writes = self._pending.setdefault(user_id, {})
+        write = writes.get(bookmark_id)
+        if write is None:
+            base = self.get(user_id, bookmark_id) or doc
+            write = writes[bookmark_id] = _PendingWrite(dict(base))
+        write.merge(fields)
+
+        if user_id not in self._tasks:
+            self._wakeups[user_id] = asyncio.Event()
+            self._tasks[user_id] = asyncio.create_task(self._run(user_id))
+        if len(writes) >= self.max_batch:
+            self._wakeups[user_id].set()
+        return dict(write.doc)
+
+    async def discard(self, user_id: str, bookmark_id: str) -> None:
+        """Drop a bookmark's buffered update, e.g. before deleting it.
+
+        An update of the bookmark already being written is waited for.
+        """
+        writes = self._pending.get(user_id)
+        if writes is not None:
+            writes.pop(bookmark_id, None)
+            if not writes:
+                del self._pending[user_id]
+        if bookmark_id in self._inflight.get(user_id, ()):
+            await self._next_flush(user_id)
+
+    async def drain(self, user_id: Optional[str] = None) -> None:
+        """Write buffered updates now, for one user or for everyone.
+
+        Each buffered update gets one attempt, without waiting out a
+        backoff. Updates that still fail stay buffered for their retries,
+        so this returns even while some writes cannot be applied.
+        """
+        user_ids = [user_id] if user_id is not None else list(self._tasks)
+        for key in user_ids:
+            if key in self._inflight:
+                await self._next_flush(key)
+            if key in self._pending and key in self._tasks:
+                self._wakeups[key].set()
+                await self._next_flush(key)
+
+    async def _next_flush(self, user_id: str) -> None:
+        """Wait for the user's next flush to finish, or for the flushing to stop"""
+        if user_id not in self._tasks:
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(user_id, []).append(waiter)
+        await asyncio.shield(waiter)
+
+    def _notify(self, user_id: str) -> None:
+        for waiter in self._waiters.pop(user_id, ()):
+            if not waiter.done():
+                waiter.set_result(None)
+
+    async def close(self) -> None:
+        """Write every buffered update; later failures are logged, not retried"""
+        self._closing = True
+        try:
+            await self.drain()
+            await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        finally:
+            self._closing = False
+
+    async def _run(self, user_id: str) -> None:
+        wakeup = self._wakeups[user_id]
+        delay = self.delay
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                wakeup.clear()
+                writes = self._pending.pop(user_id, None)
+                if not writes:
+                    break
+                self._inflight[user_id] = writes
+                try:
+                    attempts = await self._flush(user_id, writes)
+                finally:
+                    del self._inflight[user_id]
+                    self._notify(user_id)
+                if user_id not in self._pending:
+                    break
+                # Back off while writes keep failing
+                delay = min(self.delay * 2**attempts, self.max_backoff)
+        finally:
+            del self._tasks[user_id]
+            del self._wakeups[user_id]
+            self._notify(user_id)
+
+    async def _write(
+        self, user_id: str, batch: List[Tuple[str, _PendingWrite]]
+    ) -> Optional[Exception]:
+        try:
+            await self._writer(
+                user_id, [(bookmark_id, write.fields) for bookmark_id, write in batch]
+            )
+        except Exception as e:
+            return e
+        return None
+
+    async def _flush(self, user_id: str, writes: Dict[str, _PendingWrite]) -> int:
+        """Send a user's updates; returns the attempts made at those requeued"""
+        items = list(writes.items())
+        for start in range(0, len(items), self.max_batch):
+            end = start + self.max_batch
+            batch = items[start:end]
+            error = await self._write(user_id, batch)
+            if error is None:
+                continue
+            if self._retryable(error):
+                return await self._retry(user_id, items[start:], error)
+            if len(batch) == 1:
+                await self._drop(user_id, batch, error)
+                continue
+            # A batch is all or nothing; find the updates that cannot be applied
+            for index, item in enumerate(batch):
+                error = await self._write(user_id, [item])
+                if error is None:
+                    continue
+                if self._retryable(error):
+                    return await self._retry(
+                        user_id, batch[index:] + items[end:], error
+                    )
+                await self._drop(user_id, [item], error)
+        return 0
+
+    async def _retry(
+        self, user_id: str, failed: List[Tuple[str, _PendingWrite]], error: Exception
+    ) -> int:
+        retry = {}
+        exhausted = []
+        for bookmark_id, write in failed:
+            write.attempts += 1
+            if self._closing or write.attempts >= self.max_attempts:
+                exhausted.append((bookmark_id, write))
+            else:
+                retry[bookmark_id] = write
+        if exhausted:
+            await self._drop(user_id, exhausted, error)
+        if not retry:
+            return 0
+        logger.warning(
+            f"Failed to write {len(retry)} buffered updates for {user_id}, "
+            f"retrying: {error}"
+        )
+        self._requeue(user_id, retry)
+        return max(write.attempts for write in retry.values())
+
+    async def _drop(
+        self, user_id: str, writes: List[Tuple[str, _PendingWrite]], error: Exception
+    ) -> None:
+        self.dropped += len(writes)
+        bookmark_ids = [bookmark_id for bookmark_id, _ in writes]
+        logger.error(
+            f"Dropped {len(writes)} buffered updates for {user_id} "
+            f"({', '.join(bookmark_ids)}): {error}"
+        )
+        if self._on_drop is None:
+            return
+        try:
+            await self._on_drop(user_id, bookmark_ids)
+        except Exception as e:
+            logger.error(f"Failed to handle dropped updates for {user_id}: {e}")
+
+    def _requeue(self, user_id: str, failed: Dict[str, _PendingWrite]) -> None:
+        # Updates buffered since the flush started are newer and win
+        writes = self._pending.setdefault(user_id, {})
+        for bookmark_id, write in failed.items():
+            newer = writes.get(bookmark_id)
+            if newer is not None:
+                write.fields.update(newer.fields)
+                write.doc = newer.doc
+            writes[bookmark_id] = write
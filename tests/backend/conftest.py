@@ -0,0 +1,65 @@
+"""Fixtures shared by the backend tests"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Local stand-in for the sites bookmarks point to.
+
+    Every request is recorded on the server as ``(method, path, headers)``
+    and answered by the server's ``route(handler)``, which returns the
+    status, extra headers and body.
+    """
+
+    def do_HEAD(self):
+        self.respond(with_body=False)
+
+    def do_GET(self):
+        self.respond(with_body=True)
+
+    def respond(self, with_body):
+        server = self.server
+        server.requests.append((self.command, self.path, dict(self.headers)))
+        with server.lock:
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+        try:
+            status, headers, body = server.route(self)
+        finally:
+            with server.lock:
+                server.active -= 1
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if with_body:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def serve():
+    """Start stand-in servers answering with a route function"""
+    servers = []
+
+    def start(route):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+        server.route = route
+        server.requests = []
+        server.lock = threading.Lock()
+        server.active = server.max_active = 0
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        server.base_url = f"http://127.0.0.1:{server.server_port}"
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,7 @@
+"""Plain helpers imported by the backend tests"""
+
+
+async def as_async(docs):
+    """Yield documents from an async iterator, as storage scans do"""
+    for doc in docs:
+        yield doc
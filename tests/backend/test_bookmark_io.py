@@ -0,0 +1,132 @@
+import json
+import os
+import sys
+
+import pytest
+
+# Add the src directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+
+from backend.services.bookmark_io import (  # noqa: E402
+    ImportFormatError,
+    iter_export,
+    iter_import_rows,
+)
+from tests.backend.helpers import as_async  # noqa: E402
+
+NETSCAPE_EXPORT = b"""<!DOCTYPE NETSCAPE-Bookmark-file-1>
+<TITLE>Bookmarks</TITLE>
+<DL><p>
+    <DT><H3>Dev &amp; Tools</H3>
+    <DL><p>
+        <DT><A HREF="https://python.org/" TAGS="lang">Python</A>
+        <DD>The Python site
+    </DL><p>
+    <DT><A HREF="https://news.ycombinator.com/">HN</A>
+</DL><p>
+"""
+
+
+async def chunked(data: bytes, size: int):
+    for start in range(0, len(data), size):
+        end = start + size
+        yield data[start:end]
+
+
+async def collect(rows):
+    return [row async for row in rows]
+
+
+STORED_DOCS = [
+    {
+        "id": "1",
+        "title": 'Quotes "and" <tags>',
+        "url": "https://example.com/?a=1&b=2",
+        "description": "Fish & chips",
+        "category": "news",
+        "tags": ["one", "two"],
+        "user_id": "user",
+        "created_at": "2025-08-11T10:00:00",
+        "updated_at": "2025-08-11T10:00:00",
+    },
+    {
+        "id": "2",
+        "title": "Plain",
+        "url": "https://example.org/",
+        "description": None,
+        "category": "other",
+        "tags": [],
+        "user_id": "user",
+        "created_at": "2025-08-10T10:00:00",
+        "updated_at": "2025-08-10T10:00:00",
+    },
+]
+
+
+class TestImportParsers:
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("chunk_size", [1, 16, 4096])
+    async def test_netscape_html_streams_in_any_chunk_size(self, chunk_size):
+        """Folders become tags and descriptions attach to their link"""
+        rows = await collect(iter_import_rows(chunked(NETSCAPE_EXPORT, chunk_size)))
+
+        assert rows == [
+            {
+                "url": "https://python.org/",
+                "title": "Python",
+                "tags": ["Dev & Tools", "lang"],
+                "description": "The Python site",
+            },
+            {"url": "https://news.ycombinator.com/", "title": "HN", "tags": []},
+        ]
+
+    @pytest.mark.asyncio
+    async def test_json_array_and_chrome_tree(self):
+        """Arrays are read element by element; browser trees are flattened"""
+        array = json.dumps([{"title": "A", "url": "https://a.example/"}]).encode()
+        chrome = json.dumps(
+            {
+                "roots": {
+                    "bookmark_bar": {
+                        "name": "Bar",
+                        "children": [{"name": "B", "url": "https://b.example/"}],
+                    }
+                }
+            }
+        ).encode()
+
+        assert await collect(iter_import_rows(chunked(array, 5))) == [
+            {"title": "A", "url": "https://a.example/"}
+        ]
+        rows = await collect(iter_import_rows(chunked(chrome, 5), "json"))
+        assert [(row["title"], row["tags"]) for row in rows] == [("B", ["Bar"])]
+
+    @pytest.mark.asyncio
+    async def test_truncated_json_is_rejected(self):
+        """A file that ends mid-value raises ImportFormatError"""
+        with pytest.raises(ImportFormatError):
+            await collect(iter_import_rows(chunked(b'[{"url": "https://a', 4)))
+
+
+class TestExportSerializers:
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("format", ["ndjson", "html"])
+    async def test_exports_import_back(self, format):
+        """NDJSON and Netscape HTML exports round-trip through the importer"""
+        exported = b"".join(await collect(iter_export(as_async(STORED_DOCS), format)))
+
+        rows = await collect(iter_import_rows(chunked(exported, 64)))
+
+        assert [row["title"] for row in rows] == [doc["title"] for doc in STORED_DOCS]
+        assert [row["tags"] for row in rows] == [doc["tags"] for doc in STORED_DOCS]
+        assert rows[0]["description"] == "Fish & chips"
+
+    @pytest.mark.asyncio
+    async def test_csv_has_header_and_one_line_per_bookmark(self):
+        """CSV exports quote fields and join tags with commas"""
+        exported = b"".join(await collect(iter_export(as_async(STORED_DOCS), "csv")))
+        lines = exported.decode("utf-8").splitlines()
+
+        assert lines[0].startswith("id,title,url")
+        assert len(lines) == 3
+        assert '"one,two"' in lines[1]
@@ -0,0 +1,515 @@
+import asyncio
+import os
+import sys
+import uuid
+
+import orjson
+import pytest
+from azure.cosmos import exceptions
+
+# Add the src directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+
+import backend.services.bookmark_service as bookmark_service  # noqa: E402
+from backend.cache import BookmarkCache, InMemoryCacheBackend  # noqa: E402
+from backend.models import (  # noqa: E402
+    Bookmark,
+    BookmarkCreate,
+    BookmarkSelection,
+    BookmarkUpdate,
+)
+from backend.services import BookmarkService, InvalidCursorError  # noqa: E402
+from backend.storage import BookmarkRecord  # noqa: E402
+from backend.write_behind import WriteBehindQueue  # noqa: E402
+
+
+@pytest.fixture
+def service():
+    """Bookmark service running against the in-memory development store"""
+    return BookmarkService(None)
+
+
+@pytest.fixture
+def user_id():
+    """A fresh user so tests do not see each other's bookmarks"""
+    return f"user-{uuid.uuid4()}"
+
+
+async def create_bookmarks(service, user_id, count, **fields):
+    created = []
+    for i in range(count):
+        bookmark = BookmarkCreate(
+            title=f"Bookmark {i}",
+            url=f"https://example.com/{uuid.uuid4().hex}",
+            user_id=user_id,
+            **fields,
+        )
+        created.append(await service.create_bookmark(bookmark))
+    return created
+
+
+class TestPagination:
+    @pytest.mark.asyncio
+    async def test_cursor_walks_every_bookmark_once(self, service, user_id):
+        """Following next_cursor visits each bookmark exactly once, newest first"""
+        created = await create_bookmarks(service, user_id, 7)
+
+        seen = []
+        cursor = None
+        while True:
+            bookmarks, total, cursor = await service.get_bookmarks(
+                user_id=user_id, page_size=3, cursor=cursor
+            )
+            assert total == 7
+            seen.extend(bookmark.id for bookmark in bookmarks)
+            if cursor is None:
+                break
+
+        assert seen == [bookmark.id for bookmark in reversed(created)]
+
+    @pytest.mark.asyncio
+    async def test_total_can_be_skipped(self, service, user_id):
+        """include_total=False returns the page without counting"""
+        await create_bookmarks(service, user_id, 3)
+
+        bookmarks, total, _ = await service.get_bookmarks(
+            user_id=user_id, page_size=2, include_total=False
+        )
+        assert len(bookmarks) == 2
+        assert total is None
+        _, total, _ = await service.get_bookmarks(user_id=user_id, page_size=2)
+        assert total == 3
+
+    @pytest.mark.asyncio
+    async def test_invalid_cursor_is_rejected(self, service, user_id):
+        """A malformed cursor raises InvalidCursorError"""
+        with pytest.raises(InvalidCursorError):
+            await service.get_bookmarks(user_id=user_id, cursor="not-a-cursor")
+
+
+class TestInMemoryStore:
+    @pytest.mark.asyncio
+    async def test_filters_by_category_and_tags(self, service, user_id):
+        """Category and tag filters are served from the store's indexes"""
+        await create_bookmarks(service, user_id, 2, category="work", tags=["a"])
+        await create_bookmarks(service, user_id, 2, category="news", tags=["b"])
+        await create_bookmarks(service, user_id, 1, category="work", tags=["a", "b"])
+
+        _, total, _ = await service.get_bookmarks(user_id=user_id, category="work")
+        assert total == 3
+        bookmarks, total, _ = await service.get_bookmarks(user_id=user_id, tags=["b"])
+        assert total == 3
+        assert len({bookmark.id for bookmark in bookmarks}) == 3
+        _, total, _ = await service.get_bookmarks(
+            user_id=user_id, category="news", tags=["a", "b"]
+        )
+        assert total == 2
+
+    @pytest.mark.asyncio
+    async def test_update_and_delete_keep_indexes_consistent(self, service, user_id):
+        """Updated and deleted bookmarks move out of the old indexes"""
+        first, second = await create_bookmarks(service, user_id, 2, tags=["old"])
+
+        await service.update_bookmark(
+            first.id, BookmarkUpdate(category="news", tags=["new"]), user_id
+        )
+        assert await service.delete_bookmark(second.id, user_id)
+
+        _, total, _ = await service.get_bookmarks(user_id=user_id, tags=["old"])
+        assert total == 0
+        bookmarks, total, _ = await service.get_bookmarks(
+            user_id=user_id, category="news", tags=["new"]
+        )
+        assert [bookmark.id for bookmark in bookmarks] == [first.id]
+        assert await service.get_bookmark(second.id, user_id) is None
+        assert "news" in await service.get_categories(user_id)
+
+
+class TestReadThroughCache:
+    @pytest.fixture
+    def cached_service(self):
+        return BookmarkService(None, BookmarkCache(InMemoryCacheBackend()))
+
+    @pytest.mark.asyncio
+    async def test_write_during_single_read_is_not_cached_over(
+        self, cached_service, user_id
+    ):
+        """A bookmark read before a concurrent write is not kept in the cache"""
+        (bookmark,) = await create_bookmarks(cached_service, user_id, 1)
+        read_document = cached_service._read_document
+
+        async def read_then_write(bookmark_id, user_id):
+            doc = dict(await read_document(bookmark_id, user_id))
+            await cached_service.update_bookmark(
+                bookmark_id, BookmarkUpdate(title="Renamed"), user_id
+            )
+            return doc
+
+        cached_service._read_document = read_then_write
+        stale = await cached_service.get_bookmark(bookmark.id, user_id)
+        cached_service._read_document = read_document
+
+        assert stale.title == "Bookmark 0"
+        fresh = await cached_service.get_bookmark(bookmark.id, user_id)
+        assert fresh.title == "Renamed"
+
+    @pytest.mark.asyncio
+    async def test_write_during_list_read_is_not_cached_over(
+        self, cached_service, user_id
+    ):
+        """A page fetched before a concurrent write is not kept in the cache"""
+        await create_bookmarks(cached_service, user_id, 2)
+        fetch_page = cached_service._fetch_page
+
+        async def fetch_then_write(*args):
+            result = await fetch_page(*args)
+            await create_bookmarks(cached_service, user_id, 1)
+            return result
+
+        cached_service._fetch_page = fetch_then_write
+        _, stale_total, _ = await cached_service.get_bookmarks(user_id)
+        cached_service._fetch_page = fetch_page
+
+        assert stale_total == 2
+        _, total, _ = await cached_service.get_bookmarks(user_id)
+        assert total == 3
+
+
+class TestBookmarkRecord:
+    def test_record_reads_as_its_document(self):
+        """Compact records give back the stored document and the same bookmark"""
+        doc = {
+            "id": "b1",
+            "user_id": "u1",
+            "title": "Example",
+            "url": "https://example.com/",
+            "description": None,
+            "category": "work",
+            "tags": ["a", "b"],
+            "created_at": "2024-01-02T03:04:05.678901",
+            "updated_at": "2024-01-02T03:04:05",
+        }
+
+        record = BookmarkRecord(doc)
+        other = BookmarkRecord({**doc, "id": "b2", "tags": ["".join(["a"])]})
+
+        assert {k: v for k, v in record.items() if k != "_etag"} == doc
+        assert record.to_bookmark() == Bookmark.from_document(dict(record))
+        assert record.tags[0] is other.tags[0]
+        assert record["_etag"] != other["_etag"]
+
+
+class TestStoredDocuments:
+    def test_from_document_matches_validation(self):
+        """Trusted documents give the same bookmark as validating them"""
+        doc = {
+            "id": "b1",
+            "user_id": "u1",
+            "title": "Example",
+            "url": "https://example.com",
+            "description": None,
+            "category": "work",
+            "tags": ["a"],
+            "created_at": "2024-01-02T03:04:05.678901",
+            "updated_at": "2024-01-02T03:04:05",
+            "_etag": '"1"',
+            "_rid": "internal",
+        }
+
+        assert Bookmark.from_document(doc) == Bookmark(**doc)
+        encoded = orjson.dumps(Bookmark.from_document(doc).to_json_dict())
+        assert encoded == Bookmark(**doc).model_dump_json().encode()
+
+    def test_from_document_validates_other_shapes(self):
+        """Documents missing stored fields fall back to full validation"""
+        bookmark = Bookmark.from_document(
+            {"id": "b1", "user_id": "u1", "title": "Old", "url": "https://a.com"}
+        )
+
+        assert str(bookmark.url) == "https://a.com/"
+        assert bookmark.created_at is not None
+
+
+class FakeBatchContainer:
+    """Just enough of a Cosmos container to exercise transactional batches"""
+
+    def __init__(self, bookmark_ids, missing=()):
+        self.bookmark_ids = bookmark_ids
+        self.missing = set(missing)
+        self.batches = []
+
+    async def query_items(self, query, parameters, partition_key):
+        for bookmark_id in self.bookmark_ids:
+            yield bookmark_id
+
+    async def execute_item_batch(self, batch_operations, partition_key):
+        self.batches.append(list(batch_operations))
+        for index, (_, args) in enumerate(batch_operations):
+            if args[0] in self.missing:
+                responses = [{"statusCode": 424} for _ in batch_operations]
+                responses[index] = {"statusCode": 404}
+                raise exceptions.CosmosBatchOperationError(
+                    error_index=index,
+                    headers={},
+                    status_code=404,
+                    message="Not found",
+                    operation_responses=responses,
+                )
+        return [{"statusCode": 204} for _ in batch_operations]
+
+
+class TestBulkOperations:
+    @pytest.mark.asyncio
+    async def test_bulk_delete_by_filter(self, service, user_id):
+        """Only the bookmarks matching the filter are deleted"""
+        await create_bookmarks(service, user_id, 3, category="work")
+        kept = await create_bookmarks(service, user_id, 2, category="news")
+
+        result = await service.bulk_delete(user_id, BookmarkSelection(category="work"))
+
+        assert result == {"matched": 3, "processed": 3, "batches": 1}
+        bookmarks, total, _ = await service.get_bookmarks(user_id=user_id)
+        assert total == 2
+        assert {bookmark.id for bookmark in bookmarks} == {b.id for b in kept}
+
+    @pytest.mark.asyncio
+    async def test_bulk_update_by_ids(self, service, user_id):
+        """Listed bookmarks get the new fields and move between indexes"""
+        first, second, third = await create_bookmarks(service, user_id, 3, tags=["a"])
+
+        result = await service.bulk_update(
+            user_id,
+            BookmarkSelection(ids=[first.id, third.id, "missing"]),
+            BookmarkUpdate(tags=["b"], category="news"),
+        )
+
+        assert result["matched"] == 2
+        assert result["processed"] == 2
+        bookmarks, _, _ = await service.get_bookmarks(user_id=user_id, tags=["b"])
+        assert {bookmark.id for bookmark in bookmarks} == {first.id, third.id}
+        assert all(bookmark.category == "news" for bookmark in bookmarks)
+        assert (await service.get_bookmark(second.id, user_id)).tags == ["a"]
+
+    @pytest.mark.asyncio
+    async def test_cosmos_batches_hold_up_to_100_operations(self, user_id):
+        """Deletes go out 100 per batch and a vanished bookmark is dropped"""
+        bookmark_ids = [f"bookmark-{i}" for i in range(250)]
+        container = FakeBatchContainer(bookmark_ids, missing={"bookmark-120"})
+        service = BookmarkService(container)
+
+        result = await service.bulk_delete(user_id, BookmarkSelection(tags=["old"]))
+
+        assert [len(batch) for batch in container.batches] == [100, 100, 99, 50]
+        assert result == {"matched": 250, "processed": 249, "batches": 4}
+
+
+class FakeDocumentContainer:
+    """Cosmos container keeping documents in a dict and counting calls"""
+
+    def __init__(self, docs):
+        self.docs = {doc["id"]: dict(doc) for doc in docs}
+        self.reads = 0
+        self.batches = []
+
+    async def read_item(self, item, partition_key):
+        self.reads += 1
+        if item not in self.docs:
+            raise exceptions.CosmosResourceNotFoundError(message="Not found")
+        return {**self.docs[item], "_etag": '"stored"'}
+
+    async def delete_item(self, item, partition_key):
+        del self.docs[item]
+
+    async def execute_item_batch(self, batch_operations, partition_key):
+        self.batches.append(list(batch_operations))
+        for _, (bookmark_id, patch) in batch_operations:
+            for operation in patch:
+                self.docs[bookmark_id][operation["path"][1:]] = operation["value"]
+        return [{"statusCode": 200} for _ in batch_operations]
+
+
+class FakeQueryContainer(FakeDocumentContainer):
+    """Document container also answering queries, filtered by category only"""
+
+    def query_items(self, query, parameters, partition_key, max_item_count=None):
+        category = next(
+            (p["value"] for p in parameters if p["name"] == "@category"), None
+        )
+        docs = [
+            dict(doc)
+            for doc in self.docs.values()
+            if category is None or doc["category"] == category
+        ]
+        if "COUNT(1)" in query:
+            docs = [len(docs)]
+        return FakeQuery(docs)
+
+
+class FakeQuery:
+    """Query results iterated in one page, as the Cosmos pager gives them"""
+
+    def __init__(self, items):
+        self.items = items
+        self.continuation_token = None
+
+    async def __aiter__(self):
+        for item in self.items:
+            yield item
+
+    def by_page(self, continuation_token=None):
+        return self
+
+    async def __anext__(self):
+        return self
+
+
+class TestWriteBehind:
+    @staticmethod
+    def make_service(user_id, count, container_class=FakeDocumentContainer):
+        docs = [
+            {
+                "id": f"bookmark-{i}",
+                "title": f"Bookmark {i}",
+                "url": f"https://example.com/{i}",
+                "description": None,
+                "category": "other",
+                "tags": [],
+                "user_id": user_id,
+                "created_at": "2024-01-01T00:00:00",
+                "updated_at": "2024-01-01T00:00:00",
+            }
+            for i in range(count)
+        ]
+        container = container_class(docs)
+        queue = WriteBehindQueue(
+            lambda user_id, writes: service.write_buffered(user_id, writes),
+            delay_ms=50,
+            retryable=bookmark_service._is_retryable_write,
+            on_drop=lambda user_id, ids: service.drop_buffered(user_id, ids),
+        )
+        service = BookmarkService(
+            container, BookmarkCache(InMemoryCacheBackend()), write_queue=queue
+        )
+        return service, container, queue
+
+    @pytest.mark.asyncio
+    async def test_burst_of_updates_is_one_write(self, user_id):
+        """Updates to a bookmark are merged, read back, and written in one batch"""
+        service, container, queue = self.make_service(user_id, 2)
+        for i in range(5):
+            await service.update_bookmark(
+                "bookmark-0", BookmarkUpdate(tags=[f"t{i}"]), user_id
+            )
+        await service.update_bookmark(
+            "bookmark-0", BookmarkUpdate(title="Renamed"), user_id
+        )
+        await service.update_bookmark(
+            "bookmark-1", BookmarkUpdate(category="news"), user_id
+        )
+
+        pending = await service.get_bookmark("bookmark-0", user_id)
+        assert (pending.title, pending.tags, pending.etag) == ("Renamed", ["t4"], None)
+        assert container.reads == 2
+        assert container.batches == []
+
+        await queue.drain()
+        assert len(container.batches) == 1
+        assert [args[0] for _, args in container.batches[0]] == [
+            "bookmark-0",
+            "bookmark-1",
+        ]
+        assert container.docs["bookmark-0"]["title"] == "Renamed"
+        assert container.docs["bookmark-0"]["tags"] == ["t4"]
+        assert container.docs["bookmark-1"]["category"] == "news"
+        assert queue.get(user_id, "bookmark-0") is None
+
+    @pytest.mark.asyncio
+    async def test_delete_drops_buffered_update(self, user_id):
+        """A deleted bookmark's buffered update is never written"""
+        service, container, queue = self.make_service(user_id, 1)
+        await service.update_bookmark(
+            "bookmark-0", BookmarkUpdate(title="Renamed"), user_id
+        )
+        assert await service.delete_bookmark("bookmark-0", user_id)
+
+        await queue.close()
+        assert container.batches == []
+        assert (
+            await service.update_bookmark(
+                "bookmark-0", BookmarkUpdate(title="Again"), user_id
+            )
+            is None
+        )
+
+    @pytest.mark.asyncio
+    async def test_failing_write_does_not_hang_drain(self, user_id):
+        """A write that always fails backs off, is dropped, and never blocks drain"""
+        calls = []
+
+        async def writer(user_id, writes):
+            calls.append(writes)
+            raise ConnectionError("unreachable")
+
+        queue = WriteBehindQueue(writer, delay_ms=5, max_attempts=3)
+        queue.enqueue(user_id, "bookmark-0", {"title": "Lost"}, {"id": "bookmark-0"})
+
+        await asyncio.wait_for(queue.drain(user_id), 1)
+        assert len(calls) == 1
+        assert queue.get(user_id, "bookmark-0")["title"] == "Lost"
+
+        while queue.has_pending(user_id):
+            await asyncio.sleep(0.01)
+        assert len(calls) == 3
+        assert queue.dropped == 1
+        assert queue.get(user_id, "bookmark-0") is None
+
+    @pytest.mark.asyncio
+    async def test_rejected_update_is_dropped_from_its_batch(self, user_id):
+        """A client error drops only the update it names, without retries"""
+        written = []
+
+        class Rejected(Exception):
+            status_code = 400
+
+        async def writer(user_id, writes):
+            if any(fields.get("title") == "bad" for _, fields in writes):
+                raise Rejected("malformed patch")
+            written.extend(bookmark_id for bookmark_id, _ in writes)
+
+        queue = WriteBehindQueue(
+            writer, delay_ms=5, retryable=bookmark_service._is_retryable_write
+        )
+        for i, title in enumerate(["good", "bad", "good"]):
+            queue.enqueue(user_id, f"bookmark-{i}", {"title": title}, {})
+
+        await asyncio.wait_for(queue.drain(user_id), 1)
+
+        assert written == ["bookmark-0", "bookmark-2"]
+        assert queue.dropped == 1
+        assert not queue.has_pending(user_id)
+
+    @pytest.mark.asyncio
+    async def test_dropped_update_leaves_no_trace_in_reads(self, user_id):
+        """Search, list totals and reads show the stored bookmark once dropped"""
+        service, container, queue = self.make_service(user_id, 2, FakeQueryContainer)
+        assert (await service.get_facets(user_id))["categories"] == {"other": 2}
+        assert (await service.search_bookmarks(user_id, "bookmark"))[1] == 2
+        await service.update_bookmark(
+            "bookmark-0", BookmarkUpdate(title="Renamed", category="news"), user_id
+        )
+
+        class Rejected(Exception):
+            status_code = 400
+
+        async def reject(batch_operations, partition_key):
+            raise Rejected("malformed patch")
+
+        container.execute_item_batch = reject
+        await queue.drain(user_id)
+        assert queue.dropped == 1
+
+        assert await service.search_bookmarks(user_id, "renamed") == ([], 0)
+        _, total, _ = await service.get_bookmarks(user_id, category="news")
+        assert total == 0
+        bookmark = await service.get_bookmark("bookmark-0", user_id)
+        assert (bookmark.title, bookmark.category) == ("Bookmark 0", "other")
@@ -9,6 +9,7 @@ from fastapi.testclient import TestClient
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "src"))
 
 # Import backend modules first to make them available for mocking
+import backend.cache  # noqa: E402
 import backend.database  # noqa: E402
 import backend.services.bookmark_service  # noqa: E402
 from backend.models import Bookmark, BookmarkCreate  # noqa: E402
@@ -21,6 +22,7 @@ def mock_cosmos_dependencies():
     with patch.object(backend.database, "cosmos_client") as mock_cosmos_client:
         # Mock the cosmos client
         mock_cosmos_client.initialize = AsyncMock()
+        mock_cosmos_client.container = None  # development mode
         mock_cosmos_client.get_container = Mock(return_value=Mock())
 
         # Mock get_database function to return None (development mode)
@@ -33,7 +35,7 @@ def mock_cosmos_dependencies():
             ) as mock_get_service:
                 mock_service = Mock()
                 mock_service.create_bookmark = AsyncMock()
-                mock_service.get_bookmarks = AsyncMock(return_value=([], 0))
+                mock_service.get_bookmarks = AsyncMock(return_value=([], 0, None))
                 mock_service.get_bookmark = AsyncMock()
                 mock_service.update_bookmark = AsyncMock()
                 mock_service.delete_bookmark = AsyncMock()
@@ -96,7 +98,7 @@ class TestBookmarksAPI:
 
     def test_get_bookmarks_success(self, client, mock_cosmos_dependencies):
         """Test getting bookmarks returns proper structure"""
-        # The mock is already set up to return ([], 0) for get_bookmarks
+        # The mock is already set up to return ([], 0, None) for get_bookmarks
         response = client.get("/api/v1/bookmarks/")
         assert response.status_code == 200
         data = response.json()
@@ -145,7 +147,121 @@ class TestBookmarksAPI:
             assert response.status_code == 201
             data = response.json()
             assert data["title"] == "Test Bookmark"
-            assert data["url"] == "https://example.com"
+            assert data["url"] == "https://example.com/"
+
+    def test_import_bookmarks_reports_row_errors(self, client):
+        """Importing an export creates valid rows and reports invalid ones"""
+        export = b"""<DL><p>
+            <DT><A HREF="https://example.com/one">One</A>
+            <DT><A HREF="not-a-url">Broken</A>
+            <DT><A HREF="https://example.com/two">Two</A>
+        </DL><p>"""
+
+        response = client.post(
+            "/api/v1/bookmarks/import?user_id=import_user", content=export
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["imported"] == 2
+        assert data["failed"] == 1
+        assert data["errors"][0]["row"] == 2
+
+    def test_import_reports_tree_rows_with_invalid_urls(self, client):
+        """A browser tree node whose URL is not a string fails only its own row"""
+        export = {
+            "roots": {
+                "bar": {"children": [{"url": 5}, {"url": "https://example.com/ok"}]}
+            }
+        }
+
+        response = client.post(
+            "/api/v1/bookmarks/import?user_id=tree_import_user", json=export
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["imported"] == 1
+        assert data["failed"] == 1
+        assert data["errors"][0]["row"] == 1
+
+    def test_update_with_stale_etag_is_rejected(self, client):
+        """PUT with If-Match succeeds on the current ETag and 412s on an old one"""
+        created = client.post(
+            "/api/v1/bookmarks/?user_id=etag_user",
+            json={
+                "title": "Original",
+                "url": "https://example.com",
+                "user_id": "etag_user",
+            },
+        ).json()
+        url = f"/api/v1/bookmarks/{created['id']}?user_id=etag_user"
+        etag = client.get(url).headers["ETag"]
+
+        response = client.put(url, json={"title": "First"}, headers={"If-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+
+        response = client.put(url, json={"title": "Second"}, headers={"If-Match": etag})
+        assert response.status_code == 412
+        assert client.get(url).json()["title"] == "First"
+
+    def test_unchanged_list_returns_not_modified(self, client):
+        """A poll with the list's ETag gets 304 until the user writes"""
+        url = "/api/v1/bookmarks/?user_id=poll_user"
+        etag = client.get(url).headers["ETag"]
+
+        response = client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+
+        client.post(
+            "/api/v1/bookmarks/",
+            json={"title": "New", "url": "https://example.com", "user_id": "poll_user"},
+        )
+        response = client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.json()["total"] == 1
+
+    def test_list_polls_work_without_a_cache(self, client):
+        """The list version does not depend on caching being enabled"""
+        url = "/api/v1/bookmarks/?user_id=uncached_poll_user"
+        with patch.object(backend.cache.bookmark_cache, "backend", None):
+            etag = client.get(url).headers["ETag"]
+            assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+            client.post(
+                "/api/v1/bookmarks/",
+                json={
+                    "title": "New",
+                    "url": "https://example.com/uncached",
+                    "user_id": "uncached_poll_user",
+                },
+            )
+            assert client.get(url, headers={"If-None-Match": etag}).status_code == 200
+
+    def test_unchanged_bookmark_is_not_read(self, client):
+        """A single-bookmark poll is answered from the stored ETag alone"""
+        created = client.post(
+            "/api/v1/bookmarks/?user_id=single_poll_user",
+            json={
+                "title": "Original",
+                "url": "https://example.com/single",
+                "user_id": "single_poll_user",
+            },
+        ).json()
+        url = f"/api/v1/bookmarks/{created['id']}?user_id=single_poll_user"
+        etag = client.get(url).headers["ETag"]
+
+        with patch.object(
+            backend.services.bookmark_service.BookmarkService, "get_bookmark"
+        ) as get_bookmark:
+            response = client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        get_bookmark.assert_not_called()
+
+        client.put(url, json={"title": "Renamed"})
+        response = client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.json()["title"] == "Renamed"
 
 
 # Test the models
@@ -178,9 +294,10 @@ class TestBookmarkModels:
 
     def test_bookmark_create_validation_error(self):
         """Test validation errors in bookmark creation"""
-        # Test missing title
+        # A missing title is fetched from the page, an empty one is invalid
+        assert BookmarkCreate(url="https://example.com").title is None
         with pytest.raises(ValueError):
-            BookmarkCreate(url="https://example.com")
+            BookmarkCreate(title="", url="https://example.com")
 
         # Test missing URL
         with pytest.raises(ValueError):
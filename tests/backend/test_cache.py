@@ -0,0 +1,101 @@
+import os
+import sys
+
+import pytest
+
+# Add the src directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+
+from backend.cache import BookmarkCache, InMemoryCacheBackend  # noqa: E402
+
+
+class TestBookmarkCache:
+    @pytest.mark.asyncio
+    async def test_lru_evicts_least_recently_used(self):
+        """The in-process backend stays within max_entries"""
+        backend = InMemoryCacheBackend(max_entries=2, ttl_seconds=60)
+        await backend.set("a", 1)
+        await backend.set("b", 2)
+        await backend.get("a")
+        await backend.set("c", 3)
+
+        assert await backend.get("a") == 1
+        assert await backend.get("b") is None
+        assert len(backend) == 2
+
+    @pytest.mark.asyncio
+    async def test_expired_entries_are_misses(self):
+        """Entries older than the TTL are not served"""
+        backend = InMemoryCacheBackend()
+        cache = BookmarkCache(backend)
+        generation = await cache.generation("user")
+        backend.ttl_seconds = 0
+        await cache.set_bookmark("user", "id", {"id": "id"}, generation)
+
+        assert await cache.get_bookmark("user", "id", generation) is None
+        assert cache.stats()["misses"] == 1
+
+    @pytest.mark.asyncio
+    async def test_invalidate_drops_item_and_list_entries(self):
+        """A write forgets every cached bookmark and list result of its owner"""
+        cache = BookmarkCache(InMemoryCacheBackend())
+        shape = {"category": None, "page": 1}
+        generation = await cache.generation("user")
+        other = await cache.generation("other")
+        await cache.set_bookmark("user", "id", {"id": "id"}, generation)
+        await cache.set_list("user", shape, {"items": []}, generation)
+        await cache.set_list("other", shape, {"items": []}, other)
+        assert await cache.get_list("user", shape, generation) == {"items": []}
+
+        await cache.invalidate("user")
+
+        generation = await cache.generation("user")
+        assert await cache.get_bookmark("user", "id", generation) is None
+        assert await cache.get_list("user", shape, generation) is None
+        assert await cache.get_list("other", shape, other) == {"items": []}
+        assert cache.stats()["hits"] == 2
+
+    @pytest.mark.asyncio
+    async def test_results_stored_under_an_old_generation_are_not_read(self):
+        """A result fetched before an invalidation is stored where no one looks"""
+        cache = BookmarkCache(InMemoryCacheBackend())
+        shape = {"category": None, "page": 1}
+        before = await cache.generation("user")
+
+        await cache.invalidate("user")
+        await cache.set_bookmark("user", "id", {"id": "id"}, before)
+        await cache.set_list("user", shape, {"items": []}, before)
+
+        after = await cache.generation("user")
+        assert await cache.get_bookmark("user", "id", after) is None
+        assert await cache.get_list("user", shape, after) is None
+
+    @pytest.mark.asyncio
+    async def test_disabled_cache_stores_nothing(self):
+        """Without a backend there is no generation and every read misses"""
+        cache = BookmarkCache()
+        generation = await cache.generation("user")
+        await cache.set_bookmark("user", "id", {"id": "id"}, generation)
+
+        assert generation is None
+        assert await cache.get_bookmark("user", "id", generation) is None
+
+    @pytest.mark.asyncio
+    async def test_version_changes_only_on_writes(self):
+        """Versions outlive expired generations and are kept without a backend"""
+        backend = InMemoryCacheBackend(ttl_seconds=0)
+        for cache in (BookmarkCache(backend), BookmarkCache()):
+            version = await cache.version("user")
+            assert await cache.version("user") == version
+
+            await cache.invalidate("user")
+
+            assert await cache.version("user") != version
+
+    @pytest.mark.asyncio
+    async def test_unshared_versions_expire(self):
+        """Versions kept in this process are replaced after their TTL"""
+        cache = BookmarkCache(InMemoryCacheBackend(), version_ttl_seconds=0)
+        version = await cache.version("user")
+
+        assert await cache.version("user") != version
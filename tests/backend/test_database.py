@@ -0,0 +1,93 @@
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+from azure.core.credentials import AccessToken
+
+# Add the src directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+
+from backend.config import settings  # noqa: E402
+from backend.database import CachedTokenCredential, CosmosDBClient  # noqa: E402
+
+
+class CountingCredential:
+    def __init__(self):
+        self.calls = 0
+
+    async def get_token(self, *scopes, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return AccessToken(f"token-{self.calls}", int(time.time()) + 3600)
+
+    async def close(self):
+        pass
+
+
+class TestCachedTokenCredential:
+    @pytest.mark.asyncio
+    async def test_concurrent_callers_share_one_fetch(self):
+        """Only one token is fetched, however many requests need it at once"""
+        inner = CountingCredential()
+        credential = CachedTokenCredential(inner)
+
+        tokens = await asyncio.gather(
+            *(credential.get_token("https://example/.default") for _ in range(5))
+        )
+
+        assert inner.calls == 1
+        assert {token.token for token in tokens} == {"token-1"}
+
+    @pytest.mark.asyncio
+    async def test_token_is_refreshed_before_expiry(self):
+        """A token inside the refresh margin is replaced"""
+        inner = CountingCredential()
+        credential = CachedTokenCredential(inner, refresh_margin=7200)
+
+        await credential.get_token("scope")
+        await credential.get_token("scope")
+
+        assert inner.calls == 2
+
+
+class TestFastStart:
+    @pytest.mark.asyncio
+    async def test_initialize_makes_no_network_calls(self, monkeypatch):
+        """Fast start returns at once with clients built but not yet ready"""
+        monkeypatch.setattr(settings, "cosmos_endpoint", "https://localhost:1/")
+        monkeypatch.setattr(settings, "cosmos_fast_start", True)
+        client = CosmosDBClient()
+
+        started = time.monotonic()
+        await client.initialize()
+        elapsed = time.monotonic() - started
+
+        try:
+            assert elapsed < 0.5
+            assert client.initialized
+            assert client.container is not None
+            assert not client.ready
+        finally:
+            await client.close()
+
+
+class TestLazyImports:
+    def test_mock_mode_does_not_import_azure(self):
+        """Importing the app without a Cosmos DB endpoint loads no Azure SDK"""
+        src = os.path.join(os.path.dirname(__file__), "..", "..", "src")
+        code = (
+            "import sys, backend.main; "
+            "print(sorted(m for m in sys.modules if m.startswith(('azure', 'aiohttp'))))"
+        )
+        env = {**os.environ, "COSMOS_ENDPOINT": "", "PYTHONPATH": src}
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        assert result.stdout.strip() == "[]"
@@ -0,0 +1,193 @@
+import os
+import sys
+import uuid
+
+import pytest
+
+# Add the src directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+
+from backend.config import settings  # noqa: E402
+from backend.duplicates import duplicate_index, normalize_url  # noqa: E402
+from backend.models import (  # noqa: E402
+    BookmarkCreate,
+    BookmarkSelection,
+    BookmarkUpdate,
+)
+from backend.services import BookmarkService, DuplicateBookmarkError  # noqa: E402
+from tests.backend.helpers import as_async  # noqa: E402
+
+
+def bookmark(user_id, url):
+    return BookmarkCreate(title="Bookmark", url=url, user_id=user_id)
+
+
+class TestNormalizeUrl:
+    def test_variants_of_a_page_share_a_key(self):
+        """Case, default ports, trailing slashes, tracking and fragments are ignored"""
+        key = normalize_url("https://example.com/docs?page=2")
+        for url in (
+            "HTTPS://Example.COM/docs/?page=2",
+            "https://example.com:443/docs?utm_source=feed&page=2#intro",
+            "https://example.com/docs//?page=2&fbclid=abc",
+        ):
+            assert normalize_url(url) == key
+
+    def test_different_pages_keep_different_keys(self):
+        """Path case, other parameters, schemes and ports still tell pages apart"""
+        keys = {
+            normalize_url(url)
+            for url in (
+                "https://example.com/docs?page=2",
+                "https://example.com/Docs?page=2",
+                "https://example.com/docs?page=3",
+                "http://example.com/docs?page=2",
+                "https://example.com:8443/docs?page=2",
+            )
+        }
+        assert len(keys) == 5
+
+
+class TestDuplicateDetection:
+    @pytest.fixture(autouse=True)
+    def reject_duplicates(self, monkeypatch):
+        monkeypatch.setattr(settings, "duplicate_urls", "reject")
+
+    @pytest.mark.asyncio
+    async def test_allowed_duplicates_skip_the_index(self, monkeypatch):
+        """With duplicates allowed, creates neither check nor build the URL index"""
+        monkeypatch.setattr(settings, "duplicate_urls", "allow")
+        service = BookmarkService(None)
+        user_id = f"user-{uuid.uuid4()}"
+        for _ in range(2):
+            await service.create_bookmark(bookmark(user_id, "https://example.com/a"))
+
+        assert not duplicate_index.is_loaded(user_id)
+        clusters = await service.get_duplicates(user_id)
+        assert len(clusters[0]["bookmark_ids"]) == 2
+
+    @pytest.mark.asyncio
+    async def test_create_and_update_reject_a_known_url(self):
+        """A second bookmark for the same page is refused with the first one's ID"""
+        service = BookmarkService(None)
+        user_id = f"user-{uuid.uuid4()}"
+        first = await service.create_bookmark(
+            bookmark(user_id, "https://example.com/a")
+        )
+        other = await service.create_bookmark(
+            bookmark(user_id, "https://example.com/b")
+        )
+
+        with pytest.raises(DuplicateBookmarkError) as error:
+            await service.create_bookmark(
+                bookmark(user_id, "https://EXAMPLE.com/a/?utm_medium=email")
+            )
+        assert error.value.bookmark_id == first.id
+        with pytest.raises(DuplicateBookmarkError):
+            await service.update_bookmark(
+                other.id, BookmarkUpdate(url="https://example.com/a#top"), user_id
+            )
+        # Another user, and the bookmark itself, may keep the URL
+        await service.create_bookmark(bookmark("someone-else", "https://example.com/a"))
+        await service.update_bookmark(
+            first.id, BookmarkUpdate(url="https://example.com/a/"), user_id
+        )
+
+    @pytest.mark.asyncio
+    async def test_evicted_index_is_rebuilt_before_checking(self):
+        """A URL is still refused after the user's index was dropped"""
+        service = BookmarkService(None)
+        user_id = f"user-{uuid.uuid4()}"
+        first = await service.create_bookmark(
+            bookmark(user_id, "https://example.com/a")
+        )
+        duplicate_index.drop(user_id)
+
+        with pytest.raises(DuplicateBookmarkError) as error:
+            await service.create_bookmark(bookmark(user_id, "https://example.com/a"))
+        assert error.value.bookmark_id == first.id
+
+    @pytest.mark.asyncio
+    async def test_bulk_update_rejects_a_known_url(self):
+        """Bulk updates may not set a URL another bookmark has, or one on many"""
+        service = BookmarkService(None)
+        user_id = f"user-{uuid.uuid4()}"
+        first, second, third = [
+            await service.create_bookmark(bookmark(user_id, url))
+            for url in (
+                "https://example.com/a",
+                "https://example.com/b",
+                "https://example.com/c",
+            )
+        ]
+
+        with pytest.raises(DuplicateBookmarkError) as error:
+            await service.bulk_update(
+                user_id,
+                BookmarkSelection(ids=[second.id]),
+                BookmarkUpdate(url=first.url),
+            )
+        assert error.value.bookmark_id == first.id
+        with pytest.raises(DuplicateBookmarkError):
+            await service.bulk_update(
+                user_id,
+                BookmarkSelection(ids=[second.id, third.id]),
+                BookmarkUpdate(url="https://example.com/d"),
+            )
+        result = await service.bulk_update(
+            user_id,
+            BookmarkSelection(ids=[second.id]),
+            BookmarkUpdate(url="https://example.com/d"),
+        )
+        assert result["processed"] == 1
+
+    @pytest.mark.asyncio
+    async def test_import_skips_duplicates(self):
+        """Rows for pages already bookmarked, or repeated in the file, are skipped"""
+        service = BookmarkService(None)
+        user_id = f"user-{uuid.uuid4()}"
+        await service.create_bookmark(bookmark(user_id, "https://example.com/a"))
+        rows = [
+            {"url": "https://example.com/a?utm_source=x"},
+            {"url": "https://example.com/b"},
+            {"url": "https://example.com/b/#again"},
+            {"url": "https://example.com/c"},
+        ]
+
+        result = await service.import_bookmarks(user_id, as_async(rows))
+
+        assert result["imported"] == 2
+        assert result["duplicates"] == 2
+        _, total, _ = await service.get_bookmarks(user_id=user_id)
+        assert total == 3
+
+    @pytest.mark.asyncio
+    async def test_clusters_follow_writes(self, monkeypatch):
+        """Clusters are reported from the index and change with deletes"""
+        monkeypatch.setattr(settings, "duplicate_urls", "allow")
+        service = BookmarkService(None)
+        user_id = f"user-{uuid.uuid4()}"
+        ids = [
+            (await service.create_bookmark(bookmark(user_id, url))).id
+            for url in (
+                "https://example.com/a",
+                "https://example.com/a/",
+                "https://example.com/a#x",
+                "https://example.com/b",
+                "https://example.com/b?gclid=1",
+                "https://example.com/c",
+            )
+        ]
+
+        clusters = await service.get_duplicates(user_id)
+        assert [cluster["url"] for cluster in clusters] == [
+            "https://example.com/a",
+            "https://example.com/b",
+        ]
+        assert set(clusters[0]["bookmark_ids"]) == set(ids[:3])
+        assert set(clusters[1]["bookmark_ids"]) == set(ids[3:5])
+
+        await service.delete_bookmark(ids[4], user_id)
+        clusters = await service.get_duplicates(user_id)
+        assert len(clusters) == 1
+        assert set(clusters[0]["bookmark_ids"]) == set(ids[:3])
@@ -0,0 +1,227 @@
+import os
+import sys
+import uuid
+
+import httpx
+import pytest
+
+# Add the src directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+
+import backend.outbound as outbound  # noqa: E402
+from backend.enrichment import MetadataEnricher, parse_head  # noqa: E402
+from backend.models import BookmarkCreate  # noqa: E402
+from backend.outbound import BlockedAddressError, is_public_address  # noqa: E402
+from backend.services import BookmarkService  # noqa: E402
+
+ARTICLE = b"""<!doctype html>
+<html><head>
+<meta charset="utf-8">
+<title>
+  Caf\xc3\xa9 &amp; Code
+</title>
+<meta name="description" content="Notes on brewing">
+<link rel="shortcut icon" href="/static/icon.png">
+</head><body><svg><title>Not the title</title></svg></body></html>"""
+
+PLAIN = b"<html><head><title>Plain page</title></head><body>text</body></html>"
+
+
+def route(handler):
+    """Pages new bookmarks point to, and the site's favicon"""
+    headers = {"Content-Type": "text/html; charset=utf-8"}
+    if handler.path == "/article":
+        return 200, headers, ARTICLE
+    if handler.path.startswith("/plain"):
+        return 200, headers, PLAIN
+    if handler.path == "/favicon.ico":
+        return 200, headers, b""
+    return 404, headers, b""
+
+
+@pytest.fixture
+def stand_in(serve):
+    return serve(route)
+
+
+class TestParseHead:
+    def test_title_description_and_icon(self):
+        """Whitespace is collapsed, entities decoded and icon links resolved"""
+        metadata = parse_head(ARTICLE.decode(), "https://example.com/posts/1")
+        assert metadata == {
+            "title": "Café & Code",
+            "description": "Notes on brewing",
+            "favicon_url": "https://example.com/static/icon.png",
+        }
+
+    def test_open_graph_fallbacks(self):
+        """og:title and og:description fill in for missing tags"""
+        html = (
+            '<head><meta property="og:title" content="Shared">'
+            '<meta property="og:description" content="From a card"></head>'
+        )
+        assert parse_head(html, "https://example.com/") == {
+            "title": "Shared",
+            "description": "From a card",
+            "favicon_url": None,
+        }
+
+
+class TestMetadataEnricher:
+    @pytest.mark.asyncio
+    async def test_created_bookmarks_are_enriched_in_the_background(self, stand_in):
+        """Metadata is saved later, without overwriting what the user gave"""
+        enricher = MetadataEnricher(workers=2, timeout=2, allow_private=True)
+        service = BookmarkService(None, enricher=enricher)
+        user_id = f"user-{uuid.uuid4()}"
+        try:
+            article = await service.create_bookmark(
+                BookmarkCreate(url=f"{stand_in.base_url}/article", user_id=user_id)
+            )
+            assert article.title == f"{stand_in.base_url}/article"
+            plain = await service.create_bookmark(
+                BookmarkCreate(
+                    title="My title", url=f"{stand_in.base_url}/plain", user_id=user_id
+                )
+            )
+            await service.create_bookmark(
+                BookmarkCreate(url=f"{stand_in.base_url}/plain-2", user_id=user_id)
+            )
+            await service.create_bookmark(
+                BookmarkCreate(url=f"{stand_in.base_url}/missing", user_id=user_id)
+            )
+            await enricher.join()
+            metrics = "\n".join(enricher.render())
+        finally:
+            await enricher.close()
+
+        article = await service.get_bookmark(article.id, user_id)
+        assert article.title == "Café & Code"
+        assert article.description == "Notes on brewing"
+        assert article.favicon_url == f"{stand_in.base_url}/static/icon.png"
+
+        plain = await service.get_bookmark(plain.id, user_id)
+        assert plain.title == "My title"
+        assert plain.favicon_url == f"{stand_in.base_url}/favicon.ico"
+        # The site's favicon was looked up once for both plain pages
+        requests = [(method, path) for method, path, _ in stand_in.requests]
+        assert requests.count(("HEAD", "/favicon.ico")) == 1
+
+        assert 'metadata_enrichment_duration_seconds_count{result="ok"} 3' in metrics
+        assert (
+            'metadata_enrichment_duration_seconds_count{result="failed"} 1' in metrics
+        )
+
+    @pytest.mark.asyncio
+    async def test_full_queue_drops_urls(self):
+        """Bookmarks beyond the queue size are counted and not enriched"""
+        enricher = MetadataEnricher(workers=1, queue_size=1)
+
+        async def apply(user_id, bookmark_id, metadata):
+            pass
+
+        try:
+            queued = [
+                enricher.enqueue("user", str(i), "http://127.0.0.1:1/", apply)
+                for i in range(3)
+            ]
+            metrics = enricher.render()
+        finally:
+            await enricher.close()
+
+        assert queued == [True, False, False]
+        assert "metadata_enrichment_queue_depth 1" in metrics
+        assert "metadata_enrichment_dropped_total 2" in metrics
+
+
+class TestPrivateAddresses:
+    @pytest.mark.parametrize(
+        "address",
+        [
+            "127.0.0.1",
+            "10.1.2.3",
+            "172.16.0.1",
+            "192.168.1.1",
+            "169.254.169.254",
+            "100.64.0.1",
+            "0.0.0.0",
+            "240.0.0.1",
+            "224.0.0.1",
+            "::1",
+            "fe80::1",
+            "fd00::1",
+            "::ffff:127.0.0.1",
+        ],
+    )
+    def test_internal_addresses_are_not_public(self, address):
+        """Loopback, private, link-local and reserved addresses are refused"""
+        assert not is_public_address(address)
+
+    def test_internet_addresses_are_public(self):
+        """Addresses on the internet may be fetched"""
+        assert is_public_address("93.184.216.34")
+        assert is_public_address("2606:2800:220:1:248:1893:25c8:1946")
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        "url",
+        ["http://127.0.0.1:1/", "http://localhost:1/", "http://169.254.169.254/"],
+    )
+    async def test_private_urls_are_not_fetched(self, url):
+        """Nothing is sent to an internal host"""
+        sent = []
+        enricher = MetadataEnricher(transport=httpx.MockTransport(sent.append))
+        try:
+            with pytest.raises(BlockedAddressError):
+                await enricher.fetch(url)
+        finally:
+            await enricher.close()
+
+        assert sent == []
+
+    @pytest.mark.asyncio
+    async def test_redirect_to_a_private_address_is_not_followed(self):
+        """Every redirect hop is checked, not just the URL of the bookmark"""
+        sent = []
+
+        def handler(request):
+            sent.append(request)
+            return httpx.Response(
+                302, headers={"Location": "http://169.254.169.254/latest/meta-data/"}
+            )
+
+        enricher = MetadataEnricher(transport=httpx.MockTransport(handler))
+        try:
+            with pytest.raises(BlockedAddressError):
+                await enricher.fetch("http://93.184.216.34/page")
+        finally:
+            await enricher.close()
+
+        assert [str(request.url) for request in sent] == ["http://93.184.216.34/page"]
+
+    @pytest.mark.asyncio
+    async def test_http_requests_go_to_the_checked_address(self, monkeypatch):
+        """The host is not resolved again, and the page keeps its own URL"""
+
+        async def resolve(host, port):
+            return ["93.184.216.34"]
+
+        monkeypatch.setattr(outbound, "_resolve", resolve)
+        sent = []
+
+        def handler(request):
+            sent.append((str(request.url), request.headers["Host"]))
+            if request.url.path == "/favicon.ico":
+                return httpx.Response(200)
+            return httpx.Response(
+                200, headers={"Content-Type": "text/html"}, content=PLAIN
+            )
+
+        enricher = MetadataEnricher(transport=httpx.MockTransport(handler))
+        try:
+            metadata = await enricher.fetch("http://example.test/page")
+        finally:
+            await enricher.close()
+
+        assert sent[0] == ("http://93.184.216.34/page", "example.test")
+        assert metadata["favicon_url"] == "http://example.test/favicon.ico"
@@ -0,0 +1,108 @@
+import os
+import sys
+import uuid
+
+import pytest
+
+# Add the src directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+
+import backend.services.bookmark_service as bookmark_service  # noqa: E402
+from backend.cache import BookmarkCache  # noqa: E402
+from backend.facets import FacetIndex  # noqa: E402
+from backend.models import BookmarkCreate, BookmarkUpdate  # noqa: E402
+from backend.services import BookmarkService  # noqa: E402
+from tests.backend.helpers import as_async  # noqa: E402
+
+
+class CountingContainer:
+    """Container stand-in answering every query with one COUNT result"""
+
+    def __init__(self, count):
+        self.count = count
+        self.queries = []
+
+    def query_items(self, query, parameters, partition_key):
+        self.queries.append(query)
+        return as_async([self.count])
+
+
+class TestFacetIndex:
+    @pytest.mark.asyncio
+    async def test_counts_follow_updates_and_deletes(self):
+        """Updating a bookmark moves it between facets; deleting drops it"""
+        index = FacetIndex()
+        docs = [
+            {"id": "1", "user_id": "user", "category": "work", "tags": ["a", "b"]},
+            {"id": "2", "user_id": "user", "category": "work", "tags": ["a"]},
+        ]
+        await index.load("user", as_async(docs))
+
+        index.add({"id": "2", "user_id": "user", "category": "news", "tags": ["c"]})
+        index.remove("user", "1")
+
+        assert index.facets("user") == {
+            "total": 1,
+            "categories": {"news": 1},
+            "tags": {"c": 1},
+        }
+
+    @pytest.mark.asyncio
+    async def test_old_counts_are_rebuilt(self):
+        """Counts older than max_age are not served, so they are reloaded"""
+        index = FacetIndex(max_age=60)
+        docs = [{"id": "1", "user_id": "user", "category": "work", "tags": []}]
+        await index.load("user", as_async(docs))
+        assert index.count("user") == 1
+
+        index._built_at["user"] -= 61
+
+        assert index.count("user") is None
+        docs.append({"id": "2", "user_id": "user", "category": "work", "tags": []})
+        await index.load("user", as_async(docs))
+        assert index.count("user") == 2
+
+    @pytest.mark.asyncio
+    async def test_list_total_is_counted_once_counts_are_old(self, monkeypatch):
+        """The list total falls back to a COUNT query rather than old counts"""
+        index = FacetIndex(max_age=60)
+        docs = [{"id": "1", "user_id": "user", "category": "work", "tags": []}]
+        await index.load("user", as_async(docs))
+        monkeypatch.setattr(bookmark_service, "facet_index", index)
+        container = CountingContainer(5)
+        service = BookmarkService(container, BookmarkCache())
+
+        assert await service._count_total("user", None, None) == 1
+        index._built_at["user"] -= 61
+        assert await service._count_total("user", None, None) == 5
+        assert container.queries == [
+            "SELECT VALUE COUNT(1) FROM c WHERE c.user_id = @user_id"
+        ]
+
+    @pytest.mark.asyncio
+    async def test_service_facets_in_development_mode(self):
+        """The in-memory store counts facets from its indexes"""
+        service = BookmarkService(None)
+        user_id = f"user-{uuid.uuid4()}"
+        for i, tags in enumerate((["a"], ["a", "b"], [])):
+            await service.create_bookmark(
+                BookmarkCreate(
+                    title="Bookmark",
+                    url=f"https://example.com/{i}",
+                    category="work",
+                    tags=tags,
+                    user_id=user_id,
+                )
+            )
+        bookmarks, _, _ = await service.get_bookmarks(user_id=user_id, tags=["b"])
+        await service.update_bookmark(
+            bookmarks[0].id, BookmarkUpdate(category="news"), user_id
+        )
+
+        facets = await service.get_facets(user_id)
+
+        assert facets == {
+            "total": 3,
+            "categories": {"work": 2, "news": 1},
+            "tags": {"a": 2, "b": 1},
+        }
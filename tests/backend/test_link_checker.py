@@ -0,0 +1,140 @@
+import asyncio
+import os
+import sys
+import time
+import uuid
+
+import httpx
+import pytest
+
+# Add the src directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+
+from backend.link_checker import LinkChecker  # noqa: E402
+from backend.models import BookmarkCreate  # noqa: E402
+from backend.services import BookmarkService  # noqa: E402
+
+
+def route(handler):
+    """Answers of the sites link checks are run against"""
+    path, headers = handler.path, handler.headers
+    status, extra = 200, {}
+    if path == "/gone":
+        status = 404
+    elif path == "/error":
+        status = 500
+    elif path == "/no-head" and handler.command == "HEAD":
+        status = 405
+    elif path == "/moved":
+        status, extra = 301, {"Location": "/ok"}
+    elif path == "/cached" and "If-Modified-Since" in headers:
+        status = 304
+    elif path == "/slow":
+        time.sleep(0.05)
+    return status, extra, b"stand-in page" if status == 200 else b""
+
+
+@pytest.fixture
+def stand_in(serve):
+    return serve(route)
+
+
+class TestLinkChecker:
+    @pytest.mark.asyncio
+    async def test_statuses_and_get_fallback(self, stand_in):
+        """HEAD errors fall back to GET; redirects are followed"""
+        checker = LinkChecker(concurrency=4, timeout=2, allow_private=True)
+        try:
+            results = {
+                path: await checker.check(stand_in.base_url + path)
+                for path in ("/ok", "/gone", "/error", "/no-head", "/moved")
+            }
+            unreachable = await checker.check("http://127.0.0.1:1/")
+        finally:
+            await checker.close()
+
+        assert {path: r["link_status"] for path, r in results.items()} == {
+            "/ok": "ok",
+            "/gone": "broken",
+            "/error": "error",
+            "/no-head": "ok",
+            "/moved": "ok",
+        }
+        assert results["/gone"]["link_status_code"] == 404
+        assert unreachable["link_status"] == "unreachable"
+        assert ("GET", "/no-head") in [(m, p) for m, p, _ in stand_in.requests]
+        assert ("GET", "/ok") not in [(m, p) for m, p, _ in stand_in.requests]
+
+    @pytest.mark.asyncio
+    async def test_requests_per_host_are_limited(self, stand_in):
+        """No more than per_host requests reach one host at a time"""
+        checker = LinkChecker(concurrency=10, per_host=2, timeout=5, allow_private=True)
+        try:
+            await asyncio.gather(
+                *(checker.check(f"{stand_in.base_url}/slow") for _ in range(6))
+            )
+        finally:
+            await checker.close()
+
+        assert stand_in.max_active == 2
+
+    @pytest.mark.asyncio
+    async def test_job_writes_status_and_skips_recent_checks(self, stand_in):
+        """A run stores results on the bookmarks; a second run skips them"""
+        service = BookmarkService(None)
+        user_id = f"user-{uuid.uuid4()}"
+        bookmarks = {}
+        for path in ("/ok", "/gone", "/no-head", "/cached"):
+            bookmarks[path] = await service.create_bookmark(
+                BookmarkCreate(
+                    title=path, url=stand_in.base_url + path, user_id=user_id
+                )
+            )
+        checker = LinkChecker(concurrency=4, timeout=2, allow_private=True)
+        try:
+            checker.start(user_id, service)
+            job = await checker.wait(user_id)
+            assert job.state == "finished"
+            assert (job.scanned, job.checked) == (4, 4)
+            assert job.results["broken"] == 1
+            assert [link["id"] for link in job.broken] == [bookmarks["/gone"].id]
+
+            gone = await service.get_bookmark(bookmarks["/gone"].id, user_id)
+            assert (gone.link_status, gone.link_status_code) == ("broken", 404)
+            assert gone.link_checked_at is not None
+
+            checker.start(user_id, service)
+            job = await checker.wait(user_id)
+            assert (job.skipped, job.checked) == (4, 0)
+
+            stand_in.requests.clear()
+            checker.start(user_id, service, force=True)
+            job = await checker.wait(user_id)
+            assert job.checked == 4
+            cached = [h for m, p, h in stand_in.requests if p == "/cached"]
+            assert "If-Modified-Since" in cached[0]
+        finally:
+            await checker.close()
+
+    @pytest.mark.asyncio
+    async def test_private_links_are_not_requested(self):
+        """Internal hosts, and redirects to them, are reported unreachable"""
+        sent = []
+
+        def handler(request):
+            sent.append(str(request.url))
+            return httpx.Response(301, headers={"Location": "http://10.0.0.1/"})
+
+        checker = LinkChecker(timeout=2, transport=httpx.MockTransport(handler))
+        try:
+            direct = await checker.check("http://127.0.0.1:8080/ok")
+            metadata = await checker.check("http://169.254.169.254/latest/meta-data/")
+            redirected = await checker.check("http://93.184.216.34/moved")
+        finally:
+            await checker.close()
+
+        assert direct["link_status"] == "unreachable"
+        assert metadata["link_status"] == "unreachable"
+        assert redirected["link_status"] == "unreachable"
+        # Only the public page was requested; its redirect was refused
+        assert sent == ["http://93.184.216.34/moved"]
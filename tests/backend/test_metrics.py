@@ -0,0 +1,105 @@
+import logging
+import os
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+
+# Add the src directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+
+from backend.cosmos_usage import CosmosUsage, InstrumentedContainer  # noqa: E402
+from backend.main import app  # noqa: E402
+from backend.metrics import Histogram  # noqa: E402
+
+
+class TestHistogram:
+    def test_buckets_are_cumulative(self):
+        """Each bucket counts every observation at or below its bound"""
+        histogram = Histogram("latency_seconds", "Latency", ("route",), (0.1, 1.0))
+        for value in (0.05, 0.5, 0.7, 3.0):
+            histogram.observe(("/a",), value)
+
+        lines = histogram.render()
+
+        assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in lines
+        assert 'latency_seconds_bucket{route="/a",le="1.0"} 3' in lines
+        assert 'latency_seconds_bucket{route="/a",le="+Inf"} 4' in lines
+        assert 'latency_seconds_count{route="/a"} 4' in lines
+
+
+class TestMetricsEndpoint:
+    def test_requests_are_labelled_by_route_template(self):
+        """Requests show up under their route template, not the raw path"""
+        client = TestClient(app)
+        client.get("/api/v1/bookmarks/some-id-that-does-not-exist")
+
+        text = client.get("/metrics").text
+
+        assert (
+            'http_request_duration_seconds_count{method="GET",'
+            'route="/api/v1/bookmarks/{bookmark_id}",status="404"}'
+        ) in text
+        assert 'bookmark_service_duration_seconds_count{method="get_bookmark"' in text
+
+
+class FakePager:
+    def __init__(self, pages, response_hook):
+        self.pages = pages
+        self.response_hook = response_hook
+
+    def by_page(self):
+        pass
+
+    async def __aiter__(self):
+        for page in self.pages:
+            self.response_hook({"x-ms-request-charge": "60"}, page)
+            for item in page:
+                yield item
+
+
+class FakeContainer:
+    async def read_item(self, item, partition_key, response_hook=None):
+        headers = {
+            "x-ms-request-charge": "1.5",
+            "x-ms-request-duration-ms": "0.4",
+            "x-ms-throttle-retry-count": "2",
+        }
+        response_hook(headers, {"id": item})
+        return {"id": item}
+
+    def query_items(self, query, response_hook=None, **kwargs):
+        pager = FakePager([[1, 2], [3]], response_hook)
+        # The SDK reports the pager itself with the previous call's headers
+        response_hook({"x-ms-request-charge": "1.5"}, pager)
+        return pager
+
+
+class TestCosmosUsage:
+    @pytest.mark.asyncio
+    async def test_charges_are_aggregated_by_user_and_operation(self, caplog):
+        """Each call and query page is charged once; expensive pages are logged"""
+        usage = CosmosUsage(slow_request_charge=50)
+        container = InstrumentedContainer(FakeContainer(), usage)
+
+        await container.read_item(item="b1", partition_key="alice")
+        with caplog.at_level(logging.WARNING, logger="backend.cosmos_usage"):
+            items = [
+                item
+                async for item in container.query_items(
+                    "SELECT * FROM c WHERE c.user_id = @user_id",
+                    parameters=[{"name": "@user_id", "value": "alice"}],
+                    partition_key="alice",
+                )
+            ]
+
+        snapshot = usage.snapshot()
+        assert items == [1, 2, 3]
+        assert snapshot["totals"]["calls"] == 3
+        assert snapshot["totals"]["request_charge"] == 121.5
+        assert snapshot["totals"]["retries"] == 2
+        assert snapshot["by_operation"]["query_items"]["calls"] == 2
+        assert snapshot["by_route"]["background"]["calls"] == 3
+        assert snapshot["top_users"][0]["user_id"] == "alice"
+        assert len(caplog.records) == 2
+        assert "SELECT * FROM c WHERE c.user_id = @user_id" in caplog.text
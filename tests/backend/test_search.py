@@ -0,0 +1,72 @@
+import os
+import sys
+import uuid
+
+import pytest
+
+# Add the src directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+
+from backend.models import BookmarkCreate, BookmarkUpdate  # noqa: E402
+from backend.search import SearchIndex, tokenize  # noqa: E402
+from backend.services import BookmarkService  # noqa: E402
+from tests.backend.helpers import as_async  # noqa: E402
+
+
+class TestSearchIndex:
+    def test_tokenize_drops_case_and_stopwords(self):
+        """Terms are lowercased and common stopwords are skipped"""
+        assert tokenize("The Python Guide to AsyncIO") == ["python", "guide", "asyncio"]
+
+    @pytest.mark.asyncio
+    async def test_title_matches_rank_first(self):
+        """Matches in the title outrank matches in the description or URL"""
+        index = SearchIndex()
+        docs = [
+            {"id": "1", "title": "Cooking", "description": "python snippets"},
+            {"id": "2", "title": "Python tutorial", "url": "https://example.org/"},
+            {"id": "3", "title": "Gardening", "url": "https://python.org/"},
+        ]
+        await index.load("user", as_async(docs))
+
+        ranked, total = index.search("user", "python", limit=10)
+
+        assert total == 3
+        assert ranked[0][0] == "2"
+
+    @pytest.mark.asyncio
+    async def test_old_index_is_rebuilt(self):
+        """An index older than max_age is reloaded, finding bookmarks written elsewhere"""
+        index = SearchIndex(max_age=60)
+        docs = [{"id": "1", "title": "Python tutorial"}]
+        await index.load("user", as_async(docs))
+        index._built_at["user"] -= 61
+
+        assert not index.is_loaded("user")
+        docs.append({"id": "2", "title": "Python cookbook"})
+        await index.load("user", as_async(docs))
+        assert index.search("user", "python")[1] == 2
+
+    @pytest.mark.asyncio
+    async def test_service_keeps_index_current(self):
+        """Creates, updates and deletes are reflected in later searches"""
+        service = BookmarkService(None)
+        user_id = f"user-{uuid.uuid4()}"
+        bookmark = await service.create_bookmark(
+            BookmarkCreate(
+                title="Rust book", url="https://doc.rust-lang.org/", user_id=user_id
+            )
+        )
+        results, _ = await service.search_bookmarks(user_id, "rust")
+        assert [found.id for found, _ in results] == [bookmark.id]
+
+        await service.update_bookmark(
+            bookmark.id,
+            BookmarkUpdate(title="Zig guide", url="https://ziglang.org/"),
+            user_id,
+        )
+        assert (await service.search_bookmarks(user_id, "rust"))[1] == 0
+        assert (await service.search_bookmarks(user_id, "zig"))[1] == 1
+
+        await service.delete_bookmark(bookmark.id, user_id)
+        assert (await service.search_bookmarks(user_id, "zig"))[1] == 0
@@ -0,0 +1,196 @@
+import os
+import sqlite3
+import subprocess
+import sys
+import textwrap
+import uuid
+
+import pytest
+import pytest_asyncio
+
+# Add the src directory to the Python path
+SRC = os.path.join(os.path.dirname(__file__), "..", "..", "src")
+sys.path.insert(0, SRC)
+
+import backend.storage.shared as shared  # noqa: E402
+from backend.config import settings  # noqa: E402
+from backend.duplicates import duplicate_index  # noqa: E402
+from backend.models import BookmarkCreate, BookmarkUpdate  # noqa: E402
+from backend.services import BookmarkService, DuplicateBookmarkError  # noqa: E402
+from backend.storage import SharedBookmarkStore  # noqa: E402
+
+
+def other_worker(path, script):
+    """Run store calls in a separate process, as another worker would"""
+    code = "\n".join(
+        [
+            "import asyncio, sys",
+            f"sys.path.insert(0, {os.path.abspath(SRC)!r})",
+            "from backend.storage import SharedBookmarkStore",
+            "async def main(store):",
+            textwrap.indent(textwrap.dedent(script).strip(), "    "),
+            "    await store.close()",
+            f"asyncio.run(main(SharedBookmarkStore({path!r})))",
+        ]
+    )
+    subprocess.run([sys.executable, "-c", code], check=True, timeout=30)
+
+
+@pytest_asyncio.fixture
+async def store(tmp_path):
+    store = SharedBookmarkStore(str(tmp_path / "shared.db"), readers=2)
+    yield store
+    await store.close()
+
+
+@pytest.fixture
+def service(store):
+    """Bookmark service of this worker, on the shared database"""
+    service = BookmarkService(None)
+    service._mock_storage = store
+    return service
+
+
+class TestSharedStore:
+    @pytest.mark.asyncio
+    async def test_writes_of_other_processes_are_seen(
+        self, store, service, monkeypatch
+    ):
+        """Another worker's writes are read, and derived state is dropped"""
+        monkeypatch.setattr(settings, "duplicate_urls", "reject")
+        user_id = f"user-{uuid.uuid4()}"
+        await service.sync_shared_store()
+        mine = await service.create_bookmark(
+            BookmarkCreate(
+                title="Mine", url="https://example.com/mine", user_id=user_id
+            )
+        )
+        # Cache the bookmark and build the duplicate index in this worker
+        assert (await service.get_bookmark(mine.id, user_id)).title == "Mine"
+        await service.get_duplicates(user_id)
+        # This worker's own writes are already reflected here
+        assert await store.changes() == set()
+
+        other_worker(
+            store.path,
+            f"""
+            doc = await store.get({user_id!r}, {mine.id!r})
+            await store.replace({{**doc, "title": "Renamed elsewhere"}})
+            await store.insert({{
+                "id": "theirs", "title": "Theirs", "url": "https://example.com/theirs",
+                "category": "other", "tags": [], "user_id": {user_id!r},
+                "created_at": "2024-01-01T00:00:00", "updated_at": "2024-01-01T00:00:00",
+            }})
+            """,
+        )
+
+        await service.sync_shared_store()
+
+        renamed = await service.get_bookmark(mine.id, user_id)
+        assert renamed.title == "Renamed elsewhere"
+        with pytest.raises(DuplicateBookmarkError) as error:
+            await service.create_bookmark(
+                BookmarkCreate(
+                    title="Again", url="https://example.com/theirs", user_id=user_id
+                )
+            )
+        assert error.value.bookmark_id == "theirs"
+        _, total, _ = await service.get_bookmarks(user_id=user_id)
+        assert total == 2
+        assert await store.changes() == set()
+
+    @pytest.mark.asyncio
+    async def test_changes_name_each_bookmark_once(self, store, service):
+        """Repeated writes by another worker are reported per bookmark"""
+        user_id = f"user-{uuid.uuid4()}"
+        bookmark = await service.create_bookmark(
+            BookmarkCreate(title="One", url="https://example.com/one", user_id=user_id)
+        )
+        await store.changes()
+
+        other_worker(
+            store.path,
+            f"""
+            for title in ("Two", "Three"):
+                doc = await store.get({user_id!r}, {bookmark.id!r})
+                await store.replace({{**doc, "title": title}})
+            await store.delete({user_id!r}, {bookmark.id!r})
+            """,
+        )
+
+        assert await store.changes() == {user_id}
+        assert await service.get_bookmark(bookmark.id, user_id) is None
+
+    @pytest.mark.asyncio
+    async def test_own_write_does_not_hide_an_earlier_change(self, store, service):
+        """Another worker's write is reported even after this one writes too"""
+        user_id = f"user-{uuid.uuid4()}"
+        bookmark = await service.create_bookmark(
+            BookmarkCreate(title="One", url="https://example.com/one", user_id=user_id)
+        )
+        await store.changes()
+
+        other_worker(
+            store.path,
+            f"""
+            doc = await store.get({user_id!r}, {bookmark.id!r})
+            await store.replace({{**doc, "tags": ["theirs"]}})
+            """,
+        )
+        await service.update_bookmark(bookmark.id, BookmarkUpdate(title="Two"), user_id)
+
+        assert await store.changes() == {user_id}
+
+    @pytest.mark.asyncio
+    async def test_writes_from_other_tools_are_seen(self, store, service):
+        """A plain connection, like the sqlite3 shell, can write and is reported"""
+        user_id = f"user-{uuid.uuid4()}"
+        bookmark = await service.create_bookmark(
+            BookmarkCreate(title="One", url="https://example.com/one", user_id=user_id)
+        )
+        await store.changes()
+
+        connection = sqlite3.connect(store.path)
+        with connection:
+            connection.execute(
+                "UPDATE bookmarks SET title = 'Edited' WHERE id = ?", (bookmark.id,)
+            )
+        connection.close()
+
+        assert await store.changes() == {user_id}
+
+    @pytest.mark.asyncio
+    async def test_trimmed_log_drops_everything(self, store, service, monkeypatch):
+        """Changes trimmed before they were read drop every user's state"""
+        user_id = f"user-{uuid.uuid4()}"
+        await service.sync_shared_store()
+        await service.create_bookmark(
+            BookmarkCreate(title="One", url="https://example.com/one", user_id=user_id)
+        )
+        await service.get_duplicates(user_id)
+        _, total, _ = await service.get_bookmarks(user_id=user_id)
+        assert total == 1
+        other_worker(
+            store.path,
+            f"""
+            await store.insert({{
+                "id": "theirs", "title": "Theirs", "url": "https://example.com/theirs",
+                "category": "other", "tags": [], "user_id": {user_id!r},
+                "created_at": "2024-01-01T00:00:00", "updated_at": "2024-01-01T00:00:00",
+            }})
+            """,
+        )
+        # Trim the whole log on this worker's next write
+        monkeypatch.setattr(shared, "CHANGE_LOG_RETENTION_SECONDS", -60)
+        store._next_trim = 0
+        await service.create_bookmark(
+            BookmarkCreate(
+                title="Two", url="https://example.com/two", user_id="someone-else"
+            )
+        )
+
+        await service.sync_shared_store()
+
+        assert not duplicate_index.is_loaded(user_id)
+        _, total, _ = await service.get_bookmarks(user_id=user_id)
+        assert total == 2
@@ -0,0 +1,120 @@
+import os
+import sys
+import uuid
+
+import pytest
+import pytest_asyncio
+
+# Add the src directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+
+import backend.services.bookmark_service as bookmark_service  # noqa: E402
+from backend.models import (  # noqa: E402
+    BookmarkCreate,
+    BookmarkSelection,
+    BookmarkUpdate,
+)
+from backend.services import BookmarkService  # noqa: E402
+from backend.storage import SQLiteBookmarkStore  # noqa: E402
+
+
+@pytest_asyncio.fixture
+async def store(tmp_path):
+    store = SQLiteBookmarkStore(str(tmp_path / "bookmarks.db"), readers=2)
+    yield store
+    await store.close()
+
+
+@pytest.fixture
+def service(store, monkeypatch):
+    """Bookmark service running against a fresh SQLite database"""
+    monkeypatch.setattr(bookmark_service, "_mock_storage", store)
+    return BookmarkService(None)
+
+
+@pytest.fixture
+def user_id():
+    return f"user-{uuid.uuid4()}"
+
+
+async def create(service, user_id, title, **fields):
+    return await service.create_bookmark(
+        BookmarkCreate(
+            title=title,
+            url=f"https://example.com/{uuid.uuid4().hex[:8]}",
+            user_id=user_id,
+            **fields,
+        )
+    )
+
+
+class TestSQLiteStore:
+    @pytest.mark.asyncio
+    async def test_bookmarks_survive_reopening(self, service, store, user_id):
+        """Writes are durable: a new store on the same file sees them"""
+        first = await create(service, user_id, "First", tags=["a"])
+        second = await create(service, user_id, "Second")
+        await service.update_bookmark(
+            first.id, BookmarkUpdate(title="Renamed", tags=["b"]), user_id
+        )
+        assert await service.delete_bookmark(second.id, user_id)
+        await store.close()
+
+        reopened = SQLiteBookmarkStore(store.path)
+        try:
+            doc = await reopened.get(user_id, first.id)
+            assert doc["title"] == "Renamed"
+            assert doc["tags"] == ["b"]
+            assert await reopened.get(user_id, second.id) is None
+            assert await reopened.count(user_id, tags=["a"]) == 0
+        finally:
+            await reopened.close()
+
+    @pytest.mark.asyncio
+    async def test_filters_and_cursor_pages(self, service, user_id):
+        """Tag filters match any tag once; cursors walk every match newest first"""
+        created = []
+        for i in range(7):
+            tags = ["a", "b"] if i % 2 else ["a"]
+            category = "work" if i < 4 else "news"
+            created.append(
+                await create(service, user_id, f"B{i}", tags=tags, category=category)
+            )
+
+        seen, cursor = [], None
+        while True:
+            bookmarks, total, cursor = await service.get_bookmarks(
+                user_id=user_id, tags=["a", "b"], page_size=3, cursor=cursor
+            )
+            assert total == 7
+            seen.extend(bookmark.id for bookmark in bookmarks)
+            if cursor is None:
+                break
+        assert seen == [bookmark.id for bookmark in reversed(created)]
+
+        _, total, _ = await service.get_bookmarks(
+            user_id=user_id, category="work", tags=["b"]
+        )
+        assert total == 2
+        facets = await service.get_facets(user_id)
+        assert facets == {
+            "total": 7,
+            "categories": {"work": 4, "news": 3},
+            "tags": {"a": 7, "b": 3},
+        }
+
+    @pytest.mark.asyncio
+    async def test_search_and_bulk_delete(self, service, user_id):
+        """FTS5 ranks title matches first; bulk delete removes them from search"""
+        await create(service, user_id, "Cooking", description="python snippets")
+        await create(service, user_id, "Python tutorial", tags=["old"])
+        await create(service, user_id, "Gardening")
+
+        results, total = await service.search_bookmarks(user_id, "python")
+        assert total == 2
+        assert results[0][0].title == "Python tutorial"
+
+        result = await service.bulk_delete(user_id, BookmarkSelection(tags=["old"]))
+        assert result["processed"] == 1
+        _, total = await service.search_bookmarks(user_id, "python")
+        assert total == 1